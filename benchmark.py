@@ -0,0 +1,425 @@
+"""Benchmarks of loading, saving, table rendering, export and dialogs on generated data
+
+Usage:
+    python benchmark.py [--sheets N] [--entries M] [--descriptions K] [--seed S]
+                        [--end YYYY-MM-DD] [--modes segments,journal,json,sqlite] [--repeat R]
+                        [--output results.json] [--compare previous.json]
+
+The data (N sheets of M entries using K distinct descriptions, the most
+used ones far more often, the last one ending at the start of --end) comes
+from a seeded generator and is written to a temporary folder once per
+storage mode. Every benchmark is timed over
+several runs for its latency percentiles, then run once more under
+tracemalloc for its peak memory. Results are printed and saved as JSON;
+--compare prints the change against the results of an earlier run.
+
+Benchmarks of Tk widgets run with the root window withdrawn and are
+skipped when no display is available; run them on a headless machine with
+`xvfb-run python benchmark.py`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from timekeeper.descriptions import DescriptionIndex
+from timekeeper.entries import Entry, entry_row
+from timekeeper.export import export_sheet
+from timekeeper.reports import SheetColumns, group_totals
+from timekeeper.storage import JsonStore, open_store
+from timekeeper.tracker import DEFAULT_ARCHIVE_AFTER_MONTHS, DEFAULT_ARCHIVE_FORMAT
+
+
+RESULTS_VERSION = 1
+
+# Date the generated entries end at; fixed so the same options always generate the same data
+DEFAULT_END = "2026-01-01"
+STORAGE_MODES = ("segments", "journal", "json", "sqlite")
+EXPORT_FORMATS = ("txt", "csv", "csv.gz", "tkcol")
+TABLE_COLUMNS = ("Date", "Start Time", "End Time", "Duration", "Description")
+
+# Rows fetched by a table refresh: 15 visible plus 50 on either side (see VirtualTable)
+TABLE_WINDOW = 115
+
+# Runs of quick benchmarks (table pages, keystrokes, dialogs) per --repeat run
+QUICK_RUNS = 20
+
+WORDS = ("fix", "review", "meeting", "client", "deploy", "bug", "report", "design", "planning", "support",
+         "invoice", "refactor", "tests", "release", "standup", "documentation", "backend", "frontend",
+         "call", "email", "research", "onboarding", "migration", "database", "budget", "training")
+
+
+def generate_descriptions(rng, count):
+    """Return `count` distinct descriptions of two to six words"""
+    descriptions = []
+    seen = set()
+    while len(descriptions) < count:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(2, 6))]
+        description = " ".join(words).capitalize()
+        if description in seen:
+            description = f"{description} {len(descriptions)}"
+        seen.add(description)
+        descriptions.append(description)
+    return descriptions
+
+
+def generate_config(path, sheets, entries, descriptions, seed, end):
+    """Write a config file of `sheets` sheets with `entries` entries each, ending at epoch time `end`
+    
+    Descriptions are drawn with Zipf-like weights (the i-th is used 1/i
+    as often as the first), and entries are one to eight hours apart.
+    """
+    rng = random.Random(seed)
+    pool = generate_descriptions(rng, descriptions)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, descriptions + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    
+    # Changes are applied in memory and written once at the end
+    store = JsonStore(path)
+    for number in range(1, sheets + 1):
+        sheet_name = f"Sheet {number}"
+        store.apply({"op": "add_sheet", "sheet": sheet_name})
+        start = end
+        for description in rng.choices(pool, cum_weights=cum_weights, k=entries):
+            start -= rng.randint(3600, 8 * 3600)
+            duration = rng.randint(60, 3 * 3600)
+            store.apply({"op": "entry", "sheet": sheet_name, "entry": Entry(start, start + duration, duration, description)})
+    store.save()
+    store.close()
+
+
+def percentile(values, fraction):
+    """Return the fraction (0..1) percentile of sorted values, interpolating between neighbours"""
+    position = (len(values) - 1) * fraction
+    lo = int(position)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (position - lo)
+
+
+def measure(func, runs, setup=None, teardown=None):
+    """Time func(*setup()) `runs` times, then run it once more under tracemalloc
+    
+    Returns the latency percentiles in milliseconds, the peak memory
+    allocated during a run and the memory still held when it returned
+    (before teardown(result)).
+    """
+    times = []
+    for _ in range(runs):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+        if teardown:
+            teardown(result)
+    
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        held, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if teardown:
+        teardown(result)
+    
+    times.sort()
+    return {
+        "runs": runs,
+        "min_ms": times[0] * 1000,
+        "p50_ms": percentile(times, 0.5) * 1000,
+        "p90_ms": percentile(times, 0.9) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+        "max_ms": times[-1] * 1000,
+        "mean_ms": sum(times) / len(times) * 1000,
+        "peak_bytes": peak,
+        "held_bytes": held
+    }
+
+
+class Benchmarks:
+    """Runs the benchmarks of one data set and collects their results by name"""
+    
+    def __init__(self, options, folder):
+        self.options = options
+        self.folder = folder
+        self.rng = random.Random(options.seed)
+        self.results = {}
+        self.total_entries = options.sheets * options.entries
+        # The segment store counts its recent and archived months from the date the data ends at
+        self.today = datetime.strptime(options.end, "%Y-%m-%d")
+    
+    def run(self, name, func, runs=None, **kwargs):
+        """Run one benchmark and print its result line"""
+        result = measure(func, runs or self.options.repeat, **kwargs)
+        self.results[name] = result
+        print(f"{name:<32} {result['runs']:>5} {result['p50_ms']:>10.2f} {result['p90_ms']:>10.2f} "
+              f"{result['p99_ms']:>10.2f} {result['max_ms']:>10.2f} {result['peak_bytes'] / 1e6:>9.1f}")
+        return result
+    
+    def skip(self, name, reason):
+        """Record a benchmark that could not run"""
+        self.results[name] = {"skipped": reason}
+        print(f"{name:<32} skipped: {reason}")
+    
+    def open_loaded(self, mode, config_file):
+        """Open and load the store of a storage mode"""
+        store = open_store(mode, config_file, DEFAULT_ARCHIVE_AFTER_MONTHS, DEFAULT_ARCHIVE_FORMAT, today=self.today)
+        store.load()
+        return store
+    
+    def mode_config(self, mode, source):
+        """Copy the generated config file into a folder of its own and fill the mode's files from it"""
+        mode_folder = os.path.join(self.folder, mode)
+        os.makedirs(mode_folder)
+        config_file = os.path.join(mode_folder, "sheets_config.json")
+        shutil.copyfile(source, config_file)
+        # The first load imports the config file (and archives old months); it is not timed
+        self.open_loaded(mode, config_file).close()
+        return config_file
+    
+    def run_mode(self, mode, source):
+        """Run the storage, table, export and report benchmarks of one storage mode"""
+        config_file = self.mode_config(mode, source)
+        repeat = self.options.repeat
+        result = self.run(f"load[{mode}]", lambda: self.open_loaded(mode, config_file),
+                          teardown=lambda store: store.close())
+        result["held_bytes_per_entry"] = result["held_bytes"] / max(1, self.total_entries)
+        
+        store = self.open_loaded(mode, config_file)
+        try:
+            sheet_names = store.sheet_names()
+            end = max(entry.end for entry in store.entry_range(sheet_names[0], 0, 1))
+            
+            def add_entry():
+                # A new entry a minute after the last one, written out before returning
+                nonlocal end
+                end += 60
+                store.add_entry(sheet_names[0], Entry(end - 30, end, 30, "Benchmark entry"))
+                store.flush()
+            
+            self.run(f"add_entry[{mode}]", add_entry, runs=repeat * QUICK_RUNS)
+            if mode == "sqlite":
+                self.skip(f"save[{mode}]", "every change is committed by add_entry")
+            else:
+                self.run(f"save[{mode}]", store.save)
+            
+            count = store.count_entries(sheet_names[-1])
+            self.run(f"table_page[{mode}]",
+                     lambda offset: [entry_row(entry) for entry in store.entry_range(sheet_names[-1], offset, TABLE_WINDOW)],
+                     runs=repeat * QUICK_RUNS, setup=lambda: (self.rng.randrange(max(1, count)),))
+            
+            export_path = os.path.join(self.folder, "export.csv")
+            self.run(f"export_csv[{mode}]",
+                     lambda: export_sheet(store, sheet_names[-1], export_path, "csv",
+                                          (None, None, "benchmark", "All entries")))
+            
+            self.run(f"report_by_week[{mode}]", lambda: group_totals(
+                SheetColumns(store.iter_entries(sheet_names[-1], newest_first=False)), "week"))
+        finally:
+            store.close()
+    
+    def run_exports(self, mode, config_file):
+        """Run the export benchmark of every format on one storage mode"""
+        store = self.open_loaded(mode, config_file)
+        try:
+            sheet_name = store.sheet_names()[-1]
+            for format_type in EXPORT_FORMATS:
+                export_path = os.path.join(self.folder, f"export.{format_type}")
+                self.run(f"export[{format_type}]",
+                         lambda: export_sheet(store, sheet_name, export_path, format_type,
+                                              (None, None, "benchmark", "All entries")))
+        finally:
+            store.close()
+    
+    def run_descriptions(self, mode, config_file):
+        """Run the description index build and search-as-you-type benchmarks"""
+        store = self.open_loaded(mode, config_file)
+        try:
+            frequency = store.description_frequency(store.sheet_names()[-1])
+        finally:
+            store.close()
+        self.run("description_index", lambda: DescriptionIndex(frequency.copy()))
+        
+        # Every prefix typed on the way to a few descriptions, searched one keystroke at a time
+        index = DescriptionIndex(frequency)
+        targets = self.rng.sample(sorted(frequency.stats), min(20, len(frequency)))
+        queries = [target[:length] for target in targets for length in range(len(target) + 1)]
+        keystrokes = iter(queries * (self.options.repeat * QUICK_RUNS // len(queries) + 2))
+        self.run("description_search", index.search, runs=min(len(queries), self.options.repeat * QUICK_RUNS),
+                 setup=lambda: (next(keystrokes),))
+        return index
+    
+    def run_tk(self, mode, config_file, description_index):
+        """Run the table refresh and dialog benchmarks on a withdrawn Tk root"""
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+            root = tk.Tk()
+        except Exception as e:
+            for name in ("update_table", "description_dialog", "export_dialog"):
+                self.skip(name, f"no Tk display ({e})")
+            return
+        root.withdraw()
+        
+        # Imported late: time_tracker needs tkinter
+        from time_tracker import DescriptionDialog, ExportDialog, VirtualTable
+        
+        store = self.open_loaded(mode, config_file)
+        try:
+            sheet_name = store.sheet_names()[-1]
+            count = store.count_entries(sheet_name)
+            table = VirtualTable(ttk.Frame(root), TABLE_COLUMNS,
+                                 fetch_rows=lambda offset, limit: [entry_row(entry) for entry in
+                                                                   store.entry_range(sheet_name, offset, limit)],
+                                 count_rows=lambda: store.count_entries(sheet_name))
+            
+            def update_table(offset):
+                # As TimeTracker.update_table() after the sheet changed, scrolled to offset
+                table.offset = offset
+                table.refresh()
+                root.update_idletasks()
+            
+            self.run("update_table", update_table, runs=self.options.repeat * QUICK_RUNS,
+                     setup=lambda: (self.rng.randrange(max(1, count)),))
+            
+            def open_dialog(create):
+                dialog = create()
+                root.update_idletasks()
+                return dialog
+            
+            for name, create in (("description_dialog", lambda: DescriptionDialog(root, description_index)),
+                                 ("export_dialog", lambda: ExportDialog(root, store, sheet_name))):
+                try:
+                    self.run(name, lambda: open_dialog(create), runs=self.options.repeat * QUICK_RUNS,
+                             teardown=lambda dialog: dialog.dialog.destroy())
+                except tk.TclError as e:
+                    self.skip(name, str(e))
+        finally:
+            store.close()
+            root.destroy()
+
+
+def git_version():
+    """Return `git describe` of the working tree, or None outside a git checkout"""
+    try:
+        output = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.decode().strip() or None
+
+
+def compare(results, previous_file):
+    """Print the p50 latency and peak memory of each benchmark relative to an earlier results file"""
+    with open(previous_file, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_file} ({previous.get('git') or 'unknown version'}, {previous.get('created')}):")
+    options = results["options"]
+    previous_options = previous.get("options", {})
+    if options != previous_options:
+        print(f"Warning: generated with other options ({previous_options})")
+    print(f"{'benchmark':<32} {'p50 before':>11} {'p50 now':>10} {'change':>8} {'peak change':>12}")
+    for name, result in results["benchmarks"].items():
+        before = previous.get("benchmarks", {}).get(name)
+        if not before or "skipped" in before or "skipped" in result:
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        peak_change = result["peak_bytes"] / before["peak_bytes"] - 1 if before["peak_bytes"] else 0.0
+        flag = "  slower" if change > 0.2 else ""
+        print(f"{name:<32} {before['p50_ms']:>11.2f} {result['p50_ms']:>10.2f} {change:>+8.0%} {peak_change:>+12.0%}{flag}")
+
+
+def build_parser():
+    """Return the argument parser of the benchmark options"""
+    parser = argparse.ArgumentParser(description="Benchmark the time tracker on generated data")
+    parser.add_argument("--sheets", type=int, default=3, help="sheets to generate (default: 3)")
+    parser.add_argument("--entries", type=int, default=20000, help="entries per sheet (default: 20000)")
+    parser.add_argument("--descriptions", type=int, default=500, help="distinct descriptions (default: 500)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the generator (default: 1)")
+    parser.add_argument("--end", default=DEFAULT_END,
+                        help=f"date the generated entries end at, YYYY-MM-DD (default: {DEFAULT_END})")
+    parser.add_argument("--modes", default=",".join(STORAGE_MODES),
+                        help=f"storage modes to benchmark (default: {','.join(STORAGE_MODES)})")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each slow benchmark (default: 5)")
+    parser.add_argument("--no-tk", action="store_true", help="skip the Tk table and dialog benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON results file (default: benchmark_results.json)")
+    parser.add_argument("--compare", metavar="FILE", help="earlier results file to compare with")
+    return parser
+
+
+def main(argv=None):
+    """Generate the data, run every benchmark and save the results"""
+    options = build_parser().parse_args(argv)
+    modes = [mode.strip() for mode in options.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in STORAGE_MODES]
+    if unknown or not modes:
+        print(f"Unknown storage mode(s): {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    
+    try:
+        end = int(datetime.strptime(options.end, "%Y-%m-%d").timestamp())
+    except ValueError:
+        print(f"Invalid --end date '{options.end}', expected YYYY-MM-DD", file=sys.stderr)
+        return 1
+    folder = tempfile.mkdtemp(prefix="timekeeper-benchmark-")
+    try:
+        source = os.path.join(folder, "generated.json")
+        start = time.perf_counter()
+        generate_config(source, options.sheets, options.entries, options.descriptions, options.seed, end)
+        print(f"Generated {options.sheets} sheets x {options.entries} entries x {options.descriptions} descriptions "
+              f"in {time.perf_counter() - start:.1f} s ({os.path.getsize(source) / 1e6:.1f} MB config file)\n")
+        
+        benchmarks = Benchmarks(options, folder)
+        print(f"{'benchmark':<32} {'runs':>5} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10} {'peak MB':>9}")
+        for mode in modes:
+            benchmarks.run_mode(mode, source)
+        config_file = os.path.join(folder, modes[0], "sheets_config.json")
+        benchmarks.run_exports(modes[0], config_file)
+        description_index = benchmarks.run_descriptions(modes[0], config_file)
+        if options.no_tk:
+            for name in ("update_table", "description_dialog", "export_dialog"):
+                benchmarks.skip(name, "--no-tk")
+        else:
+            benchmarks.run_tk(modes[0], config_file, description_index)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {
+            "sheets": options.sheets,
+            "entries": options.entries,
+            "descriptions": options.descriptions,
+            "seed": options.seed,
+            "end": options.end,
+            "modes": modes,
+            "repeat": options.repeat
+        },
+        "benchmarks": benchmarks.results
+    }
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {options.output}")
+    if options.compare:
+        compare(results, options.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# The tests import timekeeper from the repository root, which has no packaging
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timekeeper.entries import make_entry  # noqa: E402
+
+
+@pytest.fixture
+def entry_at():
+    """Factory of entries starting at a local date and time and lasting `minutes`"""
+    def build(year, month, day, hour, minute=0, minutes=60, description="Work"):
+        start = datetime(year, month, day, hour, minute)
+        return make_entry(start, datetime.fromtimestamp(start.timestamp() + minutes * 60), description)
+    return build
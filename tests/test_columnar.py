@@ -0,0 +1,74 @@
+import pytest
+
+from timekeeper.columnar import iter_columnar, read_columnar, write_columnar
+from timekeeper.export import COLUMNAR_FORMAT, export_sheet
+from timekeeper.storage import JsonStore
+
+
+@pytest.fixture
+def entries(entry_at):
+    descriptions = ["Fix bug", "Réunion d'équipe", "会議", "Fix bug", "", "Deploy 🚀", "Réunion d'équipe"]
+    return [entry_at(2024, 3, day + 1, 9, minutes=15 * (day + 1), description=description)
+            for day, description in enumerate(descriptions)]
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 4096])
+def test_round_trip(tmp_path, entries, block_size):
+    path = str(tmp_path / "sheet.tkcol")
+    metadata = {"sheet": "Work", "title": "All entries"}
+    assert write_columnar(path, iter(entries), metadata, block_size=block_size) == len(entries)
+    
+    assert list(iter_columnar(path)) == entries
+    columns = read_columnar(path)
+    assert columns["metadata"] == metadata
+    assert list(columns["duration"]) == [entry.duration for entry in entries]
+    # Each description is stored once
+    assert sorted(columns["descriptions"]) == sorted(set(entry.description for entry in entries))
+    assert not (tmp_path / "sheet.tkcol.tmp").exists()
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / "empty.tkcol")
+    assert write_columnar(path, []) == 0
+    columns = read_columnar(path)
+    assert columns["metadata"] == {}
+    assert len(columns["start"]) == 0 and columns["descriptions"] == []
+
+
+def test_truncated_file_is_rejected(tmp_path, entries):
+    path = tmp_path / "sheet.tkcol"
+    write_columnar(str(path), entries, block_size=3)
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError):
+        read_columnar(str(path))
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path, entries):
+    path = str(tmp_path / "sheet.tkcol")
+    write_columnar(path, entries)
+    
+    def failing():
+        yield entries[0]
+        raise RuntimeError("interrupted")
+    
+    with pytest.raises(RuntimeError):
+        write_columnar(path, failing())
+    assert list(iter_columnar(path)) == entries
+    assert not (tmp_path / "sheet.tkcol.tmp").exists()
+
+
+def test_export_sheet_to_columnar(tmp_path, entries):
+    store = JsonStore(str(tmp_path / "sheets_config.json"))
+    store.load()
+    store.add_sheet("Work")
+    for entry in reversed(entries):
+        store.add_entry("Work", entry)
+    path = str(tmp_path / "sheet_all.tkcol")
+    try:
+        date_range = ("2024-03-02", "2024-03-05", "sheet_2024-03-02_to_2024-03-05", "Range")
+        assert export_sheet(store, "Work", path, COLUMNAR_FORMAT, date_range, newest_first=False) == 4
+    finally:
+        store.close()
+    assert list(iter_columnar(path)) == entries[1:5]
+    assert read_columnar(path)["metadata"] == {"sheet": "Work", "title": "Range"}
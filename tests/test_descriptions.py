@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from timekeeper.descriptions import DescriptionIndex, tokenize
+from timekeeper.frequency import FrequencyTable
+
+DAY = 86400
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def index():
+    index = DescriptionIndex()
+    uses = [("Fix login bug", 5), ("Fix layout of reports", 3), ("Code review", 4),
+            ("Logistics call", 1), ("Review: login flow", 2), ("Café visit", 1)]
+    for description, count in uses:
+        for _ in range(count):
+            index.use(description, NOW)
+    return index
+
+
+def brute_force(index, query, limit):
+    """The best descriptions having a word starting with every query term, found by scanning all of them"""
+    terms = tokenize(query)
+    matching = [description for description in index.ranking()
+                if all(any(word.startswith(term) for word in tokenize(description)) for term in terms)]
+    return matching[:limit]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("fix lo", ["Fix login bug"]),
+    ("lo fix", ["Fix login bug"]),
+    ("fix l", ["Fix login bug", "Fix layout of reports"]),
+    ("log", ["Fix login bug", "Review: login flow", "Logistics call"]),
+    ("REVIEW", ["Code review", "Review: login flow"]),
+    ("review login", ["Review: login flow"]),
+    ("caf", ["Café visit"]),
+    ("ogin", []),
+    ("fix code", []),
+])
+def test_every_term_is_a_word_prefix(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_empty_query_lists_the_best_descriptions(index):
+    assert index.search("  ") == ["Fix login bug", "Code review", "Fix layout of reports"] + \
+        ["Review: login flow", "Café visit", "Logistics call"]
+    assert index.search("", limit=2) == ["Fix login bug", "Code review"]
+
+
+def test_a_new_use_changes_the_ranking(index):
+    for _ in range(3):
+        index.use("Review: login flow", NOW + DAY)
+    assert index.search("login") == ["Review: login flow", "Fix login bug"]
+
+
+@pytest.mark.parametrize("query", ["t", "ta", "task 1", "1", "bug", "a b", "d 4", "zzz", "task fix 3"])
+def test_search_matches_a_full_scan(query):
+    rng = random.Random(3)
+    words = ["task", "fix", "bug", "alpha", "beta", "deploy", "docs"]
+    index = DescriptionIndex(FrequencyTable(max_size=300))
+    when = NOW
+    for _ in range(2000):
+        when += rng.randrange(0, DAY)
+        description = f"{rng.choice(words)} {rng.choice(words)} {rng.randrange(40)}"
+        index.use(description, when)
+    for limit in (1, 8, 50):
+        assert index.search(query, limit) == brute_force(index, query, limit)
+
+
+def test_evicted_descriptions_leave_the_index():
+    index = DescriptionIndex(FrequencyTable(max_size=2))
+    index.use("Alpha one", NOW)
+    index.use("Beta two", NOW + DAY)
+    index.use("Gamma three", NOW + 2 * DAY)
+    assert len(index) == 2
+    assert index.search("alpha") == []
+    assert "alpha" not in index.words and index.prefix_words("a") == []
+    assert index.search("t") == ["Gamma three", "Beta two"]
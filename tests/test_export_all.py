@@ -0,0 +1,71 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from timekeeper import export
+from timekeeper.columnar import pack_entries, unpack_entries
+from timekeeper.export import export_all_sheets, format_snapshot
+
+DATE_RANGE = (None, None, "sheet_all", "All entries")
+
+
+class BrokenPool:
+    """A process pool whose workers died before formatting anything"""
+    
+    def __init__(self):
+        self.submitted = 0
+    
+    def submit(self, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_exception(BrokenProcessPool("A worker process terminated abruptly"))
+        return future
+    
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch, entry_at):
+    monkeypatch.chdir(tmp_path)
+    return {
+        "Work": [entry_at(2024, 3, day, 9, description=f"Task {day % 3}") for day in range(1, 20)],
+        "Home": [entry_at(2024, 3, 1, 20, description="Garden"), entry_at(2024, 3, 2, 23, minutes=120)],
+        "Empty": []
+    }
+
+
+def expected_text(entries, format_type):
+    return format_snapshot("", *pack_entries(entries), format_type, "", include_header=False)[0]
+
+
+def exported_text(tmp_path, sheet_name, format_type):
+    with open(tmp_path / "exports" / sheet_name / f"sheet_all.{format_type}", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_pack_round_trip(snapshots):
+    entries = snapshots["Work"]
+    columns, descriptions = pack_entries(entries)
+    assert sorted(descriptions) == ["Task 0", "Task 1", "Task 2"]
+    assert list(unpack_entries(columns, descriptions)) == entries
+
+
+@pytest.mark.parametrize("format_type", ["txt", "csv"])
+def test_sheets_are_formatted_in_processes(tmp_path, snapshots, format_type):
+    results = export_all_sheets(snapshots, format_type, DATE_RANGE, include_header=False, max_workers=2)
+    for sheet_name, entries in snapshots.items():
+        result = results[sheet_name]
+        assert result["error"] is None and result["entries"] == len(entries)
+        assert result["wall_seconds"] >= result["write_seconds"]
+        assert exported_text(tmp_path, sheet_name, format_type) == expected_text(entries, format_type)
+
+
+@pytest.mark.parametrize("pool", [BrokenPool, lambda: None])
+def test_broken_or_missing_process_pool_falls_back_to_threads(tmp_path, snapshots, monkeypatch, pool):
+    monkeypatch.setattr(export, "formatter_pool", lambda max_workers=None: pool())
+    results = export_all_sheets(snapshots, "csv", DATE_RANGE, include_header=False)
+    for sheet_name, entries in snapshots.items():
+        assert results[sheet_name]["error"] is None
+        assert exported_text(tmp_path, sheet_name, "csv") == expected_text(entries, "csv")
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from timekeeper.export import MANIFEST_NAME, export_weeks
+from timekeeper.storage import JsonStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, entry_at):
+    """A sheet with entries in ISO weeks 9, 10 and 11 of 2024; exports go under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    store = JsonStore(str(tmp_path / "sheets_config.json"))
+    store.load()
+    store.add_sheet("Work Log")
+    for month, day in [(2, 26), (2, 28), (3, 4), (3, 10), (3, 11)]:
+        store.add_entry("Work Log", entry_at(2024, month, day, 9))
+    yield store
+    store.close()
+
+
+def week_files(tmp_path):
+    folder = tmp_path / "exports" / "Work_Log"
+    return {path.name: path.read_bytes() for path in folder.iterdir() if path.name != MANIFEST_NAME}
+
+
+def test_rerun_skips_unchanged_weeks(tmp_path, store):
+    assert export_weeks(store, "Work Log", "csv") == (3, 0)
+    first = week_files(tmp_path)
+    assert sorted(first) == ["sheet_W09_2024.csv", "sheet_W10_2024.csv", "sheet_W11_2024.csv"]
+    
+    assert export_weeks(store, "Work Log", "csv") == (0, 3)
+    assert week_files(tmp_path) == first
+    manifest = json.loads((tmp_path / "exports" / "Work_Log" / MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert {name: week["count"] for name, week in manifest.items()} == {
+        "sheet_W09_2024.csv": 2, "sheet_W10_2024.csv": 2, "sheet_W11_2024.csv": 1}
+
+
+def test_rerun_writes_changed_and_missing_weeks(tmp_path, store, entry_at):
+    export_weeks(store, "Work Log", "txt")
+    first = week_files(tmp_path)
+    
+    store.add_entry("Work Log", entry_at(2024, 3, 12, 14))
+    assert export_weeks(store, "Work Log", "txt") == (1, 2)
+    second = week_files(tmp_path)
+    assert second["sheet_W11_2024.txt"] != first["sheet_W11_2024.txt"]
+    assert {name: second[name] for name in ("sheet_W09_2024.txt", "sheet_W10_2024.txt")} == {
+        name: first[name] for name in ("sheet_W09_2024.txt", "sheet_W10_2024.txt")}
+    
+    # A week file deleted since the last export is written again
+    (tmp_path / "exports" / "Work_Log" / "sheet_W10_2024.txt").unlink()
+    assert export_weeks(store, "Work Log", "txt") == (1, 2)
+    assert week_files(tmp_path) == second
+
+
+def test_small_pool_gives_the_same_files(tmp_path, store):
+    export_weeks(store, "Work Log", "csv", max_open=1)
+    small = week_files(tmp_path)
+    assert export_weeks(store, "Work Log", "csv") == (0, 3)
+    assert week_files(tmp_path) == small
+    
+    with pytest.raises(ValueError):
+        export_weeks(store, "Work Log", "tkcol")
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from timekeeper.frequency import HALF_LIFE_DAYS, FrequencyTable
+
+DAY = 86400
+NOW = 1_700_000_000
+
+
+def test_use_halves_in_value_every_half_life():
+    table = FrequencyTable()
+    table.use("Standup", NOW)
+    assert table.score("Standup", NOW) == pytest.approx(1)
+    assert table.score("Standup", NOW + HALF_LIFE_DAYS * DAY) == pytest.approx(0.5)
+
+
+def test_recent_uses_outrank_old_frequent_ones():
+    table = FrequencyTable()
+    table.use("Old project", NOW - 200 * DAY, count=20)
+    table.use("New project", NOW - DAY, count=2)
+    table.use("Tie", NOW - DAY, count=2)
+    table.use("Tie", NOW - DAY)
+    assert table.ranking() == ["Tie", "New project", "Old project"]
+    assert table.count("Old project") == 20
+
+
+def test_eviction_drops_the_lowest_ranked_but_never_the_one_just_used():
+    table = FrequencyTable(max_size=3)
+    for day, description in enumerate(["A", "B", "C"]):
+        table.use(description, NOW + day * DAY, count=3 - day)
+    # D ranks lowest of all, yet is kept since it was just used
+    assert table.use("D", NOW - 400 * DAY) == ["C"]
+    assert sorted(table.stats) == ["A", "B", "D"]
+    assert table.use("E", NOW + 10 * DAY) == ["D"]
+
+
+@pytest.mark.parametrize("max_size, top_size", [(50, 20), (12, 5), (10, 10), (4, 8)])
+def test_top_list_matches_the_ranking_after_every_use(max_size, top_size):
+    rng = random.Random(max_size * 100 + top_size)
+    table = FrequencyTable(max_size=max_size, top_size=top_size)
+    when = NOW
+    evicted = set()
+    for _ in range(2000):
+        when += rng.randrange(0, 5 * DAY)
+        description = f"Task {rng.randrange(60)}"
+        evicted.discard(description)
+        evicted.update(table.use(description, when, rng.randrange(1, 3)))
+        assert table.top == table.ranking()[:top_size]
+        assert len(table) <= max_size
+    assert not evicted & set(table.stats)
+
+
+def test_saved_table_restores_the_same_ranking():
+    rng = random.Random(7)
+    table = FrequencyTable(max_size=30, top_size=5)
+    for day in range(300):
+        table.use(f"Task {rng.randrange(50)}", NOW + day * DAY)
+    restored = FrequencyTable.from_dict(table.to_dict(), max_size=30, top_size=5)
+    assert restored.ranking() == table.ranking()
+    assert restored.top == table.top
+    
+    # Fewer slots evict the lowest ranked on restore
+    smaller = FrequencyTable.from_dict(table.to_dict(), max_size=10, top_size=5)
+    assert smaller.ranking() == table.ranking()[:10]
+
+
+def test_plain_counts_are_dated_by_their_last_entry(entry_at):
+    entries = [entry_at(2024, 1, 5, 9, description="Old"), entry_at(2024, 3, 5, 9, description="Recent")]
+    table = FrequencyTable.from_saved({"Old": 5, "Recent": 5, "Reset": 9}, entries)
+    assert table.stats["Recent"][1] == entries[1].end
+    # A description without entries is dated like the oldest of the others
+    assert table.stats["Reset"][1] == entries[0].end
+    assert table.ranking() == ["Recent", "Reset", "Old"]
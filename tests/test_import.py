@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from timekeeper.storage import JournalStore, open_store
+
+LEGACY_CONFIG = {
+    "sheets": {
+        "Work": {
+            "entries": {
+                "2024-03-05": [
+                    {"date": "2024-03-05", "start_time": "09:00:00", "end_time": "10:30:00",
+                     "duration": "1h 30m 0s", "description": "Fix bug"},
+                    {"date": "2024-03-05", "start_time": "23:30:00", "end_time": "00:15:00",
+                     "duration": "0h 45m 0s", "description": "Deploy"}
+                ],
+                "2024-04-01": [
+                    {"date": "2024-04-01", "start_time": "08:00:00", "end_time": "08:20:00",
+                     "duration": "0h 20m 0s", "description": "Fix bug"}
+                ]
+            },
+            "frequency": {"Fix bug": 5, "Deploy": 1}
+        }
+    }
+}
+
+
+def folder_files(folder):
+    """Return {name: bytes} of the files directly in a folder"""
+    files = {}
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                files[name] = f.read()
+    return files
+
+
+@pytest.mark.parametrize("mode", ["segments", "sqlite"])
+def test_import_of_a_legacy_config_leaves_it_untouched(tmp_path, mode):
+    config_file = tmp_path / "sheets_config.json"
+    config_file.write_text(json.dumps(LEGACY_CONFIG), encoding="utf-8")
+    before = folder_files(tmp_path)
+    
+    store = open_store(mode, str(config_file))
+    store.load()
+    try:
+        imported = list(store.iter_entries("Work", newest_first=False))
+        assert [(entry.duration, entry.description) for entry in imported] == [
+            (5400, "Fix bug"), (2700, "Deploy"), (1200, "Fix bug")]
+        assert dict(store.description_counts("Work")) == {"Fix bug": 5, "Deploy": 1}
+        assert store.rollup_total("Work", "days", "2024-03-05") == 5400 + 2700
+    finally:
+        store.close()
+    
+    # No rewrite in the new layout and no journal next to the source
+    after = {name: data for name, data in folder_files(tmp_path).items() if name in before or name.endswith(".journal")}
+    assert after == before
+
+
+@pytest.mark.parametrize("mode", ["segments", "sqlite"])
+def test_import_replays_the_journal_without_writing_it(tmp_path, mode, entry_at):
+    config_file = str(tmp_path / "sheets_config.json")
+    source = JournalStore(config_file)
+    source.load()
+    source.add_sheet("Work")
+    source.add_entry("Work", entry_at(2024, 1, 31, 23, 30, description="Late"))
+    source.save()
+    source.add_entry("Work", entry_at(2024, 2, 1, 9, description="Early"))
+    source.close()
+    before = folder_files(tmp_path)
+    
+    store = open_store(mode, config_file)
+    store.load()
+    try:
+        assert list(store.iter_entries("Work", newest_first=False)) == [
+            entry_at(2024, 1, 31, 23, 30, description="Late"), entry_at(2024, 2, 1, 9, description="Early")]
+    finally:
+        store.close()
+    assert {name: folder_files(tmp_path)[name] for name in before} == before
+    
+    # The second load reads the imported store, not the config file again
+    store = open_store(mode, config_file)
+    store.load()
+    try:
+        assert store.count_entries("Work") == 2
+    finally:
+        store.close()
@@ -0,0 +1,79 @@
+import json
+
+from timekeeper.storage import JournalStore
+
+
+def open_journal(tmp_path, **kwargs):
+    store = JournalStore(str(tmp_path / "sheets_config.json"), **kwargs)
+    store.load()
+    return store
+
+
+def entries(store, sheet_name):
+    return list(store.iter_entries(sheet_name, newest_first=False))
+
+
+def test_replay_restores_every_change(tmp_path, entry_at):
+    store = open_journal(tmp_path)
+    store.add_sheet("Work")
+    store.add_sheet("Home")
+    added = [entry_at(2024, 3, day, 9, description=f"Task {day % 2}") for day in range(1, 6)]
+    for entry in added:
+        store.add_entry("Work", entry)
+    store.remove_sheet("Home")
+    store.close()
+    
+    # Nothing was folded into the snapshot: the journal alone holds the changes
+    assert not (tmp_path / "sheets_config.json").exists()
+    store = open_journal(tmp_path)
+    assert store.sheet_names() == ["Work"]
+    assert entries(store, "Work") == added
+    assert dict(store.description_counts("Work")) == {"Task 0": 2, "Task 1": 3}
+    assert store.rollup_total("Work", "days", "2024-03-01") == 3600
+
+
+def test_replay_skips_a_torn_last_line(tmp_path, entry_at):
+    store = open_journal(tmp_path)
+    store.add_sheet("Work")
+    store.add_entry("Work", entry_at(2024, 3, 1, 9))
+    store.close()
+    with open(tmp_path / "sheets_config.journal", "a", encoding="utf-8") as f:
+        f.write('{"op": "entry", "sheet": "Work", "entry": {"sta')
+    
+    store = open_journal(tmp_path)
+    assert entries(store, "Work") == [entry_at(2024, 3, 1, 9)]
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path, entry_at):
+    store = open_journal(tmp_path, compact_threshold=1)
+    store.add_sheet("Work")
+    added = [entry_at(2024, 3, day, 9) for day in range(1, 4)]
+    for entry in added:
+        store.add_entry("Work", entry)
+    store.close()
+    
+    assert (tmp_path / "sheets_config.journal").read_text(encoding="utf-8") == ""
+    with open(tmp_path / "sheets_config.json", encoding="utf-8") as f:
+        assert json.load(f)["journal_seq"] == 4
+    assert entries(open_journal(tmp_path), "Work") == added
+
+
+def test_records_already_in_the_snapshot_are_not_replayed(tmp_path, entry_at):
+    store = open_journal(tmp_path)
+    store.add_sheet("Work")
+    store.add_entry("Work", entry_at(2024, 3, 1, 9))
+    store.flush()
+    journal = (tmp_path / "sheets_config.journal").read_text(encoding="utf-8")
+    store.save()
+    store.add_entry("Work", entry_at(2024, 3, 2, 9))
+    store.close()
+    
+    # As after a crash between writing the snapshot and trimming the journal
+    with open(tmp_path / "sheets_config.journal", "r+", encoding="utf-8") as f:
+        newer = f.read()
+        f.seek(0)
+        f.write(journal + newer)
+    
+    store = open_journal(tmp_path)
+    assert entries(store, "Work") == [entry_at(2024, 3, 1, 9), entry_at(2024, 3, 2, 9)]
+    assert store.count_entries("Work") == 2
@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from timekeeper.segment_store import ArchiveCache, SegmentStore, entry_month
+
+
+@pytest.fixture
+def folder(tmp_path):
+    return str(tmp_path / "sheets_config.segments")
+
+
+def fill(folder, entries, **kwargs):
+    """Write entries to a new segment store and close it"""
+    store = SegmentStore(folder, **kwargs)
+    store.load()
+    store.add_sheet("Work")
+    for entry in entries:
+        store.add_entry("Work", entry)
+    store.close()
+
+
+def test_recent_months_follow_the_given_today(folder, entry_at):
+    fill(folder, [entry_at(2025, month, 10, 9) for month in range(1, 13)])
+    
+    store = SegmentStore(folder, archive_after_months=3, today=datetime(2025, 12, 15))
+    store.load()
+    try:
+        assert sorted(month for _, month in store.segments) == ["2025-11", "2025-12"]
+    finally:
+        store.close()
+    
+    # The months older than three before that today were archived, whatever the real date
+    store = SegmentStore(folder, today=datetime(2025, 12, 15))
+    store.load()
+    try:
+        assert sorted(store.sheets["Work"]["archived"]) == [f"2025-{month:02d}" for month in range(1, 9)]
+    finally:
+        store.close()
+
+
+TODAY = datetime(2025, 12, 15)
+
+
+@pytest.fixture
+def year_of_months(folder, entry_at):
+    """Two entries in each month of 2025, written to a segment store"""
+    entries = [entry_at(2025, month, day, 9, description=f"Month {month}") for month in range(1, 13) for day in (3, 20)]
+    fill(folder, entries, today=TODAY)
+    return entries
+
+
+def month_entries(store, month):
+    return list(store.iter_between("Work", f"{month}-01", f"{month}-28", newest_first=False))
+
+
+@pytest.mark.parametrize("archive_format", ["xz", "gz"])
+def test_archived_months_read_back_and_take_new_entries(folder, year_of_months, entry_at, archive_format):
+    store = SegmentStore(folder, archive_after_months=3, archive_format=archive_format, today=TODAY)
+    store.load()
+    store.close()
+    sheet_dir = os.path.join(folder, "s1")
+    assert sorted(os.listdir(sheet_dir))[:2] == [f"2025-01.json.{archive_format}", f"2025-02.json.{archive_format}"]
+    assert "2025-09.json" in os.listdir(sheet_dir)
+    
+    store = SegmentStore(folder, max_segments=1, today=TODAY)
+    store.load()
+    try:
+        assert list(store.iter_entries("Work", newest_first=False)) == year_of_months
+        # Written back to the archive, and the cached text of the old file is not read again
+        added = entry_at(2025, 2, 10, 14, description="Late addition")
+        store.add_entry("Work", added)
+        store.flush()
+        for month in ("2025-05", "2025-06"):
+            month_entries(store, month)
+        assert ("Work", "2025-02") not in store.segments
+        assert month_entries(store, "2025-02") == [year_of_months[2], added, year_of_months[3]]
+    finally:
+        store.close()
+    assert f"2025-02.json.{archive_format}" in os.listdir(sheet_dir) and "2025-02.json" not in os.listdir(sheet_dir)
+    
+    store = SegmentStore(folder, today=TODAY)
+    store.load()
+    try:
+        assert store.count_entries("Work") == len(year_of_months) + 1
+        assert month_entries(store, "2025-02")[1] == added
+    finally:
+        store.close()
+
+
+def test_archive_cache_drops_least_recently_used_text():
+    cache = ArchiveCache(max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+    cache.put("c", "cccc")
+    assert cache.get("b") is None and cache.get("a") == "aaaa" and cache.size == 8
+    
+    cache.discard("a")
+    assert cache.get("a") is None and cache.size == 4
+    # A text larger than the cache is still kept until the next one arrives
+    cache.put("d", "d" * 20)
+    assert cache.get("d") == "d" * 20 and cache.get("c") is None
+
+
+def test_old_months_are_evicted_and_read_again(folder, year_of_months):
+    store = SegmentStore(folder, max_segments=2, today=TODAY)
+    store.load()
+    try:
+        assert sorted(month for _, month in store.segments) == ["2025-11", "2025-12"]
+        for month in ("2025-01", "2025-02", "2025-03", "2025-04"):
+            assert month_entries(store, month) == [entry for entry in year_of_months if entry_month(entry) == month]
+        # The two least recently read old months were dropped; recent months always stay
+        assert sorted(month for _, month in store.segments) == ["2025-03", "2025-04", "2025-11", "2025-12"]
+        
+        assert month_entries(store, "2025-01") == year_of_months[:2]
+        assert sorted(month for _, month in store.segments) == ["2025-01", "2025-04", "2025-11", "2025-12"]
+    finally:
+        store.close()
@@ -0,0 +1,131 @@
+import sqlite3
+
+import pytest
+
+from timekeeper.sqlite_store import SCHEMA_VERSION, SqliteStore
+from timekeeper.storage import JournalStore
+
+# Schema of version 2 databases: plain description counts, before the decay columns
+SCHEMA_V2 = """
+CREATE TABLE sheets (name TEXT PRIMARY KEY);
+CREATE TABLE entries (
+    id INTEGER PRIMARY KEY,
+    sheet TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE INDEX entries_sheet_start ON entries (sheet, start_ts);
+CREATE TABLE frequency (
+    sheet TEXT NOT NULL,
+    description TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (sheet, description)
+);
+CREATE INDEX frequency_sheet_count ON frequency (sheet, count);
+CREATE TABLE rollups (
+    sheet TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (sheet, kind, key)
+);
+PRAGMA user_version = 2;
+"""
+
+
+@pytest.fixture
+def v2_database(tmp_path, entry_at):
+    path = str(tmp_path / "sheets_config.db")
+    entry = entry_at(2024, 3, 5, 9, minutes=90, description="Fix bug")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_V2)
+    with conn:
+        conn.execute("INSERT INTO sheets (name) VALUES ('Work')")
+        conn.execute("INSERT INTO entries (sheet, start_ts, end_ts, duration, description) VALUES (?, ?, ?, ?, ?)",
+                     ("Work", entry.start, entry.end, entry.duration, entry.description))
+        conn.execute("INSERT INTO frequency (sheet, description, count) VALUES ('Work', 'Fix bug', 4)")
+    conn.close()
+    return path
+
+
+def schema_state(path):
+    """Return the user_version and the frequency columns and indexes of a database"""
+    conn = sqlite3.connect(path)
+    try:
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(frequency)")]
+        indexes = sorted(row[1] for row in conn.execute("PRAGMA index_list(frequency)"))
+        return version, columns, indexes
+    finally:
+        conn.close()
+
+
+def test_upgrade_dates_plain_counts(v2_database, entry_at):
+    store = SqliteStore(v2_database)
+    store.load()
+    try:
+        frequency = store.description_frequency("Work")
+        assert frequency.count("Fix bug") == 4
+        assert frequency.stats["Fix bug"][1] == entry_at(2024, 3, 5, 9, minutes=90).end
+    finally:
+        store.close()
+    version, columns, indexes = schema_state(v2_database)
+    assert version == SCHEMA_VERSION
+    assert "log_weight" in columns and "frequency_sheet_count" not in indexes
+
+
+def test_failed_upgrade_leaves_the_database_as_it_was(v2_database):
+    before = schema_state(v2_database)
+    
+    class FailingStore(SqliteStore):
+        def date_frequency(self):
+            super().date_frequency()
+            raise RuntimeError("interrupted")
+    
+    store = FailingStore(v2_database)
+    with pytest.raises(RuntimeError):
+        store.load()
+    store.close()
+    assert schema_state(v2_database) == before
+    
+    # The next start upgrades it normally
+    store = SqliteStore(v2_database)
+    store.load()
+    try:
+        assert store.description_counts("Work") == [("Fix bug", 4)]
+    finally:
+        store.close()
+
+
+def test_failed_import_is_tried_again(tmp_path, entry_at):
+    config_file = str(tmp_path / "sheets_config.json")
+    source = JournalStore(config_file)
+    source.load()
+    source.add_sheet("Work")
+    added = [entry_at(2024, 3, day, 9) for day in range(1, 4)]
+    for entry in added:
+        source.add_entry("Work", entry)
+    source.close()
+    db_file = str(tmp_path / "sheets_config.db")
+    
+    class FailingStore(SqliteStore):
+        def insert_row(self, sheet_name, entry):
+            if entry == added[-1]:
+                raise OSError("disk full")
+            super().insert_row(sheet_name, entry)
+    
+    store = FailingStore(db_file, import_file=config_file)
+    with pytest.raises(OSError):
+        store.load()
+    store.close()
+    
+    # Neither the schema nor part of the rows were kept, so the database still counts as new
+    store = SqliteStore(db_file, import_file=config_file)
+    store.load()
+    try:
+        assert list(store.iter_entries("Work", newest_first=False)) == added
+        assert store.rollup_total("Work", "days", "2024-03-03") == 3600
+    finally:
+        store.close()
@@ -0,0 +1,100 @@
+import pytest
+
+from timekeeper.entries import entry_date
+from timekeeper.segment_store import SegmentStore
+from timekeeper.storage import open_store
+
+STORAGE_MODES = ["segments", "journal", "json", "sqlite"]
+
+
+@pytest.fixture
+def boundary_entries(entry_at):
+    """Entries around month ends, one crossing midnight into a new month, added out of order"""
+    return [
+        entry_at(2024, 2, 1, 9, description="February"),
+        entry_at(2023, 12, 31, 22, description="December"),
+        entry_at(2024, 1, 31, 23, 30, minutes=90, description="Across midnight"),
+        entry_at(2024, 2, 29, 10, description="Leap day"),
+        entry_at(2024, 3, 1, 0, 5, description="March"),
+        entry_at(2024, 1, 31, 8, description="January"),
+        entry_at(2024, 2, 1, 9, 30, description="February later"),
+    ]
+
+
+def newest_first(entries):
+    return sorted(entries, key=lambda entry: entry.start, reverse=True)
+
+
+def open_filled(mode, tmp_path, entries):
+    """Open a store of a mode, add entries, and reopen it so they are read back from disk"""
+    config_file = str(tmp_path / "sheets_config.json")
+    store = open_store(mode, config_file)
+    store.load()
+    store.add_sheet("Work")
+    for entry in entries:
+        store.add_entry("Work", entry)
+    store.close()
+    store = open_store(mode, config_file)
+    store.load()
+    return store
+
+
+@pytest.mark.parametrize("mode", STORAGE_MODES)
+@pytest.mark.parametrize("start_date, end_date", [
+    ("2024-01-31", "2024-02-01"),
+    ("2024-02-01", "2024-02-29"),
+    ("2024-02-29", "2024-03-01"),
+    ("2023-12-01", "2024-01-31"),
+    (None, None),
+])
+def test_entries_between_spans_months(mode, tmp_path, boundary_entries, start_date, end_date):
+    store = open_filled(mode, tmp_path, boundary_entries)
+    try:
+        expected = [entry for entry in newest_first(boundary_entries)
+                    if (start_date is None or start_date <= entry_date(entry) <= end_date)]
+        assert store.entries_between("Work", start_date, end_date) == expected
+        assert list(store.iter_between("Work", start_date, end_date, newest_first=False)) == expected[::-1]
+        assert store.count_between("Work", start_date, end_date) == len(expected)
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("mode", STORAGE_MODES)
+def test_entry_position_and_range_across_months(mode, tmp_path, boundary_entries, entry_at):
+    store = open_filled(mode, tmp_path, boundary_entries)
+    try:
+        ordered = newest_first(boundary_entries)
+        for position, entry in enumerate(ordered):
+            assert store.entry_position("Work", entry) == position
+        assert store.entry_range("Work", 2, 3) == ordered[2:5]
+        
+        # A new entry lands at its place in the newest-first order
+        added = entry_at(2024, 1, 31, 12, description="Added")
+        store.add_entry("Work", added)
+        ordered = newest_first(boundary_entries + [added])
+        assert store.entry_position("Work", added) == ordered.index(added)
+        assert store.entry_range("Work", 0, len(ordered)) == ordered
+    finally:
+        store.close()
+
+
+def test_segments_read_back_evicted_months(tmp_path, boundary_entries):
+    folder = str(tmp_path / "sheets_config.segments")
+    store = SegmentStore(folder, max_segments=1)
+    store.load()
+    store.add_sheet("Work")
+    for entry in boundary_entries:
+        store.add_entry("Work", entry)
+    store.close()
+    
+    store = SegmentStore(folder, max_segments=1)
+    store.load()
+    try:
+        ordered = newest_first(boundary_entries)
+        # Every read walks months that had to be evicted and read again
+        for _ in range(2):
+            assert store.entries_between("Work", "2023-12-31", "2024-03-01") == ordered
+            assert [store.entry_position("Work", entry) for entry in ordered] == list(range(len(ordered)))
+        assert len(store.segments) <= 3
+    finally:
+        store.close()
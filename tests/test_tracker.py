@@ -0,0 +1,66 @@
+import pytest
+
+from timekeeper import cli, tracker
+from timekeeper.lockfile import StoreLocked
+from timekeeper.tracker import Tracker
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    return str(tmp_path / "sheets_config.json")
+
+
+def test_second_tracker_is_refused_until_the_first_closes(config_file):
+    first = Tracker(config_file, "json")
+    first.load()
+    second = Tracker(config_file, "json")
+    with pytest.raises(StoreLocked):
+        second.load()
+    first.close()
+    
+    second.load()
+    try:
+        assert second.store.sheet_names() == ["Default"]
+    finally:
+        second.close()
+
+
+def test_failed_load_closes_the_store_and_releases_the_lock(config_file, monkeypatch):
+    opened = []
+    
+    class BrokenStore:
+        closed = False
+        
+        def load(self):
+            raise ValueError("corrupt config")
+        
+        def close(self):
+            self.closed = True
+    
+    def open_broken(*args):
+        opened.append(BrokenStore())
+        return opened[-1]
+    
+    monkeypatch.setattr(tracker, "open_store", open_broken)
+    broken = Tracker(config_file, "json")
+    with pytest.raises(ValueError):
+        broken.load()
+    assert opened[0].closed and broken.store is None
+    
+    monkeypatch.undo()
+    working = Tracker(config_file, "json")
+    working.load()
+    working.close()
+
+
+def test_cli_fails_clearly_while_the_sheets_are_open(config_file, capsys):
+    tracker = Tracker(config_file, "json")
+    tracker.load()
+    try:
+        assert cli.main(["--config", config_file, "--storage", "json", "start", "Default"]) == 1
+        assert "has these sheets open" in capsys.readouterr().err
+        # Only sessions are read, so status works alongside the GUI
+        assert cli.main(["--config", config_file, "--storage", "json", "status"]) == 0
+    finally:
+        tracker.close()
+    assert cli.main(["--config", config_file, "--storage", "json", "start", "Default"]) == 0
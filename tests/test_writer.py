@@ -0,0 +1,103 @@
+import threading
+import time
+
+from timekeeper.writer import BackgroundWriter
+
+
+class Recorder:
+    """A write callback counting its calls, failing the first `failures` of them"""
+    
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+    
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.calls <= self.failures:
+            raise OSError("disk full")
+
+
+def test_a_burst_of_changes_is_written_once():
+    write = Recorder()
+    writer = BackgroundWriter(write, debounce=0.2)
+    for _ in range(50):
+        writer.mark_dirty()
+    assert writer.pending == 50
+    time.sleep(0.6)
+    assert write.calls == 1 and writer.pending == 0
+    
+    # Nothing changed since, so a flush does not write again
+    writer.flush()
+    assert write.calls == 1
+    writer.close()
+
+
+def test_steady_changes_are_written_within_max_delay():
+    write = Recorder()
+    writer = BackgroundWriter(write, debounce=0.2, max_delay=0.3)
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        writer.mark_dirty()
+        time.sleep(0.02)
+    assert write.calls >= 2
+    writer.close()
+
+
+def test_flush_writes_without_waiting_for_the_quiet_period():
+    write = Recorder()
+    writer = BackgroundWriter(write, debounce=60)
+    writer.mark_dirty()
+    start = time.monotonic()
+    writer.flush()
+    assert write.calls == 1 and time.monotonic() - start < 5
+    writer.close()
+
+
+def test_changes_made_during_a_write_are_written_next():
+    write = Recorder()
+    write.release.clear()
+    writer = BackgroundWriter(write, debounce=60)
+    writer.mark_dirty()
+    flusher = threading.Thread(target=writer.flush)
+    flusher.start()
+    assert write.started.wait(5)
+    writer.mark_dirty()
+    write.release.set()
+    flusher.join(5)
+    writer.flush()
+    assert write.calls == 2
+    writer.close()
+
+
+def test_failed_write_is_retried_and_reported():
+    write = Recorder(failures=1)
+    writer = BackgroundWriter(write, debounce=60)
+    writer.mark_dirty()
+    writer.flush()
+    assert write.calls == 1 and isinstance(writer.last_error, OSError)
+    # The changes stay pending for the next write
+    assert writer.dirty
+    
+    writer.flush()
+    assert write.calls == 2 and writer.last_error is None and not writer.dirty
+    writer.close()
+
+
+def test_close_gives_up_on_a_failing_write():
+    write = Recorder(failures=1000)
+    writer = BackgroundWriter(write, debounce=60)
+    writer.mark_dirty()
+    writer.close()
+    assert not writer.thread.is_alive()
+    assert isinstance(writer.last_error, OSError)
+    
+    # Later flushes return at once instead of waiting on the stopped thread
+    calls = write.calls
+    writer.mark_dirty()
+    writer.flush()
+    assert write.calls == calls
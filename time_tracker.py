@@ -1,10 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-import json
-import os
+import logging
 from datetime import datetime
+import multiprocessing
 import threading
 import time
+from timekeeper.descriptions import DEFAULT_SUGGESTIONS
+from timekeeper.entries import entry_row, format_duration
+from timekeeper.export import (COLUMNAR_FORMAT, TEXT_FORMATS, ExportCancelled, export_all_sheets, export_folder,
+                               export_sheet, export_weeks, month_range, parse_date, range_file_stem,
+                               week_file_stem, week_range)
+from timekeeper.instrumentation import BUCKET_BOUNDS_MS, bucket_label, instrumentation, timed, timer
+from timekeeper.lockfile import StoreLocked
+from timekeeper.reports import SheetColumns, group_totals, total_seconds
+from timekeeper.rollups import iso_week
+from timekeeper.tracker import (DEFAULT_ARCHIVE_AFTER_MONTHS, DEFAULT_ARCHIVE_FORMAT, DEFAULT_CONFIG_FILE,
+                                DEFAULT_STORAGE_MODE, Tracker)
+
+
+logger = logging.getLogger("timekeeper.gui")
 
 class TimeTracker:
     def __init__(self, root):
@@ -14,18 +28,37 @@ class TimeTracker:
         self.root.resizable(True, True)
         
         # Multi-sheet data storage
-        self.sheets_config_file = "sheets_config.json"
-        self.sheets = {}  # {"Sheet Name": {"entries": {}, "frequency": {}, "session": None, "start_time": None, "paused": False, "paused_elapsed": 0}}
+        self.sheets_config_file = DEFAULT_CONFIG_FILE
+        self.storage_mode = DEFAULT_STORAGE_MODE  # "segments" keeps one file per month, "journal" appends each change, "json" rewrites the whole file, "sqlite" uses a database
+        self.archive_after_months = DEFAULT_ARCHIVE_AFTER_MONTHS  # Older months are compressed ("segments" mode; None disables)
+        self.archive_format = DEFAULT_ARCHIVE_FORMAT  # "xz" (lzma) or "gz" (gzip)
+        self.tracker = Tracker(self.sheets_config_file, self.storage_mode,
+                               self.archive_after_months, self.archive_format)  # Sessions and sheets, shared with the CLI
+        self.store = None  # Persisted entries and description frequency
+        self.sheets = {}  # Tracking state per sheet, owned by the tracker: {"Sheet Name": {"session": None, "start_time": None, "paused": False, "paused_elapsed": 0}}
         self.current_sheet = None
         self.sheet_tabs = {}  # Store tab frames
-        self.sheet_trees = {}  # Store treeview widgets per sheet
-        self.tracking_threads = {}  # Store tracking threads per sheet
+        self.sheet_tables = {}  # Store virtual tables (treeview + scrollbar) per sheet, built when first shown
+        self.reports_tab = None  # Totals tab, kept after the sheet tabs
+        self.diagnostics_window = None  # Open DiagnosticsWindow, if any
+        
+        # (phase, seconds) of startup, logged once the window is first idle
+        self.startup_phases = []
+        self.startup_clock = time.perf_counter()
         
         # Load sheets configuration
         self.load_sheets_config()
+        self.mark_startup("load sheets")
         
         # Create GUI
         self.create_widgets()
+        self.mark_startup("create widgets")
+        
+        # Flush pending writes before the window closes
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Start the once-a-second ticker for elapsed times
+        self.tick()
         
         # Select first sheet
         if self.sheets:
@@ -34,55 +67,30 @@ class TimeTracker:
             self.notebook.select(0)
             self.update_table()
             self.update_button_states()
+        self.mark_startup("first table")
+        self.root.after_idle(self.log_startup)
+    
+    def mark_startup(self, phase):
+        """Record the time spent in a startup phase since the previous one"""
+        now = time.perf_counter()
+        self.startup_phases.append((phase, now - self.startup_clock))
+        self.startup_clock = now
     
+    def log_startup(self):
+        """Log the startup timing breakdown once the first window contents are drawn"""
+        self.mark_startup("first draw")
+        phases = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.startup_phases)
+        total = sum(seconds for _, seconds in self.startup_phases)
+        logger.info("Startup: %s (total %.0f ms, sheets: %d, tables built: %d)",
+                    phases, total * 1000, len(self.sheets), len(self.sheet_tables))
+    
+    @timer()
     def load_sheets_config(self):
         """Load sheets configuration from file"""
-        if os.path.exists(self.sheets_config_file):
-            try:
-                with open(self.sheets_config_file, 'r') as f:
-                    data = json.load(f)
-                    self.sheets = data.get("sheets", {})
-                    
-                    # Ensure each sheet has all required keys
-                    for sheet_name in self.sheets:
-                        if "session" not in self.sheets[sheet_name]:
-                            self.sheets[sheet_name]["session"] = None
-                        if "start_time" not in self.sheets[sheet_name]:
-                            self.sheets[sheet_name]["start_time"] = None
-                        if "paused" not in self.sheets[sheet_name]:
-                            self.sheets[sheet_name]["paused"] = False
-                        if "paused_elapsed" not in self.sheets[sheet_name]:
-                            self.sheets[sheet_name]["paused_elapsed"] = 0
-            except:
-                self.sheets = {}
-        
-        # Create default sheet if none exist
-        if not self.sheets:
-            self.sheets["Default"] = {
-                "entries": {},
-                "frequency": {},
-                "session": None,
-                "start_time": None,
-                "paused": False,
-                "paused_elapsed": 0
-            }
-    
-    def save_sheets_config(self):
-        """Save sheets configuration to file"""
-        # Don't save runtime tracking state
-        save_data = {"sheets": {}}
-        for sheet_name, sheet_data in self.sheets.items():
-            save_data["sheets"][sheet_name] = {
-                "entries": sheet_data["entries"],
-                "frequency": sheet_data["frequency"],
-                "session": None,
-                "start_time": None,
-                "paused": False,
-                "paused_elapsed": 0
-            }
-        
-        with open(self.sheets_config_file, 'w') as f:
-            json.dump(save_data, f, indent=2)
+        # Creates a default sheet if none exist and restores running sessions
+        self.tracker.load()
+        self.store = self.tracker.store
+        self.sheets = self.tracker.sheets
     
     def create_widgets(self):
         """Create the main GUI widgets"""
@@ -132,14 +140,47 @@ class TimeTracker:
                                             cursor="hand2")
         self.remove_sheet_button.pack(side=tk.LEFT)
         
+        # Export All Sheets button
+        self.export_all_button = tk.Button(sheet_mgmt_frame,
+                                          text="📦 Export All Sheets",
+                                          command=self.export_all_sheets,
+                                          font=("Arial", 10, "bold"),
+                                          bg="#0078d4",
+                                          fg="white",
+                                          relief=tk.RAISED,
+                                          bd=2,
+                                          padx=15,
+                                          pady=5,
+                                          cursor="hand2")
+        self.export_all_button.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Diagnostics button
+        self.diagnostics_button = tk.Button(sheet_mgmt_frame,
+                                           text="⏲ Diagnostics",
+                                           command=self.show_diagnostics,
+                                           font=("Arial", 10, "bold"),
+                                           bg="#605e5c",
+                                           fg="white",
+                                           relief=tk.RAISED,
+                                           bd=2,
+                                           padx=15,
+                                           pady=5,
+                                           cursor="hand2")
+        self.diagnostics_button.pack(side=tk.RIGHT)
+        
         # Tab notebook
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
         
-        # Create tabs for all sheets
+        # Create tabs for all sheets (empty frames; each table is built when its tab is first shown)
         for sheet_name in self.sheets:
             self.create_sheet_tab(sheet_name)
+            self.update_tab_indicator(sheet_name)
+        
+        # Reports tab
+        self.reports_tab = ReportsTab(self.notebook, self.store)
+        self.notebook.add(self.reports_tab.frame, text="Reports")
         
         # Button frame
         button_frame = ttk.Frame(main_frame)
@@ -202,44 +243,63 @@ class TimeTracker:
         self.reset_button.pack(side=tk.LEFT)
         
         # Status bar
+        status_frame = ttk.Frame(main_frame)
+        status_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        status_frame.columnconfigure(0, weight=1)
+        
         self.status_var = tk.StringVar()
         self.status_var.set("Ready to track time")
-        status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, font=("Arial", 9))
-        status_bar.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, font=("Arial", 9))
+        status_bar.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        # Today / this week totals of the current sheet
+        self.totals_var = tk.StringVar()
+        totals_bar = ttk.Label(status_frame, textvariable=self.totals_var, relief=tk.SUNKEN, font=("Arial", 9))
+        totals_bar.grid(row=0, column=1, sticky=(tk.E,), padx=(5, 0))
+        
+        # Storage status (last write latency and queued changes)
+        self.storage_status_var = tk.StringVar()
+        storage_status_bar = ttk.Label(status_frame, textvariable=self.storage_status_var, relief=tk.SUNKEN, font=("Arial", 9))
+        storage_status_bar.grid(row=0, column=2, sticky=(tk.E,), padx=(5, 0))
         
         # Setup hover effects
         self.setup_button_hover_effects()
     
     def create_sheet_tab(self, sheet_name):
-        """Create a tab for a sheet"""
+        """Create a placeholder tab for a sheet; its table is built by build_sheet_table()"""
         # Create frame for this tab
         tab_frame = ttk.Frame(self.notebook)
-        self.notebook.add(tab_frame, text=sheet_name)
+        if self.reports_tab is not None:
+            self.notebook.insert(self.reports_tab.frame, tab_frame, text=sheet_name)
+        else:
+            self.notebook.add(tab_frame, text=sheet_name)
         self.sheet_tabs[sheet_name] = tab_frame
         
         # Configure frame
         tab_frame.columnconfigure(0, weight=1)
         tab_frame.rowconfigure(0, weight=1)
+    
+    def build_sheet_table(self, sheet_name):
+        """Create the table of a sheet's tab, the first time the tab is shown"""
+        tab_frame = self.sheet_tabs[sheet_name]
         
-        # Create treeview for table
+        # Create virtual table (only the rows in view are put in the treeview)
         columns = ("Date", "Start Time", "End Time", "Duration", "Description")
-        tree = ttk.Treeview(tab_frame, columns=columns, show="headings", height=15)
+        table = VirtualTable(tab_frame, columns,
+                             fetch_rows=lambda offset, limit: self.fetch_table_rows(sheet_name, offset, limit),
+                             count_rows=lambda: self.store.count_entries(sheet_name))
         
         # Configure columns
         for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=120, minwidth=100)
-        
-        # Scrollbar for table
-        scrollbar = ttk.Scrollbar(tab_frame, orient=tk.VERTICAL, command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+            table.tree.heading(col, text=col)
+            table.tree.column(col, width=120, minwidth=100)
         
         # Grid table and scrollbar
-        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        table.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        table.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
-        # Store tree reference
-        self.sheet_trees[sheet_name] = tree
+        # Store table reference
+        self.sheet_tables[sheet_name] = table
     
     def setup_button_hover_effects(self):
         """Setup hover effects for buttons"""
@@ -251,6 +311,14 @@ class TimeTracker:
         self.remove_sheet_button.bind("<Enter>", lambda e: self.remove_sheet_button.configure(bg="#b91d47"))
         self.remove_sheet_button.bind("<Leave>", lambda e: self.remove_sheet_button.configure(bg="#d13438"))
         
+        # Export all sheets button
+        self.export_all_button.bind("<Enter>", lambda e: self.export_all_button.configure(bg="#106ebe"))
+        self.export_all_button.bind("<Leave>", lambda e: self.export_all_button.configure(bg="#0078d4"))
+        
+        # Diagnostics button
+        self.diagnostics_button.bind("<Enter>", lambda e: self.diagnostics_button.configure(bg="#484644"))
+        self.diagnostics_button.bind("<Leave>", lambda e: self.diagnostics_button.configure(bg="#605e5c"))
+        
         # Export button
         self.export_button.bind("<Enter>", lambda e: self.export_button.configure(bg="#0e6e0e"))
         self.export_button.bind("<Leave>", lambda e: self.export_button.configure(bg="#107c10"))
@@ -263,9 +331,16 @@ class TimeTracker:
         """Handle tab change event"""
         try:
             tab_id = self.notebook.select()
-            tab_text = self.notebook.tab(tab_id, "text")
-            # Remove tracking indicator if present
-            self.current_sheet = tab_text.replace(" ⏱", "").replace(" ⏸", "")
+            if self.reports_tab is not None and str(self.reports_tab.frame) == tab_id:
+                # Tracking buttons keep acting on the last selected sheet
+                self.reports_tab.show(list(self.sheets), self.current_sheet)
+                return
+            
+            # Tab text carries tracking indicators, so look the sheet up by its frame
+            for sheet_name, tab_frame in self.sheet_tabs.items():
+                if str(tab_frame) == tab_id:
+                    self.current_sheet = sheet_name
+                    break
             self.update_table()
             self.update_button_states()
             self.update_status()
@@ -279,20 +354,11 @@ class TimeTracker:
         
         if dialog.result:
             sheet_name = dialog.result
-            self.sheets[sheet_name] = {
-                "entries": {},
-                "frequency": {},
-                "session": None,
-                "start_time": None,
-                "paused": False,
-                "paused_elapsed": 0
-            }
+            self.tracker.add_sheet(sheet_name)
             self.create_sheet_tab(sheet_name)
-            self.save_sheets_config()
             
             # Select the new tab
-            tab_count = len(self.notebook.tabs())
-            self.notebook.select(tab_count - 1)
+            self.notebook.select(self.sheet_tabs[sheet_name])
             self.current_sheet = sheet_name
             self.update_button_states()
     
@@ -312,20 +378,15 @@ class TimeTracker:
         
         if messagebox.askyesno("Confirm Removal",
                               f"Are you sure you want to remove the sheet '{self.current_sheet}'?\n\nAll data on this sheet will be permanently deleted."):
-            # Get current tab index
-            current_tab = self.notebook.index(self.notebook.select())
-            
             # Remove sheet data
-            del self.sheets[self.current_sheet]
-            del self.sheet_trees[self.current_sheet]
+            self.tracker.remove_sheet(self.current_sheet)
+            self.sheet_tables.pop(self.current_sheet, None)
             
             # Remove tab
-            self.notebook.forget(current_tab)
+            self.notebook.forget(self.sheet_tabs[self.current_sheet])
             del self.sheet_tabs[self.current_sheet]
             
-            # Save and select another tab
-            self.save_sheets_config()
-            
+            # Select another tab
             # Select first available tab
             if self.sheets:
                 self.notebook.select(0)
@@ -356,39 +417,17 @@ class TimeTracker:
         if not self.current_sheet:
             return
         
-        sheet = self.sheets[self.current_sheet]
-        
-        # Pause other sheets if mode is 'pause'
-        if mode == 'pause':
-            for sheet_name in self.sheets:
-                if sheet_name != self.current_sheet:
-                    if self.sheets[sheet_name]["session"] is not None and not self.sheets[sheet_name]["paused"]:
-                        self.pause_sheet(sheet_name)
-        
-        # Start tracking
-        sheet["start_time"] = datetime.now()
-        sheet["session"] = sheet["start_time"].strftime("%Y-%m-%d %H:%M:%S")
-        sheet["paused"] = False
-        sheet["paused_elapsed"] = 0
+        # Pauses other sheets if mode is 'pause'
+        for sheet_name in self.tracker.start(self.current_sheet, mode):
+            self.update_tab_indicator(sheet_name)
         
-        # Update UI
+        # Update UI (the ticker keeps the elapsed time current)
         self.update_button_states()
         self.update_tab_indicator(self.current_sheet)
-        
-        # Start tracking thread
-        thread = threading.Thread(target=self.update_elapsed_time, args=(self.current_sheet,), daemon=True)
-        self.tracking_threads[self.current_sheet] = thread
-        thread.start()
     
     def pause_sheet(self, sheet_name):
         """Pause tracking on a sheet"""
-        sheet = self.sheets[sheet_name]
-        if sheet["session"] is not None and not sheet["paused"]:
-            # Calculate elapsed time so far
-            if sheet["start_time"]:
-                elapsed = (datetime.now() - sheet["start_time"]).total_seconds()
-                sheet["paused_elapsed"] = elapsed
-            sheet["paused"] = True
+        if self.tracker.pause(sheet_name):
             self.update_tab_indicator(sheet_name)
     
     def resume_tracking(self):
@@ -396,21 +435,10 @@ class TimeTracker:
         if not self.current_sheet:
             return
         
-        sheet = self.sheets[self.current_sheet]
-        if sheet["paused"]:
-            # Adjust start time to account for paused duration
-            paused_duration = sheet["paused_elapsed"]
-            sheet["start_time"] = datetime.now() - timedelta(seconds=paused_duration)
-            sheet["paused"] = False
-            
-            # Update UI
+        if self.tracker.resume(self.current_sheet):
+            # Update UI (the ticker keeps the elapsed time current)
             self.update_button_states()
             self.update_tab_indicator(self.current_sheet)
-            
-            # Restart tracking thread
-            thread = threading.Thread(target=self.update_elapsed_time, args=(self.current_sheet,), daemon=True)
-            self.tracking_threads[self.current_sheet] = thread
-            thread.start()
     
     def stop_tracking(self):
         """Stop tracking on current sheet"""
@@ -423,98 +451,73 @@ class TimeTracker:
             return
         
         end_time = datetime.now()
-        duration = end_time - sheet["start_time"]
         
         # Get description from user
         description = self.get_description()
         if description is None:  # User cancelled
-            sheet["session"] = None
-            sheet["start_time"] = None
-            sheet["paused"] = False
-            sheet["paused_elapsed"] = 0
+            self.tracker.discard(self.current_sheet)
             self.update_button_states()
             self.update_tab_indicator(self.current_sheet)
             self.update_status()
             return
         
-        # Format times
-        start_str = sheet["start_time"].strftime("%H:%M:%S")
-        end_str = end_time.strftime("%H:%M:%S")
-        duration_str = self.format_duration(duration)
-        date_str = sheet["start_time"].strftime("%Y-%m-%d")
-        
-        # Save entry
-        entry = {
-            "date": date_str,
-            "start_time": start_str,
-            "end_time": end_str,
-            "duration": duration_str,
-            "description": description
-        }
-        
-        # Add to entries
-        if date_str not in sheet["entries"]:
-            sheet["entries"][date_str] = []
-        sheet["entries"][date_str].append(entry)
-        
-        # Update frequency
-        if description in sheet["frequency"]:
-            sheet["frequency"][description] += 1
-        else:
-            sheet["frequency"][description] = 1
-        
-        # Save to file
-        self.save_sheets_config()
+        # Add to entries, update frequency and save; resets the session
+        entry = self.tracker.stop(self.current_sheet, description, end_time)
         
         # Update display
-        self.update_table()
-        
-        # Reset session
-        sheet["session"] = None
-        sheet["start_time"] = None
-        sheet["paused"] = False
-        sheet["paused_elapsed"] = 0
+        self.show_new_entry(self.current_sheet, entry)
+        self.update_reports()
+        self.update_totals_status()
         
         # Update UI
         self.update_button_states()
         self.update_tab_indicator(self.current_sheet)
-        self.status_var.set(f"[{self.current_sheet}] Session completed: {duration_str} - {description}")
+        self.status_var.set(f"[{self.current_sheet}] Session completed: {format_duration(entry.duration)} - {description}")
     
-    def update_elapsed_time(self, sheet_name):
-        """Update the status bar with elapsed time for a sheet"""
-        while True:
-            try:
-                sheet = self.sheets.get(sheet_name)
-                if not sheet or sheet["session"] is None or sheet["paused"]:
-                    break
-                
-                if sheet["start_time"] and sheet_name == self.current_sheet:
-                    elapsed = datetime.now() - sheet["start_time"]
-                    hours, remainder = divmod(elapsed.total_seconds(), 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    elapsed_str = f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
-                    self.status_var.set(f"[{sheet_name}] Tracking... Elapsed: {elapsed_str}")
-                
-                time.sleep(1)
-            except:
-                break
+    def tick(self):
+        """Update the elapsed time of every active sheet, once per wall-clock second"""
+        now = datetime.now()
+        for sheet_name, sheet in self.sheets.items():
+            if sheet["session"] is None or sheet["paused"]:
+                continue
+            
+            elapsed_str = self.format_elapsed((now - sheet["start_time"]).total_seconds())
+            self.set_tab_text(sheet_name, f"{sheet_name} ⏱ {elapsed_str}")
+            if sheet_name == self.current_sheet:
+                self.status_var.set(f"[{sheet_name}] Tracking... Elapsed: {elapsed_str}")
+        
+        self.update_totals_status()
+        self.update_storage_status()
+        
+        # Schedule the next tick right after the next second boundary
+        delay = 1000 - int(time.time() * 1000) % 1000
+        self.root.after(delay, self.tick)
+    
+    def format_elapsed(self, seconds):
+        """Format elapsed seconds as HH:MM:SS"""
+        hours, remainder = divmod(int(seconds), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    
+    def set_tab_text(self, sheet_name, text):
+        """Set the text of a sheet's tab"""
+        tab_frame = self.sheet_tabs.get(sheet_name)
+        if tab_frame is not None:
+            self.notebook.tab(tab_frame, text=text)
     
+    @timer()
     def update_tab_indicator(self, sheet_name):
         """Update tab text to show tracking status"""
-        for i, tab_id in enumerate(self.notebook.tabs()):
-            tab_text = self.notebook.tab(tab_id, "text")
-            # Remove existing indicators
-            clean_name = tab_text.replace(" ⏱", "").replace(" ⏸", "")
-            
-            if clean_name == sheet_name:
-                sheet = self.sheets[sheet_name]
-                if sheet["session"] is not None:
-                    if sheet["paused"]:
-                        self.notebook.tab(tab_id, text=f"{clean_name} ⏸")
-                    else:
-                        self.notebook.tab(tab_id, text=f"{clean_name} ⏱")
-                else:
-                    self.notebook.tab(tab_id, text=clean_name)
+        sheet = self.sheets[sheet_name]
+        if sheet["session"] is not None:
+            if sheet["paused"]:
+                elapsed_str = self.format_elapsed(sheet["paused_elapsed"])
+                self.set_tab_text(sheet_name, f"{sheet_name} ⏸ {elapsed_str}")
+            else:
+                elapsed_str = self.format_elapsed((datetime.now() - sheet["start_time"]).total_seconds())
+                self.set_tab_text(sheet_name, f"{sheet_name} ⏱ {elapsed_str}")
+        else:
+            self.set_tab_text(sheet_name, sheet_name)
     
     def update_button_states(self):
         """Update button states based on current sheet"""
@@ -539,8 +542,42 @@ class TimeTracker:
         else:
             self.remove_sheet_button.configure(state=tk.NORMAL)
     
+    def update_totals_status(self):
+        """Show the current sheet's tracked time today and this week from its rollup"""
+        if not self.current_sheet:
+            self.totals_var.set("")
+            return
+        
+        today = datetime.now().strftime("%Y-%m-%d")
+        day_total = self.store.rollup_total(self.current_sheet, "days", today)
+        week_total = self.store.rollup_total(self.current_sheet, "weeks", iso_week(today))
+        self.totals_var.set(f"Today: {format_duration(day_total)} | This week: {format_duration(week_total)}")
+    
+    def update_storage_status(self):
+        """Show write latency and queue depth of the storage writer"""
+        pending, latency, error = self.store.write_stats()
+        if error is not None:
+            text = f"Save failed: {error}"
+        elif latency is None:
+            text = f"Queue: {pending}"
+        else:
+            text = f"Last write: {latency * 1000:.0f} ms | Queue: {pending}"
+        self.storage_status_var.set(text)
+    
+    def on_close(self):
+        """Write pending changes and close the application"""
+        self.store.flush()
+        pending, latency, error = self.store.write_stats()
+        if error is not None:
+            if not messagebox.askyesno("Save Failed",
+                                      f"Could not save time entries:\n{error}\n\nClose anyway?"):
+                return
+        self.tracker.close()
+        self.root.destroy()
+    
     def update_status(self):
         """Update status bar"""
+        self.update_totals_status()
         if not self.current_sheet:
             self.status_var.set("Ready to track time")
             return
@@ -554,54 +591,47 @@ class TimeTracker:
         if not self.current_sheet:
             return None
         
-        sheet = self.sheets[self.current_sheet]
-        dialog = DescriptionDialog(self.root, sheet["frequency"])
+        with timed("DescriptionDialog"):
+            dialog = DescriptionDialog(self.root, self.tracker.description_index(self.current_sheet))
         self.root.wait_window(dialog.dialog)
         
         return dialog.result
     
-    def format_duration(self, duration):
-        """Format duration in human readable format"""
-        total_seconds = int(duration.total_seconds())
-        hours, remainder = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        
-        if hours > 0:
-            return f"{hours}h {minutes}m {seconds}s"
-        elif minutes > 0:
-            return f"{minutes}m {seconds}s"
-        else:
-            return f"{seconds}s"
-    
+    @timer()
     def update_table(self):
         """Update the table with current sheet entries"""
-        if not self.current_sheet or self.current_sheet not in self.sheet_trees:
+        if not self.current_sheet or self.current_sheet not in self.sheet_tabs:
             return
+        if self.current_sheet not in self.sheet_tables:
+            self.build_sheet_table(self.current_sheet)
         
-        tree = self.sheet_trees[self.current_sheet]
-        sheet = self.sheets[self.current_sheet]
+        # Skipped when the table already shows this version of the sheet
+        self.sheet_tables[self.current_sheet].refresh(self.store.version(self.current_sheet))
+    
+    def show_new_entry(self, sheet_name, entry):
+        """Insert a just-added entry into the sheet's table without rebuilding it"""
+        table = self.sheet_tables.get(sheet_name)
+        if table is None:
+            # Not built yet: it is filled when its tab is first shown
+            return
         
-        # Clear existing items
-        for item in tree.get_children():
-            tree.delete(item)
-        
-        # Add entries to table
-        all_entries = []
-        for date, day_entries in sheet["entries"].items():
-            for entry in day_entries:
-                all_entries.append((date, entry))
-        
-        # Sort by date (newest first)
-        all_entries.sort(key=lambda x: x[0], reverse=True)
-        
-        for date, entry in all_entries:
-            tree.insert("", "end", values=(
-                entry["date"],
-                entry["start_time"],
-                entry["end_time"],
-                entry["duration"],
-                entry["description"]
-            ))
+        version = self.store.version(sheet_name)
+        if table.version != version - 1:
+            # The table missed other changes too, so fetch it again
+            table.refresh(version)
+            return
+        
+        position = self.store.entry_position(sheet_name, entry)
+        table.insert_row(position, entry_row(entry), version)
+    
+    def update_reports(self):
+        """Recompute the reports tab if it is the one on screen"""
+        if self.reports_tab is not None and self.notebook.select() == str(self.reports_tab.frame):
+            self.reports_tab.refresh()
+    
+    def fetch_table_rows(self, sheet_name, offset, limit):
+        """Return table rows offset..offset+limit of a sheet (newest first)"""
+        return [entry_row(entry) for entry in self.store.entry_range(sheet_name, offset, limit)]
     
     def reset_entries(self):
         """Reset entries for current sheet"""
@@ -610,9 +640,10 @@ class TimeTracker:
         
         if messagebox.askyesno("Confirm Reset",
                               f"Are you sure you want to delete all time entries on sheet '{self.current_sheet}'?\n\nThis cannot be undone."):
-            self.sheets[self.current_sheet]["entries"] = {}
-            self.save_sheets_config()
+            self.tracker.reset_entries(self.current_sheet)
             self.update_table()
+            self.update_reports()
+            self.update_totals_status()
             self.status_var.set(f"[{self.current_sheet}] All entries cleared")
     
     def export_data(self):
@@ -620,14 +651,241 @@ class TimeTracker:
         if not self.current_sheet:
             return
         
-        sheet = self.sheets[self.current_sheet]
-        if not sheet["entries"]:
+        if not self.store.count_entries(self.current_sheet):
             messagebox.showinfo("No Data", f"No time entries to export on sheet '{self.current_sheet}'.")
             return
         
         # Create export dialog
-        export_dialog = ExportDialog(self.root, sheet["entries"], self.current_sheet)
+        with timed("ExportDialog"):
+            export_dialog = ExportDialog(self.root, self.store, self.current_sheet)
         self.root.wait_window(export_dialog.dialog)
+    
+    def export_all_sheets(self):
+        """Export every sheet at once"""
+        with timed("ExportAllDialog"):
+            dialog = ExportAllDialog(self.root, self.store)
+        self.root.wait_window(dialog.dialog)
+    
+    def show_diagnostics(self):
+        """Open the diagnostics window, or raise it if it is already open"""
+        if self.diagnostics_window is not None and self.diagnostics_window.window.winfo_exists():
+            self.diagnostics_window.window.lift()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self.root)
+
+
+class VirtualTable:
+    """Treeview that only materializes the rows around the visible window
+    
+    The tree holds the visible rows plus `buffer` rows on either side and
+    scrolls through them itself. The scrollbar is driven from the total row
+    count, and rows are fetched again whenever the view nears the edge of
+    what is materialized.
+    """
+    
+    def __init__(self, parent, columns, fetch_rows, count_rows, buffer=50):
+        self.fetch_rows = fetch_rows  # fetch_rows(offset, limit) -> list of value tuples
+        self.count_rows = count_rows
+        self.buffer = buffer
+        self.total = 0
+        self.offset = 0  # Row index of the first visible row
+        self.visible = 15  # Rows that fit in the tree, updated as it scrolls or resizes
+        self.window_start = 0  # Row index of the first materialized row
+        self.items = []  # Tree items of the materialized rows, in row order
+        self.version = None  # Data version the table was last synced to
+        
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=15)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.configure(yscrollcommand=self.on_tree_scrolled)
+    
+    def refresh(self, version=None):
+        """Re-count the rows and fetch the materialized window again
+        
+        Nothing is redrawn when `version` matches the version the table was
+        last synced to.
+        """
+        if version is not None and version == self.version:
+            return
+        self.version = version
+        self.total = self.count_rows()
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+        self.materialize()
+    
+    @timer("VirtualTable.materialize")
+    def materialize(self):
+        """Fetch the rows around the current offset into the tree"""
+        start = max(0, self.offset - self.buffer)
+        rows = self.fetch_rows(start, self.visible + 2 * self.buffer) if self.total else []
+        
+        # Reuse existing items and only insert or delete the difference
+        for item, values in zip(self.items, rows):
+            self.tree.item(item, values=values)
+        if len(rows) > len(self.items):
+            for values in rows[len(self.items):]:
+                self.items.append(self.tree.insert("", "end", values=values))
+        elif len(rows) < len(self.items):
+            self.tree.delete(*self.items[len(rows):])
+            del self.items[len(rows):]
+        
+        self.window_start = start
+        self.show_offset()
+    
+    def insert_row(self, position, values, version=None):
+        """Show a row that was inserted into the data at `position`"""
+        old_total = self.total
+        self.total += 1
+        self.version = version
+        window_end = self.window_start + len(self.items)
+        
+        if position < self.window_start:
+            # Rows in the window moved down by one; keep showing the same rows
+            self.window_start += 1
+            self.offset += 1
+        elif position < window_end or window_end == old_total:
+            index = position - self.window_start
+            self.items.insert(index, self.tree.insert("", index, values=values))
+            
+            # Keep the window at its usual size
+            if len(self.items) > self.visible + 2 * self.buffer:
+                self.tree.delete(self.items.pop())
+        
+        self.show_offset()
+    
+    def show_offset(self):
+        """Scroll the tree so the row at self.offset is at the top"""
+        if self.items:
+            self.tree.yview_moveto((self.offset - self.window_start) / len(self.items))
+        self.update_scrollbar()
+    
+    def is_materialized(self, offset):
+        """Check whether the rows visible at offset are all in the tree"""
+        window_end = self.window_start + len(self.items)
+        return self.window_start <= offset and (offset + self.visible <= window_end or window_end >= self.total)
+    
+    def on_scrollbar(self, action, value, unit=None):
+        """Handle dragging and clicking the scrollbar"""
+        if action == "moveto":
+            offset = int(float(value) * self.total)
+        else:
+            step = self.visible if unit == "pages" else 1
+            offset = self.offset + int(value) * step
+        self.offset = max(0, min(offset, self.total - self.visible))
+        
+        if self.is_materialized(self.offset):
+            self.show_offset()
+        else:
+            self.materialize()
+    
+    def on_tree_scrolled(self, first, last):
+        """Follow scrolling done by the tree itself (mouse wheel, keyboard, resizing)"""
+        count = len(self.items)
+        if not count:
+            self.update_scrollbar()
+            return
+        
+        first, last = float(first), float(last)
+        self.visible = max(1, round((last - first) * count))
+        self.offset = self.window_start + round(first * count)
+        
+        # Fetch more rows before the view runs into the edge of the window
+        window_end = self.window_start + count
+        near_top = self.window_start > 0 and self.offset - self.window_start < self.buffer // 2
+        near_bottom = window_end < self.total and window_end - (self.offset + self.visible) < self.buffer // 2
+        if near_top or near_bottom:
+            self.materialize()
+        else:
+            self.update_scrollbar()
+    
+    def update_scrollbar(self):
+        """Size and place the scrollbar thumb from the total row count"""
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+class ReportsTab:
+    """Notebook tab with a sheet's time totals per day, ISO week, month or description
+    
+    Each sheet is copied into column arrays once per data version, so
+    switching the grouping or sheet only re-runs the batch sums.
+    """
+    
+    GROUPS = {"Day": "day", "Week": "week", "Month": "month", "Description": "description"}
+    
+    def __init__(self, parent, store):
+        self.store = store
+        self.columns_cache = {}  # Sheet name -> (data version, SheetColumns)
+        
+        self.frame = ttk.Frame(parent)
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+        
+        # Sheet and grouping selection
+        controls_frame = ttk.Frame(self.frame)
+        controls_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 5))
+        
+        ttk.Label(controls_frame, text="Sheet:").pack(side=tk.LEFT)
+        self.sheet_var = tk.StringVar()
+        self.sheet_combo = ttk.Combobox(controls_frame, textvariable=self.sheet_var, state="readonly", width=20)
+        self.sheet_combo.pack(side=tk.LEFT, padx=(5, 15))
+        self.sheet_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        
+        ttk.Label(controls_frame, text="Group by:").pack(side=tk.LEFT)
+        self.group_var = tk.StringVar(value="Week")
+        group_combo = ttk.Combobox(controls_frame, textvariable=self.group_var, state="readonly", width=12,
+                                   values=list(self.GROUPS))
+        group_combo.pack(side=tk.LEFT, padx=(5, 15))
+        group_combo.bind("<<ComboboxSelected>>", lambda e: self.refresh())
+        
+        self.total_var = tk.StringVar()
+        ttk.Label(controls_frame, textvariable=self.total_var, font=("Arial", 9, "bold")).pack(side=tk.LEFT)
+        
+        # Totals table
+        columns = ("Period", "Total", "Entries")
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120, minwidth=100)
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+    
+    def show(self, sheet_names, current_sheet):
+        """Offer the given sheets, preselecting the current one, and recompute"""
+        self.sheet_combo["values"] = sheet_names
+        for sheet_name in list(self.columns_cache):
+            if sheet_name not in sheet_names:
+                del self.columns_cache[sheet_name]
+        if self.sheet_var.get() not in sheet_names:
+            self.sheet_var.set(current_sheet or (sheet_names[0] if sheet_names else ""))
+        self.refresh()
+    
+    def sheet_columns(self, sheet_name):
+        """Return the column arrays of a sheet, reloading them only after it changed"""
+        version = self.store.version(sheet_name)
+        cached = self.columns_cache.get(sheet_name)
+        if cached is None or cached[0] != version:
+            cached = (version, SheetColumns(self.store.iter_entries(sheet_name, newest_first=False)))
+            self.columns_cache[sheet_name] = cached
+        return cached[1]
+    
+    @timer("ReportsTab.refresh")
+    def refresh(self):
+        """Recompute the totals of the selected sheet and grouping"""
+        sheet_name = self.sheet_var.get()
+        self.tree.delete(*self.tree.get_children())
+        if not sheet_name:
+            self.total_var.set("")
+            return
+        
+        group_name = self.group_var.get()
+        columns = self.sheet_columns(sheet_name)
+        self.tree.heading("Period", text=group_name)
+        for label, seconds, count in group_totals(columns, self.GROUPS[group_name]):
+            self.tree.insert("", "end", values=(label, format_duration(seconds), count))
+        self.total_var.set(f"Total: {format_duration(total_seconds(columns))} in {len(columns)} entries")
 
 
 class SheetNameDialog:
@@ -701,14 +959,15 @@ class SheetNameDialog:
 
 
 class DescriptionDialog:
-    def __init__(self, parent, description_frequency):
+    def __init__(self, parent, description_index):
         self.result = None
-        self.description_frequency = description_frequency
+        self.description_index = description_index  # DescriptionIndex of the sheet's descriptions
+        self.suggestions = []  # Descriptions shown in the suggestion list
         
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Enter Description")
-        self.dialog.geometry("500x350")
+        self.dialog.geometry("500x450")
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
@@ -736,60 +995,37 @@ class DescriptionDialog:
         label.pack(anchor=tk.W, pady=(0, 10))
         
         # Entry field
-        self.entry = ttk.Entry(main_frame, width=60, font=("Arial", 10))
+        self.entry_var = tk.StringVar()
+        self.entry = ttk.Entry(main_frame, width=60, font=("Arial", 10), textvariable=self.entry_var)
         self.entry.pack(fill=tk.X, pady=(0, 15))
         
         # Previous descriptions section
-        if self.description_frequency:
+        if len(self.description_index):
             prev_label = ttk.Label(main_frame, text="Or select from frequently used descriptions:", font=("Arial", 10, "bold"))
             prev_label.pack(anchor=tk.W, pady=(10, 5))
             
-            # Dropdown frame
-            dropdown_frame = ttk.Frame(main_frame)
-            dropdown_frame.pack(fill=tk.X, pady=(0, 10))
+            # Suggestions matching the words typed so far, best ranked first
+            self.suggestion_list = tk.Listbox(main_frame, height=DEFAULT_SUGGESTIONS, font=("Arial", 10))
+            self.suggestion_list.pack(fill=tk.X, pady=(0, 10))
+            self.suggestion_list.bind('<Double-Button-1>', lambda e: self.use_suggestion())
+            self.suggestion_list.bind('<Return>', lambda e: self.use_suggestion())
+            self.entry.bind('<Down>', lambda e: self.focus_suggestions())
+            self.entry_var.trace_add("write", lambda *args: self.update_suggestions())
+            self.update_suggestions()
             
-            # Create dropdown with frequency information
-            self.dropdown_var = tk.StringVar()
-            self.dropdown = ttk.Combobox(dropdown_frame, 
-                                        textvariable=self.dropdown_var,
-                                        width=50,
-                                        font=("Arial", 10),
-                                        state="readonly")
+            # Quick select buttons for the top 3
+            quick_frame = ttk.Frame(main_frame)
+            quick_frame.pack(fill=tk.X, pady=(10, 0))
             
-            # Create dropdown options with frequency
-            dropdown_options = []
-            sorted_descriptions = sorted(
-                self.description_frequency.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
+            quick_label = ttk.Label(quick_frame, text="Quick select:", font=("Arial", 9))
+            quick_label.pack(side=tk.LEFT, padx=(0, 10))
             
-            for desc, freq in sorted_descriptions:
-                if freq > 1:
-                    dropdown_options.append(f"{desc} ({freq} times)")
-                else:
-                    dropdown_options.append(desc)
-            
-            self.dropdown['values'] = dropdown_options
-            self.dropdown.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            
-            # Bind dropdown selection
-            self.dropdown.bind('<<ComboboxSelected>>', self.on_dropdown_select)
-            
-            # Quick select buttons for top 3 most used
-            if len(sorted_descriptions) > 0:
-                quick_frame = ttk.Frame(main_frame)
-                quick_frame.pack(fill=tk.X, pady=(10, 0))
-                
-                quick_label = ttk.Label(quick_frame, text="Quick select:", font=("Arial", 9))
-                quick_label.pack(side=tk.LEFT, padx=(0, 10))
-                
-                # Create quick select buttons for top 3
-                for i, (desc, freq) in enumerate(sorted_descriptions[:3]):
-                    btn = ttk.Button(quick_frame, 
-                                   text=f"{desc[:20]}{'...' if len(desc) > 20 else ''}", 
-                                   command=lambda d=desc: self.quick_select(d))
-                    btn.pack(side=tk.LEFT, padx=(0, 5))
+            # Create quick select buttons for top 3
+            for desc in self.description_index.top(3):
+                btn = ttk.Button(quick_frame, 
+                               text=f"{desc[:20]}{'...' if len(desc) > 20 else ''}", 
+                               command=lambda d=desc: self.quick_select(d))
+                btn.pack(side=tk.LEFT, padx=(0, 5))
         
         # Button frame
         button_frame = ttk.Frame(main_frame)
@@ -802,23 +1038,35 @@ class DescriptionDialog:
         cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_clicked)
         cancel_button.pack(side=tk.RIGHT)
     
-    def on_dropdown_select(self, event):
-        """Handle dropdown selection"""
-        selected = self.dropdown_var.get()
-        if selected:
-            # Extract description from "description (X times)" format
-            if " (" in selected:
-                description = selected.split(" (")[0]
-            else:
-                description = selected
-            self.entry.delete(0, tk.END)
-            self.entry.insert(0, description)
+    def update_suggestions(self):
+        """List the best descriptions matching what is typed (called on every keystroke)"""
+        self.suggestions = self.description_index.search(self.entry_var.get())
+        self.suggestion_list.delete(0, tk.END)
+        for desc in self.suggestions:
+            freq = self.description_index.count(desc)
+            self.suggestion_list.insert(tk.END, f"{desc} ({freq} times)" if freq > 1 else desc)
+    
+    def focus_suggestions(self):
+        """Move from the entry field to the first suggestion"""
+        if self.suggestions:
+            self.suggestion_list.focus_set()
+            self.suggestion_list.selection_clear(0, tk.END)
+            self.suggestion_list.selection_set(0)
+            self.suggestion_list.activate(0)
+    
+    def use_suggestion(self):
+        """Put the selected suggestion into the entry field"""
+        selection = self.suggestion_list.curselection()
+        if selection:
+            self.quick_select(self.suggestions[selection[0]])
+        # Keep Return from also confirming the dialog
+        return "break"
     
     def quick_select(self, description):
         """Quick select a description"""
-        self.entry.delete(0, tk.END)
-        self.entry.insert(0, description)
-        self.dropdown_var.set("")  # Clear dropdown selection
+        self.entry_var.set(description)
+        self.entry.focus_set()
+        self.entry.icursor(tk.END)
     
     def ok_clicked(self):
         """Handle OK button click"""
@@ -836,15 +1084,20 @@ class DescriptionDialog:
 
 
 class ExportDialog:
-    def __init__(self, parent, entries, sheet_name):
-        self.entries = entries
+    def __init__(self, parent, store, sheet_name):
+        self.store = store
         self.sheet_name = sheet_name
         self.result = None
+        self.worker = None  # Thread running the export pipeline
+        self.cancel_event = threading.Event()
+        self.total = 0  # Entries in the range being exported
+        self.exported = 0  # Entries written so far (set by the worker)
+        self.outcome = None  # ("done", job result), ("cancelled", None) or ("error", exception)
         
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Export Time Entries")
-        self.dialog.geometry("500x300")
+        self.dialog.geometry("500x630")
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
@@ -857,6 +1110,7 @@ class ExportDialog:
         # Bind Enter key
         self.dialog.bind('<Return>', lambda e: self.export_clicked())
         self.dialog.bind('<Escape>', lambda e: self.cancel_clicked())
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel_clicked)
     
     def create_widgets(self):
         """Create export dialog widgets"""
@@ -882,6 +1136,62 @@ class ExportDialog:
                                    variable=self.format_var, value="csv")
         csv_radio.pack(anchor=tk.W, pady=2)
         
+        gzip_radio = ttk.Radiobutton(format_frame, text="Compressed CSV (.csv.gz)",
+                                    variable=self.format_var, value="csv.gz")
+        gzip_radio.pack(anchor=tk.W, pady=2)
+        
+        columnar_radio = ttk.Radiobutton(format_frame, text="Columnar binary (.tkcol, for analysis tools)",
+                                        variable=self.format_var, value=COLUMNAR_FORMAT)
+        columnar_radio.pack(anchor=tk.W, pady=2)
+        
+        # Range selection (defaults to the current ISO week)
+        range_frame = ttk.LabelFrame(main_frame, text="Entries", padding="10")
+        range_frame.pack(fill=tk.X, pady=(0, 20))
+        range_frame.columnconfigure(1, weight=1)
+        
+        week_info = datetime.now().isocalendar()
+        self.range_var = tk.StringVar(value="week")
+        
+        week_radio = ttk.Radiobutton(range_frame, text="ISO week", variable=self.range_var, value="week",
+                                     command=self.update_target_label)
+        week_radio.grid(row=0, column=0, sticky=tk.W, pady=2)
+        week_frame = ttk.Frame(range_frame)
+        week_frame.grid(row=0, column=1, sticky=tk.W, padx=(10, 0))
+        self.week_var = tk.StringVar(value=str(week_info[1]))
+        self.year_var = tk.StringVar(value=str(week_info[0]))
+        ttk.Label(week_frame, text="Week").pack(side=tk.LEFT)
+        tk.Spinbox(week_frame, from_=1, to=53, width=4, textvariable=self.week_var,
+                   command=self.update_target_label).pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(week_frame, text="Year").pack(side=tk.LEFT)
+        tk.Spinbox(week_frame, from_=2000, to=2100, width=6, textvariable=self.year_var,
+                   command=self.update_target_label).pack(side=tk.LEFT, padx=(5, 0))
+        # A new spinbox may reset its variable to from_
+        self.week_var.set(str(week_info[1]))
+        self.year_var.set(str(week_info[0]))
+        
+        dates_radio = ttk.Radiobutton(range_frame, text="Date range", variable=self.range_var, value="dates",
+                                      command=self.update_target_label)
+        dates_radio.grid(row=1, column=0, sticky=tk.W, pady=2)
+        dates_frame = ttk.Frame(range_frame)
+        dates_frame.grid(row=1, column=1, sticky=tk.W, padx=(10, 0))
+        monday, sunday = week_range(week_info[0], week_info[1])
+        self.start_date_var = tk.StringVar(value=monday)
+        self.end_date_var = tk.StringVar(value=sunday)
+        ttk.Entry(dates_frame, textvariable=self.start_date_var, width=11).pack(side=tk.LEFT)
+        ttk.Label(dates_frame, text="to").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(dates_frame, textvariable=self.end_date_var, width=11).pack(side=tk.LEFT)
+        
+        all_radio = ttk.Radiobutton(range_frame, text="All entries", variable=self.range_var, value="all",
+                                    command=self.update_target_label)
+        all_radio.grid(row=2, column=0, sticky=tk.W, pady=2)
+        
+        split_radio = ttk.Radiobutton(range_frame, text="Split by week (one file per ISO week)",
+                                      variable=self.range_var, value="split", command=self.update_target_label)
+        split_radio.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=2)
+        
+        for var in (self.week_var, self.year_var, self.start_date_var, self.end_date_var):
+            var.trace_add("write", lambda *args: self.update_target_label())
+        
         # Options frame
         options_frame = ttk.LabelFrame(main_frame, text="Export Options", padding="10")
         options_frame.pack(fill=tk.X, pady=(0, 20))
@@ -897,132 +1207,501 @@ class ExportDialog:
         sort_check.pack(anchor=tk.W, pady=2)
         
         # Info label
-        week_info = datetime.now().isocalendar()
-        info_text = f"Will export to: exports/{self.sheet_name.replace(' ', '_')}/sheet_W{week_info[1]:02d}_{week_info[0]}.{{format}}"
-        info_label = ttk.Label(main_frame, text=info_text, font=("Arial", 8), foreground="gray")
+        self.info_var = tk.StringVar()
+        info_label = ttk.Label(main_frame, textvariable=self.info_var, font=("Arial", 8), foreground="gray")
         info_label.pack(anchor=tk.W, pady=(0, 10))
+        self.update_target_label()
+        
+        # Progress of a running export
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate")
+        self.progress_bar.pack(fill=tk.X)
+        self.progress_var = tk.StringVar()
+        progress_label = ttk.Label(main_frame, textvariable=self.progress_var, font=("Arial", 8))
+        progress_label.pack(anchor=tk.W)
         
         # Button frame
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=(10, 0))
         
         # Buttons
-        export_button = ttk.Button(button_frame, text="Export", command=self.export_clicked)
-        export_button.pack(side=tk.RIGHT, padx=(5, 0))
+        self.export_button = ttk.Button(button_frame, text="Export", command=self.export_clicked)
+        self.export_button.pack(side=tk.RIGHT, padx=(5, 0))
         
-        cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_clicked)
-        cancel_button.pack(side=tk.RIGHT)
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_clicked)
+        self.cancel_button.pack(side=tk.RIGHT)
+    
+    def selected_range(self):
+        """Return (start date, end date, file name stem, header title) of the chosen entries
+        
+        Raises ValueError for an invalid week or date.
+        """
+        mode = self.range_var.get()
+        if mode == "week":
+            year, week = int(self.year_var.get()), int(self.week_var.get())
+            start_date, end_date = week_range(year, week)
+            return start_date, end_date, week_file_stem(year, week), f"Week {week}, {year}"
+        if mode == "dates":
+            start_date = parse_date(self.start_date_var.get())
+            end_date = parse_date(self.end_date_var.get())
+            if end_date < start_date:
+                raise ValueError("The end date is before the start date")
+            return start_date, end_date, range_file_stem(start_date, end_date), f"{start_date} to {end_date}"
+        return None, None, range_file_stem(None, None), "All entries"
+    
+    def update_target_label(self):
+        """Show the file the current selection exports to"""
+        folder_path = f"exports/{self.sheet_name.replace(' ', '_')}"
+        if self.range_var.get() == "split":
+            self.info_var.set(f"Will export to: {folder_path}/sheet_W{{week}}_{{year}}.{{format}} (unchanged weeks are skipped)")
+            return
+        try:
+            file_stem = self.selected_range()[2]
+        except ValueError:
+            self.info_var.set("Enter a valid week or dates (YYYY-MM-DD)")
+            return
+        self.info_var.set(f"Will export to: {folder_path}/{file_stem}.{{format}}")
     
     def export_clicked(self):
-        """Handle export button click"""
+        """Start exporting on a worker thread"""
+        if self.worker is not None:
+            return
+        
         format_type = self.format_var.get()
         include_header = self.include_header_var.get()
         sort_by_date = self.sort_by_date_var.get()
         
-        try:
-            if format_type == "txt":
-                filepath = self.export_to_txt(include_header, sort_by_date)
-            else:
-                filepath = self.export_to_csv(include_header, sort_by_date)
+        if self.range_var.get() == "split":
+            if format_type not in TEXT_FORMATS:
+                messagebox.showerror("Export Error", "Split by week supports the TXT and CSV formats only.")
+                return
             
-            messagebox.showinfo("Export Successful", 
-                              f"Time entries exported successfully to:\n{filepath}")
-            self.dialog.destroy()
+            def job(store):
+                return export_weeks(store, self.sheet_name, format_type,
+                                    include_header=include_header, newest_first=sort_by_date,
+                                    progress=self.set_exported, cancel=self.cancel_event)
+            self.total = self.store.count_entries(self.sheet_name)
+        else:
+            try:
+                date_range = self.selected_range()
+                filepath = f"{export_folder(self.sheet_name)}/{date_range[2]}.{format_type}"
+            except ValueError as e:
+                messagebox.showerror("Invalid Range", str(e))
+                return
+            except OSError as e:
+                messagebox.showerror("Export Error", f"Failed to export data: {str(e)}")
+                return
             
+            def job(store):
+                export_sheet(store, self.sheet_name, filepath, format_type, date_range,
+                             include_header=include_header, newest_first=sort_by_date,
+                             progress=self.set_exported, cancel=self.cancel_event)
+                return filepath
+            self.total = self.store.count_between(self.sheet_name, date_range[0], date_range[1])
+        self.progress_bar.configure(maximum=max(1, self.total), value=0)
+        self.progress_var.set(f"Exported 0 of {self.total} entries")
+        self.export_button.configure(state=tk.DISABLED)
+        
+        self.exported = 0
+        self.outcome = None
+        self.cancel_event.clear()
+        self.worker = threading.Thread(target=self.run_export, args=(job,), name="export", daemon=True)
+        self.worker.start()
+        self.dialog.after(100, self.poll_export)
+    
+    def run_export(self, job):
+        """Run an export job on a store readable from this thread (worker thread)"""
+        try:
+            with timed("export"), self.store.reader() as store:
+                self.outcome = ("done", job(store))
+        except ExportCancelled:
+            self.outcome = ("cancelled", None)
         except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export data: {str(e)}")
+            self.outcome = ("error", e)
     
-    def export_to_txt(self, include_header, sort_by_date):
-        """Export data to TXT format"""
-        # Calculate week and year
-        week_info = datetime.now().isocalendar()
+    def set_exported(self, done):
+        """Record export progress (worker thread; shown by poll_export)"""
+        self.exported = done
+    
+    def poll_export(self):
+        """Show the worker's progress and handle its result"""
+        self.progress_bar.configure(value=self.exported)
+        self.progress_var.set(f"Exported {self.exported} of {self.total} entries")
+        if self.outcome is None:
+            self.dialog.after(100, self.poll_export)
+            return
         
-        # Create folder structure
-        folder_path = f"exports/{self.sheet_name.replace(' ', '_')}"
-        os.makedirs(folder_path, exist_ok=True)
-        
-        # Create filename
-        filepath = f"{folder_path}/sheet_W{week_info[1]:02d}_{week_info[0]}.txt"
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            if include_header:
-                f.write(f"Time Entries - {self.sheet_name}\n")
-                f.write(f"Week {week_info[1]}, {week_info[0]}\n")
-                f.write("=" * 80 + "\n\n")
-                f.write("Date\tStart Time\tEnd Time\tDuration\tDescription\n")
-                f.write("-" * 80 + "\n")
-            
-            # Get all entries
-            all_entries = []
-            for date, day_entries in self.entries.items():
-                for entry in day_entries:
-                    all_entries.append((date, entry))
-            
-            # Sort if requested
-            if sort_by_date:
-                all_entries.sort(key=lambda x: x[0], reverse=True)
-            
-            # Write entries
-            for date, entry in all_entries:
-                line = f"{entry['date']}\t{entry['start_time']}\t{entry['end_time']}\t{entry['duration']}\t{entry['description']}\n"
-                f.write(line)
+        self.worker = None
+        self.export_button.configure(state=tk.NORMAL)
+        self.cancel_button.configure(state=tk.NORMAL)
+        status, value = self.outcome
+        if status == "done":
+            if isinstance(value, tuple):
+                written, skipped = value
+                message = (f"Wrote {written} week file(s) to:\nexports/{self.sheet_name.replace(' ', '_')}/\n\n"
+                           f"{skipped} week(s) were already up to date.")
+            else:
+                message = f"Time entries exported successfully to:\n{value}"
+            messagebox.showinfo("Export Successful", message)
+            self.dialog.destroy()
+        elif status == "cancelled":
+            self.progress_var.set("Export cancelled")
+        else:
+            messagebox.showerror("Export Error", f"Failed to export data: {str(value)}")
+    
+    def cancel_clicked(self):
+        """Cancel a running export, or close the dialog"""
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.cancel_button.configure(state=tk.DISABLED)
+            self.progress_var.set("Cancelling...")
+            return
+        self.dialog.destroy()
+
+
+class ExportAllDialog:
+    """Exports a snapshot of every sheet in parallel and shows a per-sheet summary"""
+    
+    def __init__(self, parent, store):
+        self.store = store
+        self.worker = None  # Thread driving the export pools
+        self.results = None  # Filled in by the worker when it is done
+        self.error = None
+        self.started = 0
+        
+        # Create dialog window
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Export All Sheets")
+        self.dialog.geometry("640x480")
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
         
-        return filepath
+        # Center dialog
+        self.dialog.geometry("+%d+%d" % (parent.winfo_rootx() + 50, parent.winfo_rooty() + 50))
+        
+        # Create widgets
+        self.create_widgets()
+        
+        # Bind keys
+        self.dialog.bind('<Return>', lambda e: self.export_clicked())
+        self.dialog.bind('<Escape>', lambda e: self.close_clicked())
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close_clicked)
     
-    def export_to_csv(self, include_header, sort_by_date):
-        """Export data to CSV format"""
-        import csv
+    def create_widgets(self):
+        """Create dialog widgets"""
+        # Main frame
+        main_frame = ttk.Frame(self.dialog, padding="20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Calculate week and year
-        week_info = datetime.now().isocalendar()
+        # Format and range selection
+        options_frame = ttk.Frame(main_frame)
+        options_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        format_frame = ttk.LabelFrame(options_frame, text="Export Format", padding="10")
+        format_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
+        self.format_var = tk.StringVar(value="csv")
+        ttk.Radiobutton(format_frame, text="Text File (.txt)", variable=self.format_var, value="txt").pack(anchor=tk.W)
+        ttk.Radiobutton(format_frame, text="CSV File (.csv)", variable=self.format_var, value="csv").pack(anchor=tk.W)
+        
+        range_frame = ttk.LabelFrame(options_frame, text="Entries", padding="10")
+        range_frame.pack(side=tk.LEFT, fill=tk.Y)
+        self.range_var = tk.StringVar(value="previous_month")
+        for text, value in (("This week", "week"), ("This month", "month"),
+                            ("Previous month", "previous_month"), ("All entries", "all")):
+            ttk.Radiobutton(range_frame, text=text, variable=self.range_var, value=value).pack(anchor=tk.W)
+        
+        # Summary table
+        columns = ("Sheet", "Entries", "Format", "Write", "Done", "Result")
+        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=10)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=80, minwidth=60)
+        self.tree.column("Sheet", width=120)
+        self.tree.column("Result", width=240)
+        self.tree.pack(fill=tk.BOTH, expand=True)
         
-        # Create folder structure
-        folder_path = f"exports/{self.sheet_name.replace(' ', '_')}"
-        os.makedirs(folder_path, exist_ok=True)
+        self.status_var = tk.StringVar(value=f"Will export {len(self.store.sheet_names())} sheets to exports/{{Sheet}}/")
+        ttk.Label(main_frame, textvariable=self.status_var, font=("Arial", 8)).pack(anchor=tk.W, pady=(5, 0))
         
-        # Create filename
-        filepath = f"{folder_path}/sheet_W{week_info[1]:02d}_{week_info[0]}.csv"
+        # Buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
         
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            if include_header:
-                writer.writerow(["Date", "Start Time", "End Time", "Duration", "Description"])
-            
-            # Get all entries
-            all_entries = []
-            for date, day_entries in self.entries.items():
-                for entry in day_entries:
-                    all_entries.append((date, entry))
-            
-            # Sort if requested
-            if sort_by_date:
-                all_entries.sort(key=lambda x: x[0], reverse=True)
-            
-            # Write entries
-            for date, entry in all_entries:
-                writer.writerow([
-                    entry['date'],
-                    entry['start_time'],
-                    entry['end_time'],
-                    entry['duration'],
-                    entry['description']
-                ])
-        
-        return filepath
+        self.export_button = ttk.Button(button_frame, text="Export", command=self.export_clicked)
+        self.export_button.pack(side=tk.RIGHT, padx=(5, 0))
+        
+        self.close_button = ttk.Button(button_frame, text="Close", command=self.close_clicked)
+        self.close_button.pack(side=tk.RIGHT)
     
-    def cancel_clicked(self):
-        """Handle Cancel button click"""
-        self.dialog.destroy()
+    def selected_range(self):
+        """Return (start date, end date, file name stem, header title) of the chosen entries"""
+        today = datetime.now()
+        mode = self.range_var.get()
+        if mode == "week":
+            year, week = today.isocalendar()[:2]
+            start_date, end_date = week_range(year, week)
+            return start_date, end_date, week_file_stem(year, week), f"Week {week}, {year}"
+        if mode in ("month", "previous_month"):
+            year, month = today.year, today.month
+            if mode == "previous_month":
+                year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+            start_date, end_date = month_range(year, month)
+            return start_date, end_date, range_file_stem(start_date, end_date), f"{start_date} to {end_date}"
+        return None, None, range_file_stem(None, None), "All entries"
+    
+    def export_clicked(self):
+        """Snapshot every sheet and export the snapshots on a worker thread"""
+        if self.worker is not None:
+            return
+        
+        format_type = self.format_var.get()
+        date_range = self.selected_range()
+        
+        # Entries are copied here so the export sees one consistent state
+        snapshots = {
+            sheet_name: list(self.store.entries_between(sheet_name, date_range[0], date_range[1], newest_first=False))
+            for sheet_name in self.store.sheet_names()
+        }
+        
+        self.tree.delete(*self.tree.get_children())
+        self.export_button.configure(state=tk.DISABLED)
+        self.close_button.configure(state=tk.DISABLED)
+        self.status_var.set(f"Exporting {len(snapshots)} sheets...")
+        self.results = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.worker = threading.Thread(target=self.run_export, args=(snapshots, format_type, date_range),
+                                       name="export-all", daemon=True)
+        self.worker.start()
+        self.dialog.after(100, self.poll_export)
+    
+    def run_export(self, snapshots, format_type, date_range):
+        """Run the parallel export (worker thread)"""
+        try:
+            with timed("export_all"):
+                self.results = export_all_sheets(snapshots, format_type, date_range)
+        except Exception as e:
+            self.error = e
+    
+    def poll_export(self):
+        """Wait for the worker, then fill in the summary"""
+        if self.worker.is_alive():
+            self.dialog.after(100, self.poll_export)
+            return
+        
+        self.worker = None
+        self.export_button.configure(state=tk.NORMAL)
+        self.close_button.configure(state=tk.NORMAL)
+        if self.error is not None:
+            self.status_var.set("")
+            messagebox.showerror("Export Error", f"Failed to export sheets: {str(self.error)}")
+            return
+        
+        failures = 0
+        for sheet_name, result in self.results.items():
+            if result["error"] is not None:
+                failures += 1
+                outcome = f"Failed: {result['error']}"
+            else:
+                outcome = result["file"]
+            self.tree.insert("", "end", values=(
+                sheet_name,
+                result["entries"],
+                self.format_ms(result["format_seconds"]),
+                self.format_ms(result["write_seconds"]),
+                self.format_ms(result["wall_seconds"]),
+                outcome
+            ))
+        
+        elapsed = time.perf_counter() - self.started
+        self.status_var.set(f"Exported {len(self.results) - failures} of {len(self.results)} sheets "
+                            f"in {elapsed * 1000:.0f} ms, {failures} failed")
+    
+    def format_ms(self, seconds):
+        """Format a duration in seconds as milliseconds (blank when not measured)"""
+        return "" if seconds is None else f"{seconds * 1000:.0f} ms"
+    
+    def close_clicked(self):
+        """Close the dialog unless an export is still running"""
+        if self.worker is None:
+            self.dialog.destroy()
 
 
-# Import timedelta for pause/resume functionality
-from datetime import timedelta
+class DiagnosticsWindow:
+    """Live call counts and latencies of the instrumented operations, with cProfile capture
+    
+    The window is not modal, so the operations it watches can be run while
+    it is open. Percentiles are estimated from the latency histograms.
+    """
+    
+    # Instrumented operations, offered for profiling before they first run
+    OPERATIONS = ("update_table", "update_tab_indicator", "VirtualTable.materialize", "ReportsTab.refresh",
+                  "DescriptionDialog", "ExportDialog", "ExportAllDialog", "export", "export_all", "store.write")
+    
+    # Operations that only run at startup: shown in the table, but never called again to profile
+    STARTUP_OPERATIONS = ("load_sheets_config",)
+    
+    # Milliseconds between refreshes
+    REFRESH_MS = 1000
+    
+    def __init__(self, parent):
+        self.profile_path = None  # .prof file of the armed or last profile
+        self.refresh_id = None  # Pending after() call of refresh()
+        
+        # Create window
+        self.window = tk.Toplevel(parent)
+        self.window.title("Diagnostics")
+        self.window.geometry("760x520")
+        self.window.geometry("+%d+%d" % (parent.winfo_rootx() + 80, parent.winfo_rooty() + 80))
+        
+        # Create widgets
+        self.create_widgets()
+        
+        self.window.bind('<Escape>', lambda e: self.close())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+    
+    def create_widgets(self):
+        """Create window widgets"""
+        main_frame = ttk.Frame(self.window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(0, weight=1)
+        
+        # Operation statistics
+        columns = ("Operation", "Calls", "Mean", "p50", "p90", "p99", "Max", "Total")
+        self.tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=12)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=70, minwidth=50, anchor=tk.E)
+        self.tree.column("Operation", width=200, anchor=tk.W)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.select_operation())
+        
+        # Latency histogram of the selected operation
+        self.histogram = tk.Text(main_frame, height=len(BUCKET_BOUNDS_MS) + 2, font=("Courier", 9),
+                                 state=tk.DISABLED)
+        self.histogram.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        # Profiling controls
+        profile_frame = ttk.Frame(main_frame)
+        profile_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        ttk.Label(profile_frame, text="Profile:").pack(side=tk.LEFT)
+        self.operation_var = tk.StringVar()
+        self.operation_combo = ttk.Combobox(profile_frame, textvariable=self.operation_var, state="readonly",
+                                            width=26, values=self.OPERATIONS)
+        self.operation_combo.pack(side=tk.LEFT, padx=(5, 5))
+        self.operation_combo.bind("<<ComboboxSelected>>", lambda e: self.show_histogram())
+        ttk.Button(profile_frame, text="Profile Next Call", command=self.profile_clicked).pack(side=tk.LEFT)
+        ttk.Button(profile_frame, text="Reset", command=self.reset_clicked).pack(side=tk.RIGHT)
+        
+        self.status_var = tk.StringVar(value="Times are in milliseconds, totals in seconds")
+        ttk.Label(main_frame, textvariable=self.status_var).grid(row=3, column=0, columnspan=2, sticky=tk.W,
+                                                                 pady=(5, 0))
+    
+    def refresh(self):
+        """Show the current statistics and profiling state, then schedule the next refresh"""
+        snapshot = instrumentation.snapshot()
+        for name in sorted(snapshot, key=lambda name: -snapshot[name].total):
+            stats = snapshot[name]
+            values = (name, stats.count, self.format_ms(stats.mean()), self.format_ms(stats.percentile(0.5)),
+                      self.format_ms(stats.percentile(0.9)), self.format_ms(stats.percentile(0.99)),
+                      self.format_ms(stats.max), f"{stats.total:.2f}")
+            if self.tree.exists(name):
+                self.tree.item(name, values=values)
+                self.tree.move(name, "", "end")
+            else:
+                self.tree.insert("", "end", iid=name, values=values)
+        self.operation_combo["values"] = sorted((set(self.OPERATIONS) | set(snapshot)) - set(self.STARTUP_OPERATIONS))
+        self.show_histogram(snapshot)
+        self.update_profile_status()
+        self.refresh_id = self.window.after(self.REFRESH_MS, self.refresh)
+    
+    def close(self):
+        """Stop refreshing and close the window"""
+        if self.refresh_id is not None:
+            self.window.after_cancel(self.refresh_id)
+            self.refresh_id = None
+        self.window.destroy()
+    
+    def format_ms(self, seconds):
+        """Format a duration in seconds as milliseconds"""
+        return f"{seconds * 1000:.1f}"
+    
+    def select_operation(self):
+        """Show the histogram of the operation selected in the table and offer it for profiling"""
+        selection = self.tree.selection()
+        if selection:
+            self.operation_var.set(selection[0])
+            self.show_histogram()
+    
+    def show_histogram(self, snapshot=None):
+        """Draw the latency histogram of the chosen operation as text bars"""
+        name = self.operation_var.get()
+        stats = (snapshot if snapshot is not None else instrumentation.snapshot()).get(name)
+        lines = []
+        if stats is not None:
+            peak = max(stats.buckets)
+            lines.append(f"{name}: {stats.count} calls")
+            for index, count in enumerate(stats.buckets):
+                bar = "#" * (round(40 * count / peak) if peak else 0)
+                lines.append(f"{bucket_label(index):>12} {count:>7} {bar}")
+        elif name:
+            lines.append(f"{name}: not called yet")
+        
+        self.histogram.configure(state=tk.NORMAL)
+        self.histogram.delete("1.0", tk.END)
+        self.histogram.insert("1.0", "\n".join(lines))
+        self.histogram.configure(state=tk.DISABLED)
+    
+    def profile_clicked(self):
+        """Arm cProfile for the next call of the chosen operation"""
+        name = self.operation_var.get()
+        if not name:
+            messagebox.showinfo("Profile", "Choose an operation to profile first.", parent=self.window)
+            return
+        if name in self.STARTUP_OPERATIONS:
+            messagebox.showinfo("Profile", f"{name} only runs at startup, so there is no next call to profile.",
+                                parent=self.window)
+            return
+        self.profile_path = instrumentation.profile_next(name)
+        self.update_profile_status()
+    
+    def update_profile_status(self):
+        """Report a pending or written profile"""
+        if self.profile_path is None:
+            return
+        pending = instrumentation.profile_pending()
+        if pending is not None:
+            self.status_var.set(f"Profiling the next {pending} call...")
+        elif instrumentation.last_profile == self.profile_path:
+            self.status_var.set(f"Wrote profile {self.profile_path}")
+        elif instrumentation.last_profile_error is not None:
+            self.status_var.set(f"Profiling failed: {instrumentation.last_profile_error}")
+    
+    def reset_clicked(self):
+        """Clear the statistics"""
+        instrumentation.reset()
+        self.tree.delete(*self.tree.get_children())
+        self.show_histogram()
 
 
 def main():
+    # Lets export worker processes start in a frozen executable
+    multiprocessing.freeze_support()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
     root = tk.Tk()
-    app = TimeTracker(root)
+    try:
+        app = TimeTracker(root)
+    except StoreLocked as e:
+        # The same sheets are open in another window or a running command
+        root.withdraw()
+        messagebox.showerror("Time Tracker", str(e))
+        root.destroy()
+        return
     root.mainloop()
 
 
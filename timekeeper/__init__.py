@@ -0,0 +1 @@
+"""Non-GUI building blocks for the multi-sheet time tracker"""
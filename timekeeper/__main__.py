@@ -0,0 +1,7 @@
+"""Entry point of `python -m timekeeper`"""
+import sys
+
+from timekeeper.cli import main
+
+
+sys.exit(main())
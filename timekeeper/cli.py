@@ -0,0 +1,261 @@
+"""Command line interface: track time and export or report without starting the GUI
+
+Run as `python -m timekeeper <command>`. Only the modules a command needs
+are imported, and tkinter never is, so quick commands such as `status`
+start in a fraction of the GUI's startup time.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from timekeeper.tracker import (DEFAULT_ARCHIVE_AFTER_MONTHS, DEFAULT_ARCHIVE_FORMAT, DEFAULT_CONFIG_FILE,
+                                DEFAULT_STORAGE_MODE, Tracker)
+
+
+def format_elapsed(seconds):
+    """Format elapsed seconds as HH:MM:SS"""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def open_tracker(args):
+    """Return a loaded Tracker for the config file and storage mode given on the command line"""
+    archive_after_months = args.archive_after if args.archive_after > 0 else None
+    tracker = Tracker(args.config, args.storage, archive_after_months, args.archive_format)
+    tracker.load()
+    return tracker
+
+
+def export_range(args):
+    """Return the (start date, end date, file name stem, title) range chosen by the export options"""
+    from timekeeper.export import parse_date, range_file_stem, week_file_stem, week_range
+    
+    if args.all:
+        return None, None, range_file_stem(None, None), "All entries"
+    if args.start_date or args.end_date:
+        if not (args.start_date and args.end_date):
+            raise ValueError("--from and --to must be given together")
+        start_date, end_date = parse_date(args.start_date), parse_date(args.end_date)
+        if end_date < start_date:
+            raise ValueError("The end date is before the start date")
+        return start_date, end_date, range_file_stem(start_date, end_date), f"{start_date} to {end_date}"
+    
+    if args.week:
+        try:
+            year, week = (int(part) for part in args.week.upper().split("-W"))
+        except ValueError:
+            raise ValueError(f"Invalid week '{args.week}', expected YYYY-Www") from None
+    else:
+        year, week = datetime.now().isocalendar()[:2]
+    start_date, end_date = week_range(year, week)
+    return start_date, end_date, week_file_stem(year, week), f"Week {week}, {year}"
+
+
+def status_command(args):
+    """Print running and paused sessions, and optionally today's and this week's totals"""
+    if not args.totals:
+        # Sessions only: the store is not opened at all
+        tracker = Tracker(args.config, args.storage)
+        tracker.load_sessions()
+        if not tracker.sheets:
+            print("No sheet is being tracked")
+        for sheet_name in tracker.sheet_names():
+            print(f"{sheet_name}: {session_text(tracker, sheet_name)}")
+        return 0
+    
+    from timekeeper.entries import format_duration
+    from timekeeper.rollups import iso_week
+    
+    tracker = open_tracker(args)
+    today = datetime.now().strftime("%Y-%m-%d")
+    week = iso_week(today)
+    try:
+        for sheet_name in tracker.sheet_names():
+            today_total = tracker.store.rollup_total(sheet_name, "days", today)
+            week_total = tracker.store.rollup_total(sheet_name, "weeks", week)
+            print(f"{sheet_name}: {session_text(tracker, sheet_name)} | "
+                  f"Today: {format_duration(today_total)} | This week: {format_duration(week_total)}")
+    finally:
+        tracker.close()
+    return 0
+
+
+def session_text(tracker, sheet_name):
+    """Describe the session of a sheet in a few words"""
+    sheet = tracker.sheet(sheet_name)
+    if sheet["session"] is None:
+        return "idle"
+    elapsed = format_elapsed(tracker.elapsed(sheet_name))
+    if sheet["paused"]:
+        return f"paused at {elapsed}"
+    return f"tracking for {elapsed} (since {sheet['session']})"
+
+
+def start_command(args):
+    """Start tracking a sheet"""
+    tracker = open_tracker(args)
+    try:
+        if tracker.sheet(args.sheet)["session"] is not None:
+            print(f"'{args.sheet}' is already being tracked", file=sys.stderr)
+            return 1
+        paused = tracker.start(args.sheet, "concurrent" if args.concurrent else "pause")
+    finally:
+        tracker.close()
+    print(f"Started tracking '{args.sheet}'")
+    for sheet_name in paused:
+        print(f"Paused '{sheet_name}'")
+    return 0
+
+
+def pause_command(args):
+    """Pause a running sheet"""
+    tracker = open_tracker(args)
+    try:
+        if not tracker.pause(args.sheet):
+            print(f"'{args.sheet}' is not running", file=sys.stderr)
+            return 1
+        print(f"Paused '{args.sheet}' at {format_elapsed(tracker.elapsed(args.sheet))}")
+    finally:
+        tracker.close()
+    return 0
+
+
+def resume_command(args):
+    """Resume a paused sheet"""
+    tracker = open_tracker(args)
+    try:
+        if not tracker.resume(args.sheet):
+            print(f"'{args.sheet}' is not paused", file=sys.stderr)
+            return 1
+    finally:
+        tracker.close()
+    print(f"Resumed '{args.sheet}'")
+    return 0
+
+
+def stop_command(args):
+    """Stop a sheet's session and save it as an entry"""
+    from timekeeper.entries import format_duration
+    
+    tracker = open_tracker(args)
+    try:
+        entry = tracker.stop(args.sheet, args.description)
+    finally:
+        tracker.close()
+    if entry is None:
+        print(f"'{args.sheet}' is not being tracked", file=sys.stderr)
+        return 1
+    print(f"[{args.sheet}] Session completed: {format_duration(entry.duration)} - {args.description}")
+    return 0
+
+
+def export_command(args):
+    """Export a sheet to the exports folder"""
+    from timekeeper.export import export_folder, export_sheet, export_weeks
+    
+    tracker = open_tracker(args)
+    try:
+        tracker.sheet(args.sheet)
+        newest_first = not args.oldest_first
+        if args.split_weeks:
+            written, skipped = export_weeks(tracker.store, args.sheet, args.format,
+                                            include_header=not args.no_header, newest_first=newest_first)
+            print(f"Wrote {written} week file(s) to {export_folder(args.sheet)}/ ({skipped} already up to date)")
+            return 0
+        
+        date_range = export_range(args)
+        filepath = f"{export_folder(args.sheet)}/{date_range[2]}.{args.format}"
+        count = export_sheet(tracker.store, args.sheet, filepath, args.format, date_range,
+                             include_header=not args.no_header, newest_first=newest_first)
+    finally:
+        tracker.close()
+    print(f"Exported {count} entries to {filepath}")
+    return 0
+
+
+def report_command(args):
+    """Print a sheet's totals per day, week, month or description"""
+    from timekeeper.entries import format_duration
+    from timekeeper.reports import SheetColumns, group_totals, total_seconds
+    
+    tracker = open_tracker(args)
+    try:
+        tracker.sheet(args.sheet)
+        columns = SheetColumns(tracker.store.iter_entries(args.sheet, newest_first=False))
+    finally:
+        tracker.close()
+    
+    rows = group_totals(columns, args.by)
+    width = max([len(label) for label, _, _ in rows] + [len(args.by)])
+    print(f"{args.by.capitalize():<{width}}  {'Total':>12}  {'Entries':>7}")
+    for label, seconds, count in rows:
+        print(f"{label:<{width}}  {format_duration(seconds):>12}  {count:>7}")
+    print(f"{'Total':<{width}}  {format_duration(total_seconds(columns)):>12}  {len(columns):>7}")
+    return 0
+
+
+def build_parser():
+    """Return the argument parser of all commands"""
+    parser = argparse.ArgumentParser(prog="timekeeper", description="Multi-sheet time tracker (command line)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE,
+                        help=f"sheets config file (default: {DEFAULT_CONFIG_FILE})")
+    parser.add_argument("--storage", default=DEFAULT_STORAGE_MODE, choices=("segments", "journal", "json", "sqlite"),
+                        help=f"storage mode (default: {DEFAULT_STORAGE_MODE})")
+    parser.add_argument("--archive-after", type=int, default=DEFAULT_ARCHIVE_AFTER_MONTHS, metavar="MONTHS",
+                        help=f"compress months older than this, 0 to never (default: {DEFAULT_ARCHIVE_AFTER_MONTHS})")
+    parser.add_argument("--archive-format", default=DEFAULT_ARCHIVE_FORMAT, choices=("xz", "gz"),
+                        help=f"compression of archived months (default: {DEFAULT_ARCHIVE_FORMAT})")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+    
+    status = commands.add_parser("status", help="show running and paused sessions")
+    status.add_argument("--totals", action="store_true", help="also show today's and this week's totals of every sheet")
+    status.set_defaults(handler=status_command)
+    
+    start = commands.add_parser("start", help="start tracking a sheet, pausing the others")
+    start.add_argument("sheet")
+    start.add_argument("--concurrent", action="store_true", help="keep other sheets running")
+    start.set_defaults(handler=start_command)
+    
+    for name, handler, help_text in (("pause", pause_command, "pause a running sheet"),
+                                     ("resume", resume_command, "resume a paused sheet")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("sheet")
+        command.set_defaults(handler=handler)
+    
+    stop = commands.add_parser("stop", help="stop a sheet and save the session as an entry")
+    stop.add_argument("sheet")
+    stop.add_argument("-d", "--description", required=True)
+    stop.set_defaults(handler=stop_command)
+    
+    export = commands.add_parser("export", help="export a sheet (the current ISO week by default)")
+    export.add_argument("sheet")
+    export.add_argument("--format", default="txt", choices=("txt", "csv", "csv.gz", "tkcol"))
+    export_range_group = export.add_mutually_exclusive_group()
+    export_range_group.add_argument("--week", help="ISO week to export, as YYYY-Www")
+    export_range_group.add_argument("--from", dest="start_date", help="first date to export (YYYY-MM-DD, with --to)")
+    export_range_group.add_argument("--all", action="store_true", help="export every entry")
+    export_range_group.add_argument("--split-weeks", action="store_true", help="write one file per ISO week")
+    export.add_argument("--to", dest="end_date", help="last date to export (YYYY-MM-DD)")
+    export.add_argument("--no-header", action="store_true", help="leave out the header")
+    export.add_argument("--oldest-first", action="store_true", help="list the oldest entries first")
+    export.set_defaults(handler=export_command)
+    
+    report = commands.add_parser("report", help="print a sheet's totals")
+    report.add_argument("sheet")
+    report.add_argument("--by", default="day", choices=("day", "week", "month", "description"))
+    report.set_defaults(handler=report_command)
+    return parser
+
+
+def main(argv=None):
+    """Run one command; returns the process exit code"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+    return 1
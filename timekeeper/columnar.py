@@ -0,0 +1,176 @@
+"""Compact columnar binary export format (.tkcol) and its reader
+
+Layout (little-endian):
+    
+    magic      8 bytes  b"TKCOL\\x00\\x01\\x00"
+    metadata   uint32 length + UTF-8 JSON ({"sheet", "title"})
+    blocks     repeated: uint32 n, then n x int64 start, n x int64 end,
+               n x uint32 duration, n x uint32 description id
+    strings    uint32 0 (end of blocks), uint32 count, then per string
+               uint32 length + UTF-8 bytes; ids index this table
+    footer     uint64 entry count, 8 bytes b"TKCOLEND"
+
+Columns are written a block at a time, so memory stays bounded while
+writing, and reading is a handful of array.frombytes() calls per block.
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+
+from timekeeper.entries import Entry
+
+
+MAGIC = b"TKCOL\x00\x01\x00"
+FOOTER_MAGIC = b"TKCOLEND"
+BLOCK_SIZE = 4096
+
+# Typecodes of the fixed-width columns
+INT64 = "q"
+UINT32 = "I"
+
+
+def to_little_endian(column):
+    """Return the column's bytes in little-endian order"""
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def from_little_endian(column, data):
+    """Append little-endian bytes to a column"""
+    if sys.byteorder == "big":
+        block = array(column.typecode)
+        block.frombytes(data)
+        block.byteswap()
+        column.extend(block)
+    else:
+        column.frombytes(data)
+
+
+def pack_entries(entries):
+    """Return entries as (start, end, duration, description id) columns plus the description table
+    
+    The columns are arrays, which pickle as raw bytes, so this is how
+    entries are sent to another process.
+    """
+    columns = (array(INT64), array(INT64), array(UINT32), array(UINT32))
+    descriptions = {}  # Description -> id in the table
+    for entry in entries:
+        columns[0].append(entry.start)
+        columns[1].append(entry.end)
+        columns[2].append(entry.duration)
+        columns[3].append(descriptions.setdefault(entry.description, len(descriptions)))
+    return columns, list(descriptions)
+
+
+def unpack_entries(columns, descriptions):
+    """Yield the entries of pack_entries() columns"""
+    for start, end, duration, description_id in zip(*columns):
+        yield Entry(start, end, duration, descriptions[description_id])
+
+
+def write_columnar(filepath, entries, metadata=None, block_size=BLOCK_SIZE):
+    """Write entries to a .tkcol file, replacing filepath only once complete; returns the entry count"""
+    tmp_path = f"{filepath}.tmp"
+    descriptions = {}  # Description -> id in the string table
+    count = 0
+    
+    def write_block(f, block):
+        f.write(struct.pack("<I", len(block[0])))
+        for column in block:
+            f.write(to_little_endian(column))
+    
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            meta = json.dumps(metadata or {}).encode("utf-8")
+            f.write(struct.pack("<I", len(meta)) + meta)
+            
+            block = (array(INT64), array(INT64), array(UINT32), array(UINT32))
+            for entry in entries:
+                description_id = descriptions.setdefault(entry.description, len(descriptions))
+                block[0].append(entry.start)
+                block[1].append(entry.end)
+                block[2].append(entry.duration)
+                block[3].append(description_id)
+                count += 1
+                if len(block[0]) >= block_size:
+                    write_block(f, block)
+                    block = (array(INT64), array(INT64), array(UINT32), array(UINT32))
+            if len(block[0]):
+                write_block(f, block)
+            
+            # String table, after the zero-length block that ends the data
+            f.write(struct.pack("<II", 0, len(descriptions)))
+            for description in descriptions:
+                encoded = description.encode("utf-8")
+                f.write(struct.pack("<I", len(encoded)) + encoded)
+            f.write(struct.pack("<Q", count) + FOOTER_MAGIC)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def read_columnar(filepath):
+    """Read a .tkcol file into columns
+    
+    Returns {"metadata": dict, "start": array, "end": array, "duration":
+    array, "description_id": array, "descriptions": list}. The arrays can
+    be wrapped with numpy.frombuffer() without copying.
+    """
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC or data[-len(FOOTER_MAGIC):] != FOOTER_MAGIC:
+        raise ValueError(f"Not a columnar export file: {filepath}")
+    
+    offset = len(MAGIC)
+    (meta_length,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    metadata = json.loads(data[offset:offset + meta_length].decode("utf-8"))
+    offset += meta_length
+    
+    columns = (array(INT64), array(INT64), array(UINT32), array(UINT32))
+    while True:
+        (n,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        if n == 0:
+            break
+        for column in columns:
+            size = n * column.itemsize
+            from_little_endian(column, data[offset:offset + size])
+            offset += size
+    
+    (string_count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    descriptions = []
+    for _ in range(string_count):
+        (length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        descriptions.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    
+    (count,) = struct.unpack_from("<Q", data, offset)
+    if count != len(columns[0]):
+        raise ValueError(f"Truncated columnar export file: {filepath}")
+    
+    return {
+        "metadata": metadata,
+        "start": columns[0],
+        "end": columns[1],
+        "duration": columns[2],
+        "description_id": columns[3],
+        "descriptions": descriptions
+    }
+
+
+def iter_columnar(filepath):
+    """Yield the entries of a .tkcol file"""
+    columns = read_columnar(filepath)
+    yield from unpack_entries((columns["start"], columns["end"], columns["duration"], columns["description_id"]),
+                              columns["descriptions"])
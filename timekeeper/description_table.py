@@ -0,0 +1,73 @@
+"""Dictionary encoding of entry descriptions for storage
+
+Files store each distinct description once in a table and entries as
+[start, end, duration, description id] rows:
+    
+    {"descriptions": ["Fix login bug", ...], "entries": [[1718000000, 1718008130, 8130, 0], ...]}
+
+In memory, a sheet's DescriptionTable interns descriptions so entries with
+the same description share one string.
+"""
+from timekeeper.entries import Entry
+
+
+class DescriptionTable:
+    """Distinct descriptions of a sheet numbered in order of first use"""
+    
+    def __init__(self, descriptions=()):
+        self.descriptions = []  # id -> description
+        self.ids = {}  # description -> id
+        for description in descriptions:
+            self.encode(description)
+    
+    def __len__(self):
+        return len(self.descriptions)
+    
+    def encode(self, description):
+        """Return the id of a description, adding it if it is new"""
+        description_id = self.ids.get(description)
+        if description_id is None:
+            description_id = self.ids[description] = len(self.descriptions)
+            self.descriptions.append(description)
+        return description_id
+    
+    def decode(self, description_id):
+        """Return the description with an id"""
+        return self.descriptions[description_id]
+    
+    def intern(self, description):
+        """Return the table's copy of a description, so equal descriptions share one string"""
+        return self.descriptions[self.encode(description)]
+
+
+def encode_rows(entries, table):
+    """Return entries as [start, end, duration, description id] rows, adding their descriptions to table"""
+    return [[entry.start, entry.end, entry.duration, table.encode(entry.description)] for entry in entries]
+
+
+def decode_rows(rows, descriptions, table=None):
+    """Build entries from rows whose ids index descriptions, interning these in table if given"""
+    if table is not None:
+        descriptions = [table.intern(description) for description in descriptions]
+    return [
+        Entry(start, end, duration, descriptions[description_id])
+        for start, end, duration, description_id in rows
+    ]
+
+
+def encode_entries(entries):
+    """Return the dictionary-encoded file structure of a list of entries"""
+    table = DescriptionTable()
+    rows = encode_rows(entries, table)
+    return {"descriptions": table.descriptions, "entries": rows}
+
+
+def decode_entries(data, table=None):
+    """Return the entries of encode_entries() data, or of a plain list of entry dicts written by older versions"""
+    if isinstance(data, list):
+        entries = [Entry.from_dict(entry) for entry in data]
+        if table is not None:
+            for entry in entries:
+                entry.description = table.intern(entry.description)
+        return entries
+    return decode_rows(data["entries"], data["descriptions"], table)
@@ -0,0 +1,132 @@
+"""Ranked search-as-you-type over a sheet's descriptions"""
+import bisect
+import heapq
+import re
+
+from timekeeper.frequency import FrequencyTable
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Suggestions returned by DescriptionIndex.search() by default
+DEFAULT_SUGGESTIONS = 8
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class DescriptionIndex:
+    """Descriptions of one sheet indexed by the words they contain
+    
+    Every query term is a word prefix: "fix lo" finds "Fix login bug".
+    Matching words are found with bisect in a sorted word list; the matches
+    are then ranked by decayed use (see FrequencyTable) with a top-k heap,
+    or, for short prefixes matching a large share of the descriptions, by
+    walking the precomputed ranking until k of them are found. Both stay
+    well under a millisecond per keystroke with thousands of descriptions.
+    Descriptions the table evicts are dropped from the index too.
+    """
+    
+    def __init__(self, frequency=None):
+        self.frequency = frequency if frequency is not None else FrequencyTable()
+        self.words = {}  # word -> set of descriptions containing it
+        self.sorted_words = []  # Keys of self.words, for prefix lookups
+        self.description_words = {}  # description -> its words
+        self.ranked = None  # Descriptions best first, rebuilt after a change
+        for description in self.frequency.stats:
+            self.index(description)
+    
+    def __len__(self):
+        return len(self.frequency)
+    
+    def count(self, description):
+        """Return how many times a description was used"""
+        return self.frequency.count(description)
+    
+    def use(self, description, when):
+        """Record a use of a description at epoch time when, indexing it if it is new"""
+        self.ranked = None
+        is_new = description not in self.frequency
+        for evicted in self.frequency.use(description, when):
+            self.unindex(evicted)
+        if is_new:
+            self.index(description)
+    
+    def index(self, description):
+        """Add a description to the word index"""
+        words = tuple(set(tokenize(description)))
+        self.description_words[description] = words
+        for word in words:
+            descriptions = self.words.get(word)
+            if descriptions is None:
+                descriptions = self.words[word] = set()
+                bisect.insort(self.sorted_words, word)
+            descriptions.add(description)
+    
+    def unindex(self, description):
+        """Remove a description from the word index"""
+        for word in self.description_words.pop(description):
+            descriptions = self.words[word]
+            descriptions.discard(description)
+            if not descriptions:
+                del self.words[word]
+                del self.sorted_words[bisect.bisect_left(self.sorted_words, word)]
+    
+    def rank_key(self, description):
+        """Sort key putting the best ranked descriptions first"""
+        return self.frequency.rank_key(description)
+    
+    def ranking(self):
+        """Return every description, best first"""
+        if self.ranked is None:
+            self.ranked = self.frequency.ranking()
+        return self.ranked
+    
+    def top(self, limit=DEFAULT_SUGGESTIONS):
+        """Return the `limit` best descriptions (without sorting when the table keeps that many ranked)"""
+        if limit <= self.frequency.top_size:
+            return self.frequency.top[:limit]
+        return self.ranking()[:limit]
+    
+    def prefix_words(self, prefix):
+        """Return the indexed words starting with prefix"""
+        lo = bisect.bisect_left(self.sorted_words, prefix)
+        hi = bisect.bisect_left(self.sorted_words, prefix + "\uffff")
+        return self.sorted_words[lo:hi]
+    
+    def search(self, query, limit=DEFAULT_SUGGESTIONS):
+        """Return the best `limit` descriptions having a word starting with each query term"""
+        terms = tokenize(query)
+        if not terms:
+            return self.top(limit)
+        
+        # The term matching the fewest descriptions picks the candidates
+        term_words = [self.prefix_words(term) for term in set(terms)]
+        term_words.sort(key=lambda words: sum(len(self.words[word]) for word in words))
+        estimate = sum(len(self.words[word]) for word in term_words[0])
+        if not estimate:
+            return []
+        
+        if estimate * 8 > len(self.frequency):
+            # A large share matches: the first matches in ranking order are the best ones
+            return self.first_matches(self.ranking(), term_words, limit)
+        
+        candidates = set()
+        for word in term_words[0]:
+            candidates.update(self.words[word])
+        matching = self.first_matches(candidates, term_words[1:], len(candidates))
+        return heapq.nsmallest(limit, matching, key=self.rank_key)
+    
+    def first_matches(self, descriptions, term_words, limit):
+        """Return up to `limit` of descriptions that contain one of the words of every term"""
+        term_words = [set(words) for words in term_words]
+        found = []
+        for description in descriptions:
+            words = self.description_words[description]
+            if all(any(word in matching for word in words) for matching in term_words):
+                found.append(description)
+                if len(found) == limit:
+                    break
+        return found
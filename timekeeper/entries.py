@@ -0,0 +1,178 @@
+"""Time entry model and its display formatting
+
+Entries are Entry objects holding epoch seconds and an integer duration:
+Entry(start=1718000000, end=1718008130, duration=8130, description="...").
+They are only turned into display strings when a table row or export line
+is rendered, and into dicts when a store writes them out.
+"""
+import re
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+
+DURATION_PATTERN = re.compile(r"(?:(\d+)h)?\s*(?:(\d+)m)?\s*(?:(\d+)s)?")
+
+
+class Entry:
+    """A completed time entry
+    
+    Slotted, so an entry takes about a third of the memory of the
+    equivalent dict; with a sheet's descriptions interned (see
+    description_table) most of an entry's size is its two timestamps.
+    """
+    
+    __slots__ = ("start", "end", "duration", "description")
+    
+    def __init__(self, start, end, duration, description):
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.description = description
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Build an entry from its stored dict, converting the display-string format of older versions"""
+        if "start" not in data:
+            data = migrate_entry(data)
+        return cls(data["start"], data["end"], data["duration"], data["description"])
+    
+    def to_dict(self):
+        """Return the entry as a JSON-ready dict"""
+        return {"start": self.start, "end": self.end, "duration": self.duration, "description": self.description}
+    
+    def __eq__(self, other):
+        if not isinstance(other, Entry):
+            return NotImplemented
+        return (self.start, self.end, self.duration, self.description) == \
+            (other.start, other.end, other.duration, other.description)
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Entry({self.start}, {self.end}, {self.duration}, {self.description!r})"
+
+
+def make_entry(start, end, description):
+    """Build an entry from start and end datetimes"""
+    start_ts = int(start.timestamp())
+    end_ts = int(end.timestamp())
+    return Entry(start_ts, end_ts, end_ts - start_ts, description)
+
+
+def parse_duration(text):
+    """Parse a "2h 15m 30s" duration string into seconds"""
+    match = DURATION_PATTERN.fullmatch(text.strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {text!r}")
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def migrate_entry(entry):
+    """Convert an entry dict stored with display strings to the numeric format
+    
+    Old entries hold "date", "start_time" and "end_time" strings plus a
+    "2h 15m 30s" duration. The end is rebuilt from start + duration, which
+    keeps the end date of sessions that crossed midnight.
+    """
+    if "start" in entry:
+        return entry
+    
+    start = datetime.strptime(f"{entry['date']} {entry['start_time']}", "%Y-%m-%d %H:%M:%S")
+    try:
+        duration = parse_duration(entry["duration"])
+    except ValueError:
+        end = datetime.strptime(f"{entry['date']} {entry['end_time']}", "%Y-%m-%d %H:%M:%S")
+        if end < start:
+            end += timedelta(days=1)
+        duration = int((end - start).total_seconds())
+    
+    start_ts = int(start.timestamp())
+    return {
+        "start": start_ts,
+        "end": start_ts + duration,
+        "duration": duration,
+        "description": entry["description"]
+    }
+
+
+@lru_cache(maxsize=1024)
+def day_start(date_str):
+    """Return the epoch seconds of local midnight at the start of a YYYY-MM-DD date"""
+    return int(time.mktime(time.strptime(date_str, "%Y-%m-%d")))
+
+
+def day_end(date_str):
+    """Return the epoch seconds just after the last second of a YYYY-MM-DD date"""
+    next_day = datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)
+    return day_start(next_day.strftime("%Y-%m-%d"))
+
+
+@lru_cache(maxsize=8192)
+def local_hour(hour):
+    """Return (date string, seconds since local midnight) at the start of a UTC hour"""
+    local = time.localtime(hour * 3600)
+    return time.strftime("%Y-%m-%d", local), local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+
+
+def split_timestamp(timestamp):
+    """Return (local date string, seconds since local midnight) of an epoch timestamp
+    
+    Converting to local time is the expensive part of formatting, so it is
+    done once per hour of timestamps and cached; the seconds within the
+    hour are added arithmetically.
+    """
+    hour, offset = divmod(int(timestamp), 3600)
+    date_str, day_seconds = local_hour(hour)
+    day_seconds += offset
+    if day_seconds >= 86400:
+        # This hour crosses local midnight
+        local = time.localtime(timestamp)
+        return time.strftime("%Y-%m-%d", local), local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+    return date_str, day_seconds
+
+
+def format_clock(day_seconds):
+    """Format seconds since midnight as HH:MM:SS"""
+    hours, remainder = divmod(day_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def entry_date(entry):
+    """Return the local YYYY-MM-DD date an entry started on"""
+    return split_timestamp(entry.start)[0]
+
+
+@lru_cache(maxsize=4096)
+def format_duration(seconds):
+    """Format a duration in seconds in human readable format"""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    
+    if hours > 0:
+        return f"{hours}h {minutes}m {seconds}s"
+    elif minutes > 0:
+        return f"{minutes}m {seconds}s"
+    else:
+        return f"{seconds}s"
+
+
+def entry_row(entry):
+    """Return the display values (date, start, end, duration, description) of an entry
+    
+    The end time carries its date when the session ended on a later day.
+    """
+    start_date, start_seconds = split_timestamp(entry.start)
+    end_date, end_seconds = split_timestamp(entry.end)
+    end_str = format_clock(end_seconds)
+    if end_date != start_date:
+        end_str = f"{end_date} {end_str}"
+    return (
+        start_date,
+        format_clock(start_seconds),
+        end_str,
+        format_duration(entry.duration),
+        entry.description
+    )
@@ -0,0 +1,66 @@
+"""Sorted per-sheet index of time entries"""
+import bisect
+
+from timekeeper.entries import day_end, day_start
+
+
+def entry_sort_key(entry):
+    """Sort key ordering entries by start time"""
+    return entry.start
+
+
+class EntryIndex:
+    """Entries of one sheet kept sorted by start time (and so by date)
+    
+    A parallel list of sort keys is maintained with bisect, so adding an
+    entry never re-sorts and date range lookups cost O(log n). Entries with
+    the same key keep their insertion order.
+    """
+    
+    def __init__(self, entries=()):
+        self.entries = sorted(entries, key=entry_sort_key)
+        self.keys = [entry_sort_key(entry) for entry in self.entries]
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def add(self, entry):
+        """Insert an entry at its sorted position and return that position (oldest first)"""
+        key = entry_sort_key(entry)
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.entries.insert(index, entry)
+        return index
+    
+    def position(self, entry):
+        """Return the position of a stored entry (oldest first)"""
+        key = entry_sort_key(entry)
+        index = bisect.bisect_right(self.keys, key) - 1
+        while index > 0 and self.entries[index] is not entry and self.keys[index - 1] == key:
+            index -= 1
+        return index
+    
+    def date_bounds(self, start_date=None, end_date=None):
+        """Return (lo, hi) so entries[lo:hi] are those dated start_date..end_date inclusive"""
+        lo = 0 if start_date is None else bisect.bisect_left(self.keys, day_start(start_date))
+        hi = len(self.keys) if end_date is None else bisect.bisect_left(self.keys, day_end(end_date))
+        return lo, max(lo, hi)
+    
+    def between(self, start_date=None, end_date=None, newest_first=True):
+        """Return the entries dated start_date..end_date inclusive"""
+        lo, hi = self.date_bounds(start_date, end_date)
+        entries = self.entries[lo:hi]
+        if newest_first:
+            entries.reverse()
+        return entries
+    
+    def slice(self, offset, limit, newest_first=True):
+        """Return `limit` entries starting at position `offset` in the given order"""
+        if not newest_first:
+            return self.entries[offset:offset + limit]
+        end = max(0, len(self.entries) - offset)
+        return self.entries[max(0, end - limit):end][::-1]
+    
+    def iter(self, newest_first=True):
+        """Iterate over all entries in the given order"""
+        return reversed(self.entries) if newest_first else iter(self.entries)
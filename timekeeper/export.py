@@ -0,0 +1,455 @@
+"""Export ranges, file naming and the streaming export pipeline
+
+An export is a chain of generators: source (date-ordered lookup) ->
+filter -> merge -> format (batches of rows) -> buffered writer.
+"""
+import csv
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+from timekeeper.columnar import pack_entries, unpack_entries, write_columnar
+from timekeeper.entries import entry_row
+from timekeeper.entry_index import entry_sort_key
+from timekeeper.rollups import iso_week
+from timekeeper.storage import write_atomic
+
+
+def week_range(year, week):
+    """Return the Monday and Sunday (YYYY-MM-DD) of an ISO week"""
+    monday = datetime.strptime(f"{year}-W{week:02d}-1", "%G-W%V-%u")
+    if monday.isocalendar()[:2] != (year, week):
+        raise ValueError(f"{year} has no ISO week {week}")
+    return monday.strftime("%Y-%m-%d"), (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+
+
+def parse_date(text):
+    """Check a YYYY-MM-DD date typed by the user and return it normalized"""
+    return datetime.strptime(text.strip(), "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def export_folder(sheet_name):
+    """Return the export folder of a sheet, creating it if needed"""
+    folder_path = f"exports/{sheet_name.replace(' ', '_')}"
+    os.makedirs(folder_path, exist_ok=True)
+    return folder_path
+
+
+def week_file_stem(year, week):
+    """Return the file name (without extension) used for one ISO week"""
+    return f"sheet_W{week:02d}_{year}"
+
+
+def range_file_stem(start_date, end_date):
+    """Return the file name (without extension) used for a date range"""
+    if start_date is None and end_date is None:
+        return "sheet_all"
+    return f"sheet_{start_date}_to_{end_date}"
+
+
+class ExportCancelled(Exception):
+    """Raised inside an export pipeline when the user cancels it"""
+
+
+# Entries formatted per batch and bytes collected before each write
+BATCH_SIZE = 1000
+WRITE_CHUNK_BYTES = 256 * 1024
+
+COLUMN_NAMES = ["Date", "Start Time", "End Time", "Duration", "Description"]
+
+# Export formats (also the file extensions); the first three are text
+TEXT_FORMATS = ("txt", "csv", "csv.gz")
+CSV_FORMATS = ("csv", "csv.gz")
+COLUMNAR_FORMAT = "tkcol"
+
+
+def open_text_export(path, format_type):
+    """Open a text export file for writing, through a streaming gzip compressor for csv.gz"""
+    if format_type == "csv.gz":
+        return gzip.open(path, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    newline = "" if format_type == "csv" else None
+    return open(path, 'w', newline=newline, encoding='utf-8')
+
+
+def export_header(format_type, sheet_name, title):
+    """Return the header text of an export file"""
+    if format_type in CSV_FORMATS:
+        return format_rows("csv", [COLUMN_NAMES])
+    return (
+        f"Time Entries - {sheet_name}\n"
+        f"{title}\n"
+        + "=" * 80 + "\n\n"
+        + "\t".join(COLUMN_NAMES) + "\n"
+        + "-" * 80 + "\n"
+    )
+
+
+def format_rows(format_type, rows):
+    """Format display rows as TXT (tab separated) or CSV text"""
+    if format_type in CSV_FORMATS:
+        buffer = io.StringIO(newline="")
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join("\t".join(row) + "\n" for row in rows)
+
+
+def source_entries(store, sheet_name, start_date=None, end_date=None, newest_first=True):
+    """Pipeline source: the sheet's entries in the date range, found through the date-ordered lookup"""
+    return store.iter_between(sheet_name, start_date, end_date, newest_first)
+
+
+def filter_entries(entries, predicate=None):
+    """Pipeline filter: drop entries the predicate rejects (no predicate keeps everything)"""
+    if predicate is None:
+        return entries
+    return (entry for entry in entries if predicate(entry))
+
+
+def merge_entries(streams, newest_first=True):
+    """Pipeline merge: combine streams that are each sorted by start time into one sorted stream"""
+    if len(streams) == 1:
+        return iter(streams[0])
+    return heapq.merge(*streams, key=entry_sort_key, reverse=newest_first)
+
+
+def track_progress(entries, progress=None, cancel=None, batch_size=BATCH_SIZE):
+    """Pipeline stage for sinks that take entries: report progress and honour cancel every batch"""
+    done = 0
+    for entry in entries:
+        yield entry
+        done += 1
+        if done % batch_size == 0:
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            if progress is not None:
+                progress(done)
+    if progress is not None:
+        progress(done)
+
+
+def format_batches(entries, format_type, batch_size=BATCH_SIZE):
+    """Pipeline formatter: yield (entry count, text) per batch of entries"""
+    batch = []
+    for entry in entries:
+        batch.append(entry_row(entry))
+        if len(batch) >= batch_size:
+            yield len(batch), format_rows(format_type, batch)
+            batch = []
+    if batch:
+        yield len(batch), format_rows(format_type, batch)
+
+
+def write_batches(filepath, header, batches, progress=None, cancel=None, format_type="txt",
+                  chunk_bytes=WRITE_CHUNK_BYTES):
+    """Pipeline sink: write formatted batches to filepath in large chunks
+    
+    The file is built next to its final name and only replaces it once
+    complete, so a cancelled or failed export leaves the old file alone.
+    progress(done) is called after every batch; once cancel (a
+    threading.Event) is set, ExportCancelled is raised.
+    """
+    tmp_path = f"{filepath}.tmp"
+    done = 0
+    try:
+        with open_text_export(tmp_path, format_type) as f:
+            chunk = [header] if header else []
+            size = len(header or "")
+            for count, text in batches:
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                chunk.append(text)
+                size += len(text)
+                if size >= chunk_bytes:
+                    f.write("".join(chunk))
+                    chunk, size = [], 0
+                done += count
+                if progress is not None:
+                    progress(done)
+            f.write("".join(chunk))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return done
+
+
+def export_sheet(store, sheet_name, filepath, format_type, date_range, include_header=True,
+                 newest_first=True, predicate=None, progress=None, cancel=None):
+    """Stream the entries of a sheet in a (start, end, file stem, title) range to filepath
+    
+    Memory stays bounded by one batch and one write chunk whatever the
+    number of entries. Returns the number of entries written.
+    """
+    start_date, end_date, _, title = date_range
+    entries = source_entries(store, sheet_name, start_date, end_date, newest_first)
+    entries = merge_entries([filter_entries(entries, predicate)], newest_first)
+    if format_type == COLUMNAR_FORMAT:
+        return write_columnar(filepath, track_progress(entries, progress, cancel), {"sheet": sheet_name, "title": title})
+    batches = format_batches(entries, format_type)
+    header = export_header(format_type, sheet_name, title) if include_header else ""
+    return write_batches(filepath, header, batches, progress, cancel, format_type)
+
+
+MANIFEST_NAME = ".export_manifest.json"
+
+# Week files kept open (buffered) at once by export_weeks()
+MAX_OPEN_WEEKS = 4
+
+
+class WeekFile:
+    """Rows routed to one week's export file, with a hash of their text
+    
+    Rows are buffered and only written once the week is complete, so an
+    unchanged week never touches the disk. A week with more rows than a
+    batch spills to its temporary file early.
+    """
+    
+    def __init__(self, filepath, header, format_type):
+        self.filepath = filepath
+        self.tmp_path = f"{filepath}.tmp"
+        self.format_type = format_type
+        self.header = header
+        self.rows = []
+        self.count = 0
+        self.hash = hashlib.sha1(header.encode("utf-8"))
+        self.file = None
+    
+    def add(self, row):
+        """Buffer one display row"""
+        self.rows.append(row)
+        self.count += 1
+        self.hash.update("\x1f".join(row).encode("utf-8") + b"\n")
+        if len(self.rows) >= BATCH_SIZE:
+            self.spill()
+    
+    def spill(self):
+        """Write buffered rows to the temporary file"""
+        if self.file is None:
+            self.file = open_text_export(self.tmp_path, self.format_type)
+            self.file.write(self.header)
+        self.file.write(format_rows(self.format_type, self.rows))
+        self.rows = []
+    
+    def close(self):
+        """Release the open file handle, keeping what was written"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+    
+    def finish(self, known):
+        """Write the week unless known ({"count", "hash"} from the manifest) matches; return whether written"""
+        digest = self.hash.hexdigest()
+        if known == {"count": self.count, "hash": digest} and os.path.exists(self.filepath):
+            self.discard()
+            return False
+        self.spill()
+        self.close()
+        os.replace(self.tmp_path, self.filepath)
+        return True
+    
+    def discard(self):
+        """Drop whatever was written to the temporary file"""
+        self.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def load_manifest(folder_path):
+    """Read the {file name: {"count", "hash"}} record of week files written before"""
+    try:
+        with open(os.path.join(folder_path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_weeks(store, sheet_name, format_type, include_header=True, newest_first=True,
+                 progress=None, cancel=None, max_open=MAX_OPEN_WEEKS):
+    """Write one sheet_W{week}_{year} file per ISO week in a single pass over the sheet
+    
+    Entries are routed to a small pool of WeekFile writers; the least
+    recently used one is finished when a new week needs a slot, which is
+    safe since the date-ordered source yields each week's entries
+    together. A week whose entry count and content hash match the manifest
+    of the last export is skipped. Returns (files written, files skipped).
+    """
+    if format_type not in TEXT_FORMATS:
+        raise ValueError("Split by week supports the text formats only")
+    folder_path = export_folder(sheet_name)
+    manifest = load_manifest(folder_path)
+    pool = OrderedDict()  # "YYYY-Www" -> WeekFile
+    written = skipped = done = 0
+    
+    def finish(week_key):
+        nonlocal written, skipped
+        week_file = pool.pop(week_key)
+        name = os.path.basename(week_file.filepath)
+        if week_file.finish(manifest.get(name)):
+            written += 1
+        else:
+            skipped += 1
+        manifest[name] = {"count": week_file.count, "hash": week_file.hash.hexdigest()}
+    
+    try:
+        for entry in source_entries(store, sheet_name, newest_first=newest_first):
+            row = entry_row(entry)
+            week_key = iso_week(row[0])
+            week_file = pool.get(week_key)
+            if week_file is None:
+                if len(pool) >= max_open:
+                    finish(next(iter(pool)))
+                year, week = week_key.split("-W")
+                title = f"Week {int(week)}, {year}"
+                header = export_header(format_type, sheet_name, title) if include_header else ""
+                filepath = f"{folder_path}/{week_file_stem(int(year), int(week))}.{format_type}"
+                week_file = pool[week_key] = WeekFile(filepath, header, format_type)
+            else:
+                pool.move_to_end(week_key)
+            week_file.add(row)
+            
+            done += 1
+            if done % BATCH_SIZE == 0:
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                if progress is not None:
+                    progress(done)
+        
+        while pool:
+            finish(next(iter(pool)))
+        if progress is not None:
+            progress(done)
+    finally:
+        # Weeks still in the pool were cut short by an error or cancel
+        for week_file in pool.values():
+            week_file.discard()
+        write_atomic(os.path.join(folder_path, MANIFEST_NAME), json.dumps(manifest, indent=2))
+    return written, skipped
+
+
+def month_range(year, month):
+    """Return the first and last day (YYYY-MM-DD) of a month"""
+    first = datetime(year, month, 1)
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    return first.strftime("%Y-%m-%d"), (next_month - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def format_snapshot(sheet_name, columns, descriptions, format_type, title, include_header=True, newest_first=True):
+    """Format a sheet's packed entries (oldest first, see pack_entries) into the text of its export file
+    
+    Runs in a formatter process of export_all_sheets(), or on a thread
+    where processes are unavailable; returns (text, seconds spent
+    formatting).
+    """
+    start = time.perf_counter()
+    entries = unpack_entries(columns, descriptions)
+    if newest_first:
+        entries = reversed(list(entries))
+    chunks = [export_header(format_type, sheet_name, title)] if include_header else []
+    chunks.extend(text for _, text in format_batches(entries, format_type))
+    return "".join(chunks), time.perf_counter() - start
+
+
+def write_text(filepath, text, format_type):
+    """Write a formatted export file atomically; returns the seconds it took"""
+    start = time.perf_counter()
+    tmp_path = f"{filepath}.tmp"
+    with open_text_export(tmp_path, format_type) as f:
+        f.write(text)
+    os.replace(tmp_path, filepath)
+    return time.perf_counter() - start
+
+
+def formatter_pool(max_workers=None):
+    """Return a process pool for CPU-bound formatting, or None where processes are unavailable"""
+    try:
+        return ProcessPoolExecutor(max_workers)
+    except (OSError, NotImplementedError, ImportError):
+        return None
+
+
+def export_all_sheets(snapshots, format_type, date_range, include_header=True, newest_first=True,
+                      max_workers=None, io_workers=4):
+    """Export a snapshot of several sheets at the same time
+    
+    snapshots maps sheet names to their entries (oldest first) in
+    date_range. Sheets are formatted in a process pool and each finished
+    text is handed to a thread pool that writes the file. Workers get the
+    entries packed into arrays (pack_entries), which pickle as raw bytes
+    instead of one object per entry. Sheets the process pool cannot format
+    (it could not start, or broke) are formatted on threads instead.
+    Returns {sheet name: {"file", "entries", "format_seconds",
+    "write_seconds", "wall_seconds", "error"}}, wall_seconds being the time
+    from the start of the export until the sheet's file was written.
+    """
+    started = time.perf_counter()
+    _, _, file_stem, title = date_range
+    results = {
+        sheet_name: {"file": None, "entries": len(entries), "format_seconds": None, "write_seconds": None,
+                     "wall_seconds": None, "error": None}
+        for sheet_name, entries in snapshots.items()
+    }
+    packed = {sheet_name: pack_entries(entries) for sheet_name, entries in snapshots.items()}
+    
+    processes = formatter_pool(max_workers)
+    threads = None  # Formats what the process pool could not, created when first needed
+    
+    def submit(sheet_name, retry=False):
+        nonlocal threads
+        args = (sheet_name, *packed[sheet_name], format_type, title, include_header, newest_first)
+        if processes is not None and not retry:
+            try:
+                return processes.submit(format_snapshot, *args)
+            except BrokenProcessPool:
+                pass
+        if threads is None:
+            threads = ThreadPoolExecutor(max_workers)
+        return threads.submit(format_snapshot, *args)
+    
+    def write_sheet(filepath, text):
+        seconds = write_text(filepath, text, format_type)
+        return seconds, time.perf_counter() - started
+    
+    try:
+        with ThreadPoolExecutor(io_workers) as writers:
+            formatting = {submit(sheet_name): sheet_name for sheet_name in packed}
+            writing = {}
+            while formatting:
+                retries = {}
+                for future in as_completed(formatting):
+                    sheet_name = formatting[future]
+                    result = results[sheet_name]
+                    try:
+                        text, result["format_seconds"] = future.result()
+                        filepath = f"{export_folder(sheet_name)}/{file_stem}.{format_type}"
+                    except BrokenProcessPool:
+                        # A worker died or could not start, which fails every sheet left in the pool
+                        retries[submit(sheet_name, retry=True)] = sheet_name
+                        continue
+                    except Exception as e:
+                        result["error"] = str(e) or type(e).__name__
+                        continue
+                    writing[writers.submit(write_sheet, filepath, text)] = (sheet_name, filepath)
+                formatting = retries
+            
+            for future in as_completed(writing):
+                sheet_name, filepath = writing[future]
+                result = results[sheet_name]
+                try:
+                    result["write_seconds"], result["wall_seconds"] = future.result()
+                    result["file"] = filepath
+                except Exception as e:
+                    result["error"] = str(e) or type(e).__name__
+    finally:
+        for pool in (processes, threads):
+            if pool is not None:
+                pool.shutdown()
+    return results
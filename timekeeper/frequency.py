@@ -0,0 +1,181 @@
+"""Bounded description frequency ranked by exponentially decayed use"""
+import bisect
+import heapq
+import math
+import time
+
+
+# Days after which an unused description's weight has halved
+HALF_LIFE_DAYS = 30
+DECAY_RATE = math.log(2) / (HALF_LIFE_DAYS * 86400)  # Per second
+
+# Descriptions kept per sheet; the lowest ranked are dropped beyond this
+MAX_DESCRIPTIONS = 1000
+
+# Best descriptions kept ranked at all times, for the description dialog
+TOP_DESCRIPTIONS = 20
+
+
+def log_add(a, b):
+    """Return log(exp(a) + exp(b)) without overflowing"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def used(stats, when, count=1):
+    """Return [log weight, last used, count] after uses at epoch time when (stats is None for a new description)"""
+    log_use = DECAY_RATE * when + math.log(count)
+    if stats is None:
+        return [log_use, when, count]
+    log_weight, last_used, total = stats
+    return [log_add(log_weight, log_use), max(last_used, when), total + count]
+
+
+def is_count_data(data):
+    """Check whether saved frequency data is the plain {description: count} of older versions"""
+    return any(not isinstance(value, list) for value in data.values())
+
+
+class FrequencyTable:
+    """Use statistics of a sheet's descriptions, capped at max_size descriptions
+    
+    A use at epoch time t adds exp(DECAY_RATE * t) to a description's
+    weight, so weight * exp(-DECAY_RATE * now) is its use count with every
+    use halving in value each HALF_LIFE_DAYS: recent and frequent uses both
+    rank high. Only the logarithm of the weight is stored, which never
+    overflows, and since all weights decay at the same rate their order only
+    changes when a description is used. So the ranking needs no periodic
+    rescoring: self.top is updated in place on each use and a min-heap
+    finds the description to evict.
+    """
+    
+    def __init__(self, max_size=MAX_DESCRIPTIONS, top_size=TOP_DESCRIPTIONS):
+        self.max_size = max_size
+        self.top_size = top_size
+        self.stats = {}  # description -> [log weight, last used epoch, use count]
+        self.heap = []  # (log weight, last used, description), lowest first; outdated tuples are skipped
+        self.top = []  # Best top_size descriptions, best first
+    
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        """Restore a table saved with to_dict()"""
+        table = cls(**kwargs)
+        for description, (log_weight, last_used, count) in data.items():
+            table.stats[description] = [log_weight, last_used, count]
+        table.rebuild()
+        return table
+    
+    @classmethod
+    def from_counts(cls, counts, entries=(), **kwargs):
+        """Convert plain {description: count} data, dating each description by its last entry
+        
+        Descriptions with no entry left (after a reset) count as used when
+        the oldest of the others was, or now if there are none.
+        """
+        last_used = {}
+        for entry in entries:
+            last_used[entry.description] = max(last_used.get(entry.description, 0), entry.end)
+        default = min(last_used.values()) if last_used else int(time.time())
+        
+        table = cls(**kwargs)
+        for description, count in counts.items():
+            when = last_used.get(description, default)
+            table.stats[description] = [DECAY_RATE * when + math.log(max(count, 1)), when, count]
+        table.rebuild()
+        return table
+    
+    @classmethod
+    def from_saved(cls, data, entries=(), **kwargs):
+        """Restore saved frequency data of any version; entries are only read for old plain counts"""
+        if is_count_data(data):
+            return cls.from_counts(data, entries, **kwargs)
+        return cls.from_dict(data, **kwargs)
+    
+    def to_dict(self):
+        """Copy the statistics into a JSON-ready dict"""
+        return {description: list(stats) for description, stats in self.stats.items()}
+    
+    def copy(self):
+        """Return an independent copy of the table"""
+        return FrequencyTable.from_dict(self.to_dict(), max_size=self.max_size, top_size=self.top_size)
+    
+    def __len__(self):
+        return len(self.stats)
+    
+    def __contains__(self, description):
+        return description in self.stats
+    
+    def rank_key(self, description):
+        """Sort key putting the best descriptions first (then the most recently used)"""
+        log_weight, last_used, _ = self.stats[description]
+        return -log_weight, -last_used, description
+    
+    def count(self, description):
+        """Return how many times a description was used"""
+        return self.stats[description][2]
+    
+    def score(self, description, now=None):
+        """Return the decayed use count of a description at epoch time now"""
+        now = time.time() if now is None else now
+        return math.exp(self.stats[description][0] - DECAY_RATE * now)
+    
+    def ranking(self):
+        """Return every description, best first"""
+        return sorted(self.stats, key=self.rank_key)
+    
+    def counts(self):
+        """Return (description, use count) pairs, best first"""
+        return [(description, self.stats[description][2]) for description in self.ranking()]
+    
+    def rebuild(self):
+        """Recompute the heap and the top list from self.stats, evicting past max_size"""
+        self.heap = [(stats[0], stats[1], description) for description, stats in self.stats.items()]
+        heapq.heapify(self.heap)
+        self.evict()
+        self.top = self.ranking()[:self.top_size]
+    
+    def use(self, description, when, count=1):
+        """Record uses of a description at epoch time when; returns the descriptions evicted"""
+        stats = self.stats[description] = used(self.stats.get(description), when, count)
+        heapq.heappush(self.heap, (stats[0], stats[1], description))
+        self.update_top(description)
+        
+        evicted = self.evict(keep=description)
+        if any(name in self.top for name in evicted):
+            # Only possible when top_size is not below max_size; the kept description may belong in its place
+            self.top = self.ranking()[:self.top_size]
+        if len(self.heap) > 2 * len(self.stats) + 64:
+            # Drop outdated heap tuples
+            self.heap = [(stats[0], stats[1], name) for name, stats in self.stats.items()]
+            heapq.heapify(self.heap)
+        return evicted
+    
+    def update_top(self, description):
+        """Move a description whose weight grew to its place in the top list"""
+        if description in self.top:
+            self.top.remove(description)
+        keys = [self.rank_key(name) for name in self.top]
+        position = bisect.bisect_left(keys, self.rank_key(description))
+        if position < self.top_size:
+            self.top.insert(position, description)
+            del self.top[self.top_size:]
+    
+    def evict(self, keep=None):
+        """Drop the lowest ranked descriptions past max_size (never `keep`); returns them"""
+        evicted = []
+        kept = []
+        while len(self.stats) > self.max_size and self.heap:
+            item = heapq.heappop(self.heap)
+            log_weight, last_used, description = item
+            stats = self.stats.get(description)
+            if stats is None or stats[0] != log_weight or stats[1] != last_used:
+                continue
+            if description == keep:
+                kept.append(item)
+                continue
+            del self.stats[description]
+            evicted.append(description)
+        for item in kept:
+            heapq.heappush(self.heap, item)
+        return evicted
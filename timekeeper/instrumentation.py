@@ -0,0 +1,206 @@
+"""Call counts and latency histograms of named operations, with optional cProfile capture
+
+Code under measurement is wrapped with the `timed` context manager or the
+`timer` decorator:
+    
+    with timed("export"):
+        ...
+    
+    @timer("update_table")
+    def update_table(self):
+        ...
+
+Recording one call takes a lock and a few additions, so instrumentation
+stays on all the time. profile_next() arms cProfile for the next call of
+one operation and dumps that call's profile to a .prof file, readable with
+`python -m pstats` or snakeviz.
+"""
+import bisect
+import cProfile
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+logger = logging.getLogger("timekeeper.instrumentation")
+
+# Upper bounds (milliseconds) of the histogram buckets; slower calls go in a last, open bucket
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Folder that profile_next() writes .prof files to by default
+DEFAULT_PROFILE_FOLDER = "profiles"
+
+
+def bucket_label(index):
+    """Return the label of a histogram bucket, such as 5-10 ms"""
+    if index == len(BUCKET_BOUNDS_MS):
+        return f"> {BUCKET_BOUNDS_MS[-1]} ms"
+    low = BUCKET_BOUNDS_MS[index - 1] if index else 0
+    return f"{low}-{BUCKET_BOUNDS_MS[index]} ms"
+
+
+class OperationStats:
+    """Call count, total and maximum latency and latency histogram of one operation"""
+    
+    __slots__ = ("count", "total", "max", "buckets")
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+    
+    def add(self, seconds):
+        """Record one call taking `seconds`"""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+    
+    def copy(self):
+        """Return an independent copy"""
+        stats = OperationStats()
+        stats.count, stats.total, stats.max, stats.buckets = self.count, self.total, self.max, list(self.buckets)
+        return stats
+    
+    def mean(self):
+        """Return the mean latency in seconds"""
+        return self.total / self.count if self.count else 0.0
+    
+    def percentile(self, fraction):
+        """Estimate a latency percentile in seconds from the histogram (the upper bound of its bucket)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                if index == len(BUCKET_BOUNDS_MS):
+                    return self.max
+                return min(BUCKET_BOUNDS_MS[index] / 1000, self.max)
+        return self.max
+
+
+class Instrumentation:
+    """Latency statistics of named operations, safe to record from any thread"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}  # operation name -> OperationStats
+        self.armed = None  # (operation name, .prof path) to profile on its next call
+        self.profiling = False  # Only one cProfile profiler may run at a time
+        self.last_profile = None  # Path of the last .prof file written
+        self.last_profile_error = None
+    
+    def record(self, name, seconds):
+        """Record one call of an operation taking `seconds`"""
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = OperationStats()
+            stats.add(seconds)
+    
+    @contextmanager
+    def timed(self, name):
+        """Time the enclosed block as one call of an operation (profiling it if armed)"""
+        profiler = self.start_profile(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+            if profiler is not None:
+                self.finish_profile(*profiler)
+    
+    def timer(self, name=None):
+        """Decorator timing every call of a function (named after the function by default)"""
+        def decorate(function):
+            operation = name or function.__name__
+            
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timed(operation):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def snapshot(self):
+        """Return a copy of the statistics as {operation name: OperationStats}"""
+        with self.lock:
+            return {name: stats.copy() for name, stats in self.stats.items()}
+    
+    def reset(self):
+        """Forget all statistics"""
+        with self.lock:
+            self.stats.clear()
+    
+    def profile_next(self, name, path=None):
+        """Profile the next call of an operation with cProfile; returns the absolute .prof path it will be written to"""
+        if path is None:
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            safe_name = "".join(char if char.isalnum() else "_" for char in name)
+            path = os.path.join(DEFAULT_PROFILE_FOLDER, f"{safe_name}-{stamp}.prof")
+        path = os.path.abspath(path)
+        with self.lock:
+            self.armed = (name, path)
+        return path
+    
+    def cancel_profile(self):
+        """Disarm a pending profile_next()"""
+        with self.lock:
+            self.armed = None
+    
+    def profile_pending(self):
+        """Return the operation name armed for profiling, or None"""
+        with self.lock:
+            return self.armed[0] if self.armed is not None else None
+    
+    def start_profile(self, name):
+        """Start profiling if this operation is armed; returns (profiler, path) or None"""
+        with self.lock:
+            if self.armed is None or self.armed[0] != name or self.profiling:
+                return None
+            path = self.armed[1]
+            self.armed = None
+            self.profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler (such as a debugger's) is already active
+            with self.lock:
+                self.profiling = False
+                self.last_profile_error = e
+            logger.warning("Could not profile %s: %s", name, e)
+            return None
+        return profiler, path
+    
+    def finish_profile(self, profiler, path):
+        """Stop a profiler and write its statistics to path"""
+        profiler.disable()
+        try:
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            self.last_profile_error = e
+            logger.warning("Could not write profile %s: %s", path, e)
+        else:
+            self.last_profile = path
+            self.last_profile_error = None
+            logger.info("Wrote profile %s", path)
+        finally:
+            with self.lock:
+                self.profiling = False
+
+
+# Shared by the whole application
+instrumentation = Instrumentation()
+timed = instrumentation.timed
+timer = instrumentation.timer
@@ -0,0 +1,53 @@
+"""Exclusive lock keeping two processes from opening the same sheets at once"""
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+class StoreLocked(OSError):
+    """Raised when another process holds the lock of the same config file"""
+
+
+class LockFile:
+    """Non-blocking exclusive lock on a file, held until release() or the process exits
+    
+    The lock is the operating system's (flock, or msvcrt.locking on
+    Windows) rather than the file's existence, so a crashed process never
+    leaves a stale lock behind; the file itself stays and is reused.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+    
+    def acquire(self):
+        """Take the lock, raising StoreLocked if another process holds it"""
+        if self.fd is not None:
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            raise StoreLocked(f"Another Time Tracker process (the GUI or a running command) has these sheets "
+                              f"open ({self.path}); close it and try again") from None
+        self.fd = fd
+    
+    def release(self):
+        """Give the lock up"""
+        if self.fd is None:
+            return
+        if fcntl is None:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        # Closing the descriptor releases a flock
+        os.close(self.fd)
+        self.fd = None
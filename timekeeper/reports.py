@@ -0,0 +1,168 @@
+"""Grouped time totals computed over column arrays of a sheet's entries
+
+Entries are copied once into flat columns (stdlib `array`, viewed as NumPy
+arrays when NumPy is installed) and every report sums a whole column per
+group in one batch instead of walking entry dicts.
+"""
+from array import array
+from datetime import date
+from functools import lru_cache
+
+from timekeeper.entries import local_hour
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Report groupings offered by group_totals()
+GROUPS = ("day", "week", "month", "description")
+
+
+@lru_cache(maxsize=8192)
+def hour_day(hour):
+    """Return (local date ordinal, seconds since local midnight) at the start of a UTC hour"""
+    date_str, day_seconds = local_hour(hour)
+    year, month, day = date_str.split("-")
+    return date(int(year), int(month), int(day)).toordinal(), day_seconds
+
+
+def week_label(week):
+    """Label a Monday-based week number (days since 0001-01-01 // 7) as an ISO week"""
+    year, number, _ = date.fromordinal(week * 7 + 1).isocalendar()
+    return f"{year}-W{number:02d}"
+
+
+def month_number(day):
+    """Return year * 12 + month - 1 of a date ordinal"""
+    day_date = date.fromordinal(day)
+    return day_date.year * 12 + day_date.month - 1
+
+
+def month_label(month):
+    """Label a month number (year * 12 + month - 1) as YYYY-MM"""
+    year, month = divmod(month, 12)
+    return f"{year}-{month + 1:02d}"
+
+
+def day_label(day):
+    """Label a date ordinal as YYYY-MM-DD"""
+    return date.fromordinal(day).isoformat()
+
+
+class SheetColumns:
+    """Column-oriented copy of a sheet's entries
+    
+    starts and durations hold epoch seconds, description_ids index into
+    descriptions. Local start days are derived lazily, converting each
+    distinct hour to local time only once.
+    """
+    
+    def __init__(self, entries=()):
+        self.starts = array("q")
+        self.durations = array("q")
+        self.description_ids = array("q")
+        self.descriptions = []
+        self.description_lookup = {}
+        self.days = None
+        for entry in entries:
+            self.add(entry)
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def add(self, entry):
+        """Append one entry to the columns"""
+        description = entry.description
+        description_id = self.description_lookup.get(description)
+        if description_id is None:
+            description_id = self.description_lookup[description] = len(self.descriptions)
+            self.descriptions.append(description)
+        self.starts.append(entry.start)
+        self.durations.append(entry.duration)
+        self.description_ids.append(description_id)
+        self.days = None
+    
+    def day_column(self):
+        """Return the local date ordinal each entry started on"""
+        if self.days is not None:
+            return self.days
+        
+        if numpy is not None and len(self.starts):
+            starts = numpy.frombuffer(self.starts, dtype=numpy.int64)
+            hours, inverse = numpy.unique(starts // 3600, return_inverse=True)
+            hour_days = numpy.empty(len(hours), dtype=numpy.int64)
+            hour_seconds = numpy.empty(len(hours), dtype=numpy.int64)
+            for i, hour in enumerate(hours.tolist()):
+                hour_days[i], hour_seconds[i] = hour_day(hour)
+            # Hours that cross local midnight (half-hour time zones) roll over to the next day
+            rollover = hour_seconds[inverse] + starts % 3600 >= 86400
+            self.days = array("q", (hour_days[inverse] + rollover).tobytes())
+        else:
+            days = array("q")
+            for start in self.starts:
+                hour, offset = divmod(start, 3600)
+                day, day_seconds = hour_day(hour)
+                days.append(day + 1 if day_seconds + offset >= 86400 else day)
+            self.days = days
+        return self.days
+    
+    def group_keys(self, group):
+        """Return (key column, function turning a key into its label) for a grouping"""
+        if group == "description":
+            return self.description_ids, self.descriptions.__getitem__
+        
+        days = self.day_column()
+        if group == "day":
+            return days, day_label
+        if group == "week":
+            if numpy is not None and len(days):
+                weeks = (numpy.frombuffer(days, dtype=numpy.int64) - 1) // 7
+                return array("q", weeks.tobytes()), week_label
+            return array("q", ((day - 1) // 7 for day in days)), week_label
+        if group == "month":
+            if numpy is not None and len(days):
+                unique, inverse = numpy.unique(numpy.frombuffer(days, dtype=numpy.int64), return_inverse=True)
+                months = numpy.array([month_number(day) for day in unique.tolist()], dtype=numpy.int64)
+                return array("q", months[inverse].tobytes()), month_label
+            months = {day: month_number(day) for day in set(days)}
+            return array("q", (months[day] for day in days)), month_label
+        raise ValueError(f"Unknown report group: {group}")
+
+
+def group_totals(columns, group):
+    """Sum durations per group
+    
+    Returns (label, total seconds, entry count) tuples in key order (dates
+    ascending), or by total descending for descriptions.
+    """
+    keys, label = columns.group_keys(group)
+    
+    if numpy is not None and len(keys):
+        unique, inverse = numpy.unique(numpy.frombuffer(keys, dtype=numpy.int64), return_inverse=True)
+        durations = numpy.frombuffer(columns.durations, dtype=numpy.int64)
+        totals = numpy.bincount(inverse, weights=durations, minlength=len(unique))
+        counts = numpy.bincount(inverse, minlength=len(unique))
+        rows = [
+            (key, int(round(total)), int(count))
+            for key, total, count in zip(unique.tolist(), totals.tolist(), counts.tolist())
+        ]
+    else:
+        totals = {}
+        counts = {}
+        for key, duration in zip(keys, columns.durations):
+            totals[key] = totals.get(key, 0) + duration
+            counts[key] = counts.get(key, 0) + 1
+        rows = [(key, totals[key], counts[key]) for key in sorted(totals)]
+    
+    if group == "description":
+        rows.sort(key=lambda row: row[1], reverse=True)
+    return [(label(key), total, count) for key, total, count in rows]
+
+
+def total_seconds(columns):
+    """Return the summed duration of all entries"""
+    if numpy is not None and len(columns.durations):
+        return int(numpy.frombuffer(columns.durations, dtype=numpy.int64).sum())
+    return sum(columns.durations)
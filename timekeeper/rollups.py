@@ -0,0 +1,70 @@
+"""Running per-sheet totals by day, ISO week and description"""
+from datetime import datetime
+from functools import lru_cache
+
+from timekeeper.entries import entry_date
+
+
+# Rollup tables kept for every sheet, keyed by YYYY-MM-DD, YYYY-Www and description
+ROLLUP_KINDS = ("days", "weeks", "descriptions")
+
+
+@lru_cache(maxsize=4096)
+def iso_week(date_str):
+    """Return the ISO week (YYYY-Www) of a YYYY-MM-DD date"""
+    year, week, _ = datetime.strptime(date_str, "%Y-%m-%d").isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def rollup_keys(entry):
+    """Return the (kind, key) pairs an entry's duration is added to"""
+    day = entry_date(entry)
+    return (("days", day), ("weeks", iso_week(day)), ("descriptions", entry.description))
+
+
+class Rollup:
+    """Seconds tracked per day, ISO week and description on one sheet
+    
+    Adding an entry updates three dict slots, so totals never need a pass
+    over the entries; only a reset starts again from an empty rollup.
+    """
+    
+    def __init__(self, totals=None, entries=0):
+        self.totals = {kind: dict((totals or {}).get(kind, {})) for kind in ROLLUP_KINDS}
+        self.entries = entries  # Entries summed so far, to check a persisted rollup
+    
+    @classmethod
+    def from_entries(cls, entries):
+        """Build a rollup by summing a sheet's entries"""
+        rollup = cls()
+        for entry in entries:
+            rollup.add(entry)
+        return rollup
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a rollup saved with to_dict()"""
+        return cls(data, data.get("entries", 0))
+    
+    def to_dict(self):
+        """Copy the totals into a JSON-ready dict"""
+        data = {kind: dict(totals) for kind, totals in self.totals.items()}
+        data["entries"] = self.entries
+        return data
+    
+    def add(self, entry):
+        """Add an entry's duration to its day, week and description"""
+        for kind, key in rollup_keys(entry):
+            totals = self.totals[kind]
+            totals[key] = totals.get(key, 0) + entry.duration
+        self.entries += 1
+    
+    def total(self, kind, key):
+        """Return the seconds summed under one key"""
+        return self.totals[kind].get(key, 0)
+    
+    def rows(self):
+        """Yield (kind, key, seconds) for every total"""
+        for kind, totals in self.totals.items():
+            for key, seconds in totals.items():
+                yield kind, key, seconds
@@ -0,0 +1,563 @@
+"""Storage split into one file per sheet and month, loading old months on demand"""
+import gzip
+import json
+import lzma
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from timekeeper.description_table import DescriptionTable, decode_entries, encode_entries
+from timekeeper.entries import entry_date
+from timekeeper.entry_index import EntryIndex
+from timekeeper.frequency import FrequencyTable, is_count_data
+from timekeeper.rollups import Rollup
+from timekeeper.storage import JournalStore, Store, write_atomic
+from timekeeper.writer import BackgroundWriter
+
+
+# Segments older than the previous month kept in memory at once (least recently used are dropped)
+MAX_HISTORY_SEGMENTS = 12
+
+INDEX_VERSION = 1
+
+# Compression modules of archived months, by file suffix
+ARCHIVE_FORMATS = {"gz": gzip, "xz": lzma}
+
+# Decompressed text of archived months kept to skip decompressing them again
+ARCHIVE_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def entry_month(entry):
+    """Return the YYYY-MM segment an entry belongs to (the local month it started in)"""
+    return entry_date(entry)[:7]
+
+
+def recent_months(today=None):
+    """Return the previous and current YYYY-MM months"""
+    today = today or datetime.now()
+    year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    return f"{year}-{month:02d}", today.strftime("%Y-%m")
+
+
+def shift_month(month, delta):
+    """Return the YYYY-MM month `delta` months after (or before, if negative) a YYYY-MM month"""
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + delta, 12)
+    return f"{year}-{number + 1:02d}"
+
+
+def write_segment_file(path, text, archive_format=None):
+    """Write a segment file atomically, compressed with an ARCHIVE_FORMATS module if one is given"""
+    data = text.encode("utf-8")
+    if archive_format is not None:
+        data = ARCHIVE_FORMATS[archive_format].compress(data)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ArchiveCache:
+    """Decompressed text of archived segment files, least recently used dropped past max_bytes
+    
+    Parsed segments are dropped from memory quickly since they are several
+    times larger than their text; keeping the text spares the decompression
+    when the same old months are read again.
+    """
+    
+    def __init__(self, max_bytes=ARCHIVE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.texts = OrderedDict()  # path -> text
+        self.size = 0
+    
+    def get(self, path):
+        """Return the cached text of a file, or None"""
+        text = self.texts.get(path)
+        if text is not None:
+            self.texts.move_to_end(path)
+        return text
+    
+    def put(self, path, text):
+        """Cache the text of a file"""
+        self.discard(path)
+        self.texts[path] = text
+        self.size += len(text)
+        while self.size > self.max_bytes and len(self.texts) > 1:
+            _, dropped = self.texts.popitem(last=False)
+            self.size -= len(dropped)
+    
+    def discard(self, path):
+        """Forget a file that was rewritten"""
+        text = self.texts.pop(path, None)
+        if text is not None:
+            self.size -= len(text)
+
+
+class SegmentStore(Store):
+    """Keeps each sheet's entries in per-month files listed by a small index file
+    
+    Layout of the segment folder:
+        
+        index.json        sheet order, folder and per-month entry counts,
+                          archived months, description frequency and rollup
+                          of every sheet
+        s1/2025-06.json   entries of one sheet's month, sorted by start time,
+                          dictionary-encoded (see description_table)
+        s1/2023-01.json.xz  an archived month, compressed with gzip or lzma
+    
+    Loading reads the index plus the current and previous month of each
+    sheet. Older months are read when a reader reaches them (scrolling far
+    back, exporting an old range, reports) and at most max_segments of them
+    stay in memory. Counts, totals and description frequency come from the
+    index, so they never need the entries. Changed months are rewritten by
+    a BackgroundWriter before the index, so the index never lists a month
+    whose file is missing.
+    
+    With archive_after_months set, months that much older than the current
+    one are compressed (archive_format "gz" or "xz") by the writer thread
+    after loading. Archived months are read like any other, through an
+    ArchiveCache of their decompressed text.
+    
+    The current month is today's unless a `today` datetime is given, as
+    the benchmark does for data ending at a fixed date.
+    """
+    
+    def __init__(self, folder, import_file=None, max_segments=MAX_HISTORY_SEGMENTS,
+                 archive_after_months=None, archive_format="xz", today=None):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.folder = folder
+        self.index_file = os.path.join(folder, "index.json")
+        self.import_file = import_file
+        self.max_segments = max_segments
+        self.archive_after_months = archive_after_months
+        self.archive_format = archive_format
+        self.today = today  # None for datetime.now()
+        self.archive_cache = ArchiveCache()
+        self.archive_requested = False
+        self.sheets = {}  # {"Sheet Name": {"dir": "s1", "months": {"YYYY-MM": count}, "archived": {"YYYY-MM": "xz"}, "descriptions": DescriptionTable, "frequency": FrequencyTable, "rollup": Rollup}}
+        self.segments = OrderedDict()  # (sheet, month) -> EntryIndex, least recently used first
+        self.dirty = {}  # (sheet, month) -> change counter of segments not written yet
+        self.removed_dirs = []  # Folders of removed or reset sheets, deleted after the next index write
+        self.next_dir = 1
+        self.recent_month = recent_months(today)[0]  # Months from this one on are never evicted
+        self.lock = threading.RLock()
+        self.writer = None
+        self.versions = {}  # Per-sheet change counters
+    
+    def load(self):
+        """Read the index and the recent months of every sheet, importing the JSON config on first use"""
+        if os.path.exists(self.index_file):
+            self.load_index()
+        elif self.import_file:
+            # The config file may not exist while its journal does; JournalStore reads both
+            self.import_json(self.import_file)
+        
+        if self.archive_after_months is not None and self.archive_candidates():
+            with self.lock:
+                self.archive_requested = True
+            self.schedule_write()
+    
+    def load_index(self):
+        """Read the index file and the current and previous month of every sheet"""
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.next_dir = index.get("next_dir", 1)
+        for sheet_name, sheet_data in index.get("sheets", {}).items():
+            self.sheets[sheet_name] = {
+                "dir": sheet_data["dir"],
+                "months": dict(sheet_data.get("months", {})),
+                "archived": dict(sheet_data.get("archived", {})),
+                "descriptions": DescriptionTable(),
+                "frequency": sheet_data.get("frequency", {}),  # Restored below, it may need the entries
+                "rollup": Rollup.from_dict(sheet_data.get("rollup", {}))
+            }
+        
+        previous_month, current_month = recent_months(self.today)
+        for sheet_name, sheet_data in self.sheets.items():
+            for month in (previous_month, current_month):
+                if month in sheet_data["months"]:
+                    self.segment(sheet_name, month)
+            
+            # A rollup not matching the month counts is rebuilt from every segment
+            if sheet_data["rollup"].entries != self.count_entries(sheet_name):
+                sheet_data["rollup"] = Rollup.from_entries(self.iter_entries(sheet_name, newest_first=False))
+                self.schedule_write()
+            
+            # Plain counts of older versions are dated by reading every segment once
+            frequency = sheet_data["frequency"]
+            if is_count_data(frequency):
+                self.schedule_write()
+            sheet_data["frequency"] = FrequencyTable.from_saved(frequency, self.iter_entries(sheet_name))
+    
+    def import_json(self, path):
+        """Split the sheets of a JSON config file (and its journal, if any) into month segments
+        
+        The source files are only read, so they still work with the JSON
+        storage modes and older versions.
+        """
+        source = JournalStore(path)
+        source.read()
+        sheets = source.sheets
+        
+        with self.lock:
+            for sheet_name, sheet_data in sheets.items():
+                self.add_sheet(sheet_name)
+                months = {}
+                for entry in sheet_data["index"].entries:
+                    months.setdefault(entry_month(entry), []).append(entry)
+                for month, entries in months.items():
+                    self.segments[(sheet_name, month)] = EntryIndex(entries)
+                    self.mark_dirty(sheet_name, month)
+                    self.sheets[sheet_name]["months"][month] = len(entries)
+                # Imported as-is since a reset keeps the frequency of deleted entries
+                self.sheets[sheet_name]["frequency"] = sheet_data["frequency"]
+                self.sheets[sheet_name]["descriptions"] = sheet_data["descriptions"]
+                self.sheets[sheet_name]["rollup"] = sheet_data["rollup"]
+        self.save()
+        with self.lock:
+            self.evict()
+    
+    def segment_path(self, sheet_name, month):
+        """Return the file of one month of a sheet"""
+        sheet_data = self.sheets[sheet_name]
+        path = os.path.join(self.folder, sheet_data["dir"], f"{month}.json")
+        archive_format = sheet_data["archived"].get(month)
+        return path if archive_format is None else f"{path}.{archive_format}"
+    
+    def read_segment(self, sheet_name, month):
+        """Read the entries of one month of a sheet, decompressing an archived month"""
+        path = self.segment_path(sheet_name, month)
+        table = self.sheets[sheet_name]["descriptions"]
+        archive_format = self.sheets[sheet_name]["archived"].get(month)
+        if archive_format is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                return decode_entries(json.load(f), table)
+        
+        text = self.archive_cache.get(path)
+        if text is None:
+            with open(path, 'rb') as f:
+                text = ARCHIVE_FORMATS[archive_format].decompress(f.read()).decode('utf-8')
+            self.archive_cache.put(path, text)
+        return decode_entries(json.loads(text), table)
+    
+    def segment(self, sheet_name, month):
+        """Return the EntryIndex of one month of a sheet, reading it from disk if needed"""
+        with self.lock:
+            key = (sheet_name, month)
+            index = self.segments.get(key)
+            if index is not None:
+                self.segments.move_to_end(key)
+                return index
+            
+            months = self.sheets[sheet_name]["months"]
+            if month in months:
+                index = EntryIndex(self.read_segment(sheet_name, month))
+                # The file wins if a crash left the index behind it
+                if len(index) != months[month]:
+                    months[month] = len(index)
+                    self.schedule_write()
+            else:
+                index = EntryIndex()
+            self.segments[key] = index
+            self.evict()
+            return index
+    
+    def evict(self):
+        """Drop the least recently used old segments past max_segments, keeping unwritten ones"""
+        history = [key for key in self.segments if key[1] < self.recent_month and key not in self.dirty]
+        for key in history[:max(0, len(history) - self.max_segments)]:
+            del self.segments[key]
+    
+    def month_keys(self, sheet_name, newest_first=True, start_date=None, end_date=None):
+        """Return a sheet's months that hold entries, limited to those overlapping start_date..end_date"""
+        months = sorted(self.sheets[sheet_name]["months"], reverse=newest_first)
+        return [
+            month for month in months
+            if (start_date is None or month >= start_date[:7]) and (end_date is None or month <= end_date[:7])
+        ]
+    
+    def mark_dirty(self, sheet_name, month):
+        """Note that a segment must be written, keeping it in memory until it is"""
+        key = (sheet_name, month)
+        self.dirty[key] = self.dirty.get(key, 0) + 1
+        self.schedule_write()
+    
+    def index_data(self):
+        """Return the JSON structure of the index file"""
+        return {
+            "version": INDEX_VERSION,
+            "next_dir": self.next_dir,
+            "sheets": {
+                sheet_name: {
+                    "dir": sheet_data["dir"],
+                    "months": dict(sheet_data["months"]),
+                    "archived": dict(sheet_data["archived"]),
+                    "frequency": sheet_data["frequency"].to_dict(),
+                    "rollup": sheet_data["rollup"].to_dict()
+                }
+                for sheet_name, sheet_data in self.sheets.items()
+            }
+        }
+    
+    def write_pending(self):
+        """Write changed segments, then the index, then delete dropped folders and archive old months (writer thread)"""
+        with self.lock:
+            written = dict(self.dirty)
+            segments = [
+                (self.segment_path(sheet_name, month), self.sheets[sheet_name]["archived"].get(month),
+                 list(self.segments[(sheet_name, month)].entries))
+                for sheet_name, month in written
+            ]
+            index = self.index_data()
+            removed, self.removed_dirs = self.removed_dirs, []
+        
+        try:
+            for path, archive_format, entries in segments:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write_segment_file(path, json.dumps(encode_entries(entries)), archive_format)
+            os.makedirs(self.folder, exist_ok=True)
+            write_atomic(self.index_file, json.dumps(index, indent=2))
+        except OSError:
+            with self.lock:
+                self.removed_dirs[:0] = removed
+            raise
+        
+        with self.lock:
+            # Segments changed again meanwhile stay dirty for the next write
+            for key, counter in written.items():
+                if self.dirty.get(key) == counter:
+                    del self.dirty[key]
+            for path, _, _ in segments:
+                self.archive_cache.discard(path)
+            archive = self.archive_requested
+        for dir_name in removed:
+            shutil.rmtree(os.path.join(self.folder, dir_name), ignore_errors=True)
+        if archive:
+            self.archive_months()
+    
+    def archive_candidates(self):
+        """Return (sheet, month, path) of the plain months older than archive_after_months"""
+        cutoff = shift_month(recent_months(self.today)[1], -self.archive_after_months)
+        with self.lock:
+            return [
+                (sheet_name, month, self.segment_path(sheet_name, month))
+                for sheet_name, sheet_data in self.sheets.items()
+                for month in sheet_data["months"]
+                if month < cutoff and month not in sheet_data["archived"] and (sheet_name, month) not in self.dirty
+            ]
+    
+    def archive_months(self):
+        """Compress the months older than archive_after_months (writer thread)
+        
+        Each month is compressed to a new file that the index then lists; the
+        plain file is only deleted once the index has been written.
+        """
+        with self.lock:
+            self.archive_requested = False
+        plain = self.archive_candidates()
+        archived = []
+        try:
+            for sheet_name, month, path in plain:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                archive_path = f"{path}.{self.archive_format}"
+                write_segment_file(archive_path, text, self.archive_format)
+                with self.lock:
+                    # A month changed or dropped meanwhile stays plain; the next round retries it
+                    if (sheet_name, month) in self.dirty or sheet_name not in self.sheets \
+                            or self.segment_path(sheet_name, month) != path:
+                        os.remove(archive_path)
+                        continue
+                    self.sheets[sheet_name]["archived"][month] = self.archive_format
+                archived.append(path)
+            
+            if archived:
+                with self.lock:
+                    index = self.index_data()
+                write_atomic(self.index_file, json.dumps(index, indent=2))
+        except OSError:
+            with self.lock:
+                self.archive_requested = True
+            raise
+        for path in archived:
+            os.remove(path)
+    
+    def schedule_write(self):
+        """Ask the writer thread to persist the current state"""
+        if self.writer is None:
+            self.writer = BackgroundWriter(self.write_pending)
+        self.writer.mark_dirty()
+    
+    def save(self):
+        """Write every pending change now"""
+        self.schedule_write()
+        self.flush()
+    
+    def flush(self):
+        """Wait until changes made so far are written"""
+        if self.writer is not None:
+            self.writer.flush()
+    
+    def write_stats(self):
+        """Return (pending changes, seconds taken by the last write, last write error)"""
+        if self.writer is None:
+            return 0, None, None
+        return self.writer.pending, self.writer.last_latency, self.writer.last_error
+    
+    def close(self):
+        """Write pending changes and stop the writer thread"""
+        if self.writer is not None:
+            self.writer.close()
+    
+    def sheet_names(self):
+        """Return sheet names in creation order"""
+        return list(self.sheets)
+    
+    def add_sheet(self, sheet_name):
+        """Create an empty sheet"""
+        with self.lock:
+            self.sheets[sheet_name] = {"dir": self.new_dir(), "months": {}, "archived": {},
+                                       "descriptions": DescriptionTable(), "frequency": FrequencyTable(),
+                                       "rollup": Rollup()}
+            self.changed(sheet_name)
+    
+    def new_dir(self):
+        """Return an unused segment folder name (sheet names may not be valid file names)"""
+        dir_name = f"s{self.next_dir}"
+        self.next_dir += 1
+        return dir_name
+    
+    def drop_segments(self, sheet_name):
+        """Forget the cached and unwritten segments of a sheet"""
+        for key in [key for key in self.segments if key[0] == sheet_name]:
+            del self.segments[key]
+        for key in [key for key in self.dirty if key[0] == sheet_name]:
+            del self.dirty[key]
+    
+    def remove_sheet(self, sheet_name):
+        """Delete a sheet and all its data"""
+        with self.lock:
+            self.drop_segments(sheet_name)
+            self.removed_dirs.append(self.sheets.pop(sheet_name)["dir"])
+            self.changed(sheet_name)
+    
+    def reset_entries(self, sheet_name):
+        """Delete all time entries of a sheet"""
+        with self.lock:
+            sheet_data = self.sheets[sheet_name]
+            self.drop_segments(sheet_name)
+            # New entries go to a fresh folder; the old one is deleted once the index no longer lists it
+            self.removed_dirs.append(sheet_data["dir"])
+            sheet_data["dir"] = self.new_dir()
+            sheet_data["months"] = {}
+            sheet_data["archived"] = {}
+            sheet_data["descriptions"] = DescriptionTable()
+            sheet_data["rollup"] = Rollup()
+            self.changed(sheet_name)
+    
+    def add_entry(self, sheet_name, entry):
+        """Record a completed time entry and count its description"""
+        month = entry_month(entry)
+        with self.lock:
+            sheet_data = self.sheets[sheet_name]
+            entry.description = sheet_data["descriptions"].intern(entry.description)
+            self.segment(sheet_name, month).add(entry)
+            sheet_data["months"][month] = sheet_data["months"].get(month, 0) + 1
+            sheet_data["rollup"].add(entry)
+            sheet_data["frequency"].use(entry.description, entry.end)
+            self.versions[sheet_name] = self.versions.get(sheet_name, 0) + 1
+            self.mark_dirty(sheet_name, month)
+    
+    def changed(self, sheet_name):
+        """Count a change of a sheet and write the index"""
+        self.versions[sheet_name] = self.versions.get(sheet_name, 0) + 1
+        self.schedule_write()
+    
+    def count_entries(self, sheet_name):
+        """Return the number of entries on a sheet"""
+        return sum(self.sheets[sheet_name]["months"].values())
+    
+    def iter_entries(self, sheet_name, newest_first=True):
+        """Yield the entries of a sheet ordered by start time, reading one month at a time"""
+        return self.iter_between(sheet_name, None, None, newest_first)
+    
+    def entries_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Return the entries of a sheet dated start_date..end_date inclusive"""
+        return list(self.iter_between(sheet_name, start_date, end_date, newest_first))
+    
+    def iter_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Iterate over the entries dated start_date..end_date inclusive, reading only the months in range"""
+        with self.lock:
+            months = self.month_keys(sheet_name, newest_first, start_date, end_date)
+        for month in months:
+            # Each month is copied under the lock, so exports can read from a worker thread
+            with self.lock:
+                if sheet_name not in self.sheets:
+                    return
+                entries = self.segment(sheet_name, month).between(start_date, end_date, newest_first)
+            yield from entries
+    
+    def count_between(self, sheet_name, start_date=None, end_date=None):
+        """Return the number of entries dated start_date..end_date inclusive"""
+        with self.lock:
+            months = self.sheets[sheet_name]["months"]
+            count = 0
+            for month in self.month_keys(sheet_name, False, start_date, end_date):
+                if (start_date is None or month > start_date[:7]) and (end_date is None or month < end_date[:7]):
+                    count += months[month]
+                else:
+                    # Only the first and last month need their entries
+                    lo, hi = self.segment(sheet_name, month).date_bounds(start_date, end_date)
+                    count += hi - lo
+            return count
+    
+    def entry_range(self, sheet_name, offset, limit, newest_first=True):
+        """Return `limit` entries of a sheet starting at position `offset`, reading only the months they are in"""
+        with self.lock:
+            months = self.sheets[sheet_name]["months"]
+            entries = []
+            for month in self.month_keys(sheet_name, newest_first):
+                if offset >= months[month]:
+                    offset -= months[month]
+                    continue
+                entries.extend(self.segment(sheet_name, month).slice(offset, limit - len(entries), newest_first))
+                offset = 0
+                if len(entries) >= limit:
+                    break
+            return entries
+    
+    def entry_position(self, sheet_name, entry):
+        """Return the position of a stored entry in newest-first order"""
+        month = entry_month(entry)
+        with self.lock:
+            months = self.sheets[sheet_name]["months"]
+            newer = sum(count for other, count in months.items() if other > month)
+            index = self.segment(sheet_name, month)
+            return newer + len(index) - 1 - index.position(entry)
+    
+    def version(self, sheet_name):
+        """Return a counter that changes whenever the sheet's entries change"""
+        return self.versions.get(sheet_name, 0)
+    
+    def description_counts(self, sheet_name):
+        """Return (description, count) pairs of a sheet, best ranked first"""
+        with self.lock:
+            return self.sheets[sheet_name]["frequency"].counts()
+    
+    def description_frequency(self, sheet_name):
+        """Return a copy of the sheet's FrequencyTable"""
+        with self.lock:
+            return self.sheets[sheet_name]["frequency"].copy()
+    
+    def rollup_total(self, sheet_name, kind, key):
+        """Return the seconds tracked on a sheet for one day, ISO week or description"""
+        return self.sheets[sheet_name]["rollup"].total(kind, key)
+    
+    def rollup_totals(self, sheet_name, kind):
+        """Return {key: seconds} of one rollup kind of a sheet"""
+        with self.lock:
+            return dict(self.sheets[sheet_name]["rollup"].totals[kind])
@@ -0,0 +1,374 @@
+"""SQLite storage backend"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from timekeeper.entries import Entry, day_end, day_start
+from timekeeper.frequency import MAX_DESCRIPTIONS, FrequencyTable, used
+from timekeeper.instrumentation import timed
+from timekeeper.rollups import ROLLUP_KINDS, Rollup, rollup_keys
+from timekeeper.storage import JournalStore, Store, config_data, write_atomic
+
+
+# Bumped whenever the schema changes; see upgrade_schema()
+SCHEMA_VERSION = 3
+
+# Statements creating the current schema, run one by one inside the upgrade transaction
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS sheets (
+        name TEXT PRIMARY KEY
+    )""",
+    """CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        sheet TEXT NOT NULL,
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        duration INTEGER NOT NULL,
+        description TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS entries_sheet_start ON entries (sheet, start_ts)",
+    """CREATE TABLE IF NOT EXISTS frequency (
+        sheet TEXT NOT NULL,
+        description TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        log_weight REAL NOT NULL DEFAULT 0,
+        last_used INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (sheet, description)
+    )""",
+    "CREATE INDEX IF NOT EXISTS frequency_sheet_weight ON frequency (sheet, log_weight)",
+    """CREATE TABLE IF NOT EXISTS rollups (
+        sheet TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        seconds INTEGER NOT NULL,
+        PRIMARY KEY (sheet, kind, key)
+    )"""
+)
+
+ENTRY_COLUMNS = "start_ts, end_ts, duration, description"
+
+
+def entry_from_row(cursor, row):
+    """Row factory building the same Entry objects the JSON stores hold"""
+    return Entry(*row)
+
+
+def ts_bounds(start_date, end_date):
+    """Return the [start, end) epoch seconds covering dates start_date..end_date (None = open)"""
+    return (day_start(start_date) if start_date else 0,
+            day_end(end_date) if end_date else 2 ** 62)
+
+
+class SqliteStore(Store):
+    """Keeps sheets in an SQLite database and only loads the rows that are asked for
+    
+    The JSON config file stays the import/export format: a fresh database is
+    filled from import_file when that exists. Description frequency rows
+    hold the FrequencyTable statistics and are capped at max_descriptions
+    per sheet, the lowest ranked being deleted with the insert that goes
+    over.
+    """
+    
+    def __init__(self, db_file, import_file=None, max_descriptions=MAX_DESCRIPTIONS):
+        self.db_file = db_file
+        self.import_file = import_file
+        self.max_descriptions = max_descriptions
+        self.conn = None
+        self.last_latency = None  # Seconds taken by the last write transaction
+        self.versions = {}  # Per-sheet change counters (for this process)
+    
+    def load(self):
+        """Open the database, creating or upgrading the schema on first use
+        
+        A new database is created and filled from import_file in the same
+        transaction, so an import that fails leaves no tables behind and is
+        tried again on the next start.
+        """
+        self.conn = sqlite3.connect(self.db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            (tables,) = self.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()
+            is_new = not tables
+            # One transaction, user_version included, so a failed upgrade leaves the database as it was
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.upgrade_schema(version)
+                self.create_schema()
+                if is_new and self.import_file:
+                    # The config file may not exist while its journal does; JournalStore reads both
+                    self.import_json(self.import_file)
+                if not is_new and version < 2:
+                    # Databases from before the rollups table
+                    self.rebuild_rollups()
+                if not is_new and version < 3:
+                    self.date_frequency()
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def create_schema(self):
+        """Create the tables and indexes that do not exist yet (caller commits)"""
+        for statement in SCHEMA:
+            self.conn.execute(statement)
+    
+    def upgrade_schema(self, version):
+        """Convert tables written by an older schema version to the current schema (caller commits)"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(frequency)")]
+        if columns and "log_weight" not in columns:
+            # Version 3 ranks descriptions by decayed weight; date_frequency() fills the new columns in
+            self.conn.execute("ALTER TABLE frequency ADD COLUMN log_weight REAL NOT NULL DEFAULT 0")
+            self.conn.execute("ALTER TABLE frequency ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("DROP INDEX IF EXISTS frequency_sheet_count")
+        
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(entries)")]
+        if "date" not in columns:
+            return
+        
+        # Version 0 stored display strings; move the rows to numeric columns
+        self.conn.execute("ALTER TABLE entries RENAME TO entries_v0")
+        self.create_schema()
+        rows = self.conn.execute(
+            "SELECT sheet, date, start_time, end_time, duration, description FROM entries_v0 ORDER BY id")
+        for sheet_name, date, start_time, end_time, duration, description in rows.fetchall():
+            entry = Entry.from_dict({
+                "date": date,
+                "start_time": start_time,
+                "end_time": end_time,
+                "duration": duration,
+                "description": description
+            })
+            self.insert_row(sheet_name, entry)
+        self.conn.execute("DROP TABLE entries_v0")
+    
+    @contextmanager
+    def transaction(self, sheet_name):
+        """Commit the statements run inside the block, timing the write"""
+        start = time.perf_counter()
+        with timed("store.write"), self.conn:
+            yield
+        self.last_latency = time.perf_counter() - start
+        self.versions[sheet_name] = self.versions.get(sheet_name, 0) + 1
+    
+    def write_stats(self):
+        """Return (pending changes, seconds taken by the last write, last write error)"""
+        # Writes are small indexed transactions and stay on the Tk thread
+        return 0, self.last_latency, None
+    
+    def sheet_names(self):
+        """Return sheet names in creation order"""
+        rows = self.conn.execute("SELECT name FROM sheets ORDER BY rowid")
+        return [name for (name,) in rows]
+    
+    def add_sheet(self, sheet_name):
+        """Create an empty sheet"""
+        with self.transaction(sheet_name):
+            self.conn.execute("INSERT OR IGNORE INTO sheets (name) VALUES (?)", (sheet_name,))
+    
+    def remove_sheet(self, sheet_name):
+        """Delete a sheet and all its data"""
+        with self.transaction(sheet_name):
+            self.conn.execute("DELETE FROM entries WHERE sheet = ?", (sheet_name,))
+            self.conn.execute("DELETE FROM frequency WHERE sheet = ?", (sheet_name,))
+            self.conn.execute("DELETE FROM rollups WHERE sheet = ?", (sheet_name,))
+            self.conn.execute("DELETE FROM sheets WHERE name = ?", (sheet_name,))
+    
+    def reset_entries(self, sheet_name):
+        """Delete all time entries of a sheet"""
+        with self.transaction(sheet_name):
+            self.conn.execute("DELETE FROM entries WHERE sheet = ?", (sheet_name,))
+            self.conn.execute("DELETE FROM rollups WHERE sheet = ?", (sheet_name,))
+    
+    def add_entry(self, sheet_name, entry):
+        """Record a completed time entry and count its description"""
+        with self.transaction(sheet_name):
+            self.insert_entry(sheet_name, entry)
+    
+    def insert_entry(self, sheet_name, entry):
+        """Insert an entry and count its description and rollups (caller commits)"""
+        self.insert_row(sheet_name, entry)
+        self.use_description(sheet_name, entry.description, entry.end)
+        for kind, key in rollup_keys(entry):
+            self.conn.execute(
+                "INSERT OR IGNORE INTO rollups (sheet, kind, key, seconds) VALUES (?, ?, ?, 0)",
+                (sheet_name, kind, key))
+            self.conn.execute(
+                "UPDATE rollups SET seconds = seconds + ? WHERE sheet = ? AND kind = ? AND key = ?",
+                (entry.duration, sheet_name, kind, key))
+    
+    def use_description(self, sheet_name, description, when):
+        """Count a use of a description, deleting the lowest ranked ones past max_descriptions (caller commits)"""
+        stats = self.conn.execute(
+            "SELECT log_weight, last_used, count FROM frequency WHERE sheet = ? AND description = ?",
+            (sheet_name, description)).fetchone()
+        log_weight, last_used, count = used(stats, when)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO frequency (sheet, description, count, log_weight, last_used) VALUES (?, ?, ?, ?, ?)",
+            (sheet_name, description, count, log_weight, last_used))
+        if stats is not None:
+            return
+        
+        (excess,) = self.conn.execute(
+            "SELECT COUNT(*) - ? FROM frequency WHERE sheet = ?", (self.max_descriptions, sheet_name)).fetchone()
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM frequency WHERE rowid IN (SELECT rowid FROM frequency WHERE sheet = ? AND description != ? "
+                "ORDER BY log_weight, last_used LIMIT ?)", (sheet_name, description, excess))
+    
+    def write_frequency(self, sheet_name, frequency):
+        """Replace the description frequency rows of a sheet with a FrequencyTable (caller commits)"""
+        self.conn.execute("DELETE FROM frequency WHERE sheet = ?", (sheet_name,))
+        self.conn.executemany(
+            "INSERT INTO frequency (sheet, description, count, log_weight, last_used) VALUES (?, ?, ?, ?, ?)",
+            ((sheet_name, description, count, log_weight, last_used)
+             for description, (log_weight, last_used, count) in frequency.stats.items()))
+    
+    def insert_row(self, sheet_name, entry):
+        """Insert an entry row without touching the description counts"""
+        self.conn.execute(
+            f"INSERT INTO entries (sheet, {ENTRY_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+            (sheet_name, entry.start, entry.end, entry.duration, entry.description))
+    
+    def count_entries(self, sheet_name):
+        """Return the number of entries on a sheet"""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM entries WHERE sheet = ?", (sheet_name,)).fetchone()
+        return count
+    
+    def iter_entries(self, sheet_name, newest_first=True):
+        """Yield the entries of a sheet ordered by start time"""
+        order = "DESC" if newest_first else "ASC"
+        cursor = self.conn.cursor()
+        cursor.row_factory = entry_from_row
+        return cursor.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM entries WHERE sheet = ? "
+            f"ORDER BY start_ts {order}, id {order}", (sheet_name,))
+    
+    def entries_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Return the entries of a sheet dated start_date..end_date inclusive"""
+        return self.iter_between(sheet_name, start_date, end_date, newest_first).fetchall()
+    
+    def iter_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Iterate over the entries dated start_date..end_date inclusive, fetching rows as they are read"""
+        order = "DESC" if newest_first else "ASC"
+        cursor = self.conn.cursor()
+        cursor.row_factory = entry_from_row
+        return cursor.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM entries WHERE sheet = ? AND start_ts >= ? AND start_ts < ? "
+            f"ORDER BY start_ts {order}, id {order}",
+            (sheet_name, *ts_bounds(start_date, end_date)))
+    
+    def count_between(self, sheet_name, start_date=None, end_date=None):
+        """Return the number of entries dated start_date..end_date inclusive"""
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE sheet = ? AND start_ts >= ? AND start_ts < ?",
+            (sheet_name, *ts_bounds(start_date, end_date))).fetchone()
+        return count
+    
+    def entry_range(self, sheet_name, offset, limit, newest_first=True):
+        """Return `limit` entries of a sheet starting at position `offset` of iter_entries order"""
+        order = "DESC" if newest_first else "ASC"
+        cursor = self.conn.cursor()
+        cursor.row_factory = entry_from_row
+        return cursor.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM entries WHERE sheet = ? "
+            f"ORDER BY start_ts {order}, id {order} LIMIT ? OFFSET ?", (sheet_name, limit, offset)).fetchall()
+    
+    def entry_position(self, sheet_name, entry):
+        """Return the position of a stored entry in newest-first order"""
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE sheet = ? AND start_ts > ?",
+            (sheet_name, entry.start)).fetchone()
+        return count
+    
+    def version(self, sheet_name):
+        """Return a counter that changes whenever the sheet's entries change"""
+        return self.versions.get(sheet_name, 0)
+    
+    def description_counts(self, sheet_name):
+        """Return (description, count) pairs of a sheet, best ranked first"""
+        rows = self.conn.execute(
+            "SELECT description, count FROM frequency WHERE sheet = ? "
+            "ORDER BY log_weight DESC, last_used DESC, description", (sheet_name,))
+        return rows.fetchall()
+    
+    def description_frequency(self, sheet_name):
+        """Return a copy of the sheet's FrequencyTable"""
+        rows = self.conn.execute(
+            "SELECT description, log_weight, last_used, count FROM frequency WHERE sheet = ?", (sheet_name,))
+        return FrequencyTable.from_dict({description: stats for description, *stats in rows},
+                                        max_size=self.max_descriptions)
+    
+    def date_frequency(self):
+        """Fill in the decay columns of plain counts kept by version 2 databases, dating them by their last entry (caller commits)"""
+        for sheet_name in self.sheet_names():
+            counts = dict(self.conn.execute(
+                "SELECT description, count FROM frequency WHERE sheet = ?", (sheet_name,)).fetchall())
+            frequency = FrequencyTable.from_counts(counts, self.iter_entries(sheet_name),
+                                                   max_size=self.max_descriptions)
+            self.write_frequency(sheet_name, frequency)
+    
+    def rollup_total(self, sheet_name, kind, key):
+        """Return the seconds tracked on a sheet for one day, ISO week or description"""
+        row = self.conn.execute(
+            "SELECT seconds FROM rollups WHERE sheet = ? AND kind = ? AND key = ?", (sheet_name, kind, key)).fetchone()
+        return row[0] if row else 0
+    
+    def rollup_totals(self, sheet_name, kind):
+        """Return {key: seconds} of one rollup kind of a sheet"""
+        rows = self.conn.execute("SELECT key, seconds FROM rollups WHERE sheet = ? AND kind = ?", (sheet_name, kind))
+        return dict(rows.fetchall())
+    
+    def rebuild_rollups(self):
+        """Recompute the rollups of every sheet from its entries (caller commits)"""
+        self.conn.execute("DELETE FROM rollups")
+        for sheet_name in self.sheet_names():
+            rollup = Rollup.from_entries(self.iter_entries(sheet_name, newest_first=False))
+            self.conn.executemany(
+                "INSERT INTO rollups (sheet, kind, key, seconds) VALUES (?, ?, ?, ?)",
+                ((sheet_name, kind, key, seconds) for kind, key, seconds in rollup.rows()))
+    
+    def import_json(self, path):
+        """Add the sheets of a JSON config file (and its journal, if any) to the database (caller commits)
+        
+        The source files are only read, so they still work with the JSON
+        storage modes and older versions.
+        """
+        source = JournalStore(path)
+        source.read()
+        
+        for sheet_name, sheet_data in source.sheets.items():
+            self.conn.execute("INSERT OR IGNORE INTO sheets (name) VALUES (?)", (sheet_name,))
+            for entry in sheet_data["index"].entries:
+                self.insert_row(sheet_name, entry)
+            # Imported as-is since a reset keeps the frequency of deleted entries
+            self.write_frequency(sheet_name, sheet_data["frequency"])
+        self.rebuild_rollups()
+    
+    def export_json(self, path):
+        """Write every sheet to a JSON config file"""
+        snapshot = {}
+        for sheet_name in self.sheet_names():
+            entries = list(self.iter_entries(sheet_name, newest_first=False))
+            rollup = {kind: self.rollup_totals(sheet_name, kind) for kind in ROLLUP_KINDS}
+            rollup["entries"] = len(entries)
+            snapshot[sheet_name] = (entries, self.description_frequency(sheet_name).to_dict(), rollup)
+        write_atomic(path, json.dumps(config_data(snapshot), indent=2))
+    
+    @contextmanager
+    def reader(self):
+        """Give a store on a separate connection, as SQLite connections stay on their thread
+        
+        Must be entered on the thread that reads from it.
+        """
+        reader = SqliteStore(self.db_file)
+        reader.conn = sqlite3.connect(self.db_file)
+        try:
+            yield reader
+        finally:
+            reader.close()
+    
+    def close(self):
+        """Close the database connection"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
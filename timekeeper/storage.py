@@ -0,0 +1,523 @@
+"""Persistence for sheet data (time entries and description frequency)"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from timekeeper.description_table import DescriptionTable, decode_rows, encode_rows
+from timekeeper.entries import Entry, entry_date
+from timekeeper.entry_index import EntryIndex
+from timekeeper.frequency import FrequencyTable, is_count_data
+from timekeeper.rollups import Rollup
+from timekeeper.writer import BackgroundWriter
+
+
+# Journal size (bytes) after which it is folded into the snapshot
+COMPACT_THRESHOLD = 1024 * 1024
+
+
+def new_sheet_data():
+    """Return the in-memory data of an empty sheet"""
+    return {"index": EntryIndex(), "descriptions": DescriptionTable(), "frequency": FrequencyTable(), "rollup": Rollup()}
+
+
+def write_atomic(path, text):
+    """Write text to path so readers never see a half-written file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def config_data(snapshot):
+    """Turn {sheet: (entries, frequency dict, rollup dict)} into the config file structure
+    
+    Entries are grouped by date as [start, end, duration, description id]
+    rows indexing the sheet's "descriptions" list.
+    """
+    data = {"sheets": {}}
+    for sheet_name, (entries, frequency, rollup) in snapshot.items():
+        days = {}
+        for entry in entries:
+            days.setdefault(entry_date(entry), []).append(entry)
+        table = DescriptionTable()
+        days = {date: encode_rows(day_entries, table) for date, day_entries in days.items()}
+        data["sheets"][sheet_name] = {
+            "descriptions": table.descriptions,
+            "entries": days,
+            "frequency": frequency,
+            "rollup": rollup
+        }
+    return data
+
+
+def open_store(mode, config_file, archive_after_months=None, archive_format="xz", today=None):
+    """Create the store for the given storage mode ("segments", "json", "journal" or "sqlite")
+    
+    Only the "segments" mode archives months older than archive_after_months,
+    and only it uses `today` (the date it counts recent and old months from).
+    """
+    if mode == "segments":
+        from timekeeper.segment_store import SegmentStore
+        return SegmentStore(os.path.splitext(config_file)[0] + ".segments", import_file=config_file,
+                            archive_after_months=archive_after_months, archive_format=archive_format,
+                            today=today)
+    if mode == "sqlite":
+        from timekeeper.sqlite_store import SqliteStore
+        return SqliteStore(os.path.splitext(config_file)[0] + ".db", import_file=config_file)
+    if mode == "journal":
+        return JournalStore(config_file)
+    return JsonStore(config_file)
+
+
+class Store:
+    """Interface shared by all storage backends
+    
+    Entries are timekeeper.entries.Entry objects with start and end epoch
+    seconds, an integer duration and a description; readers get Entry
+    objects back and must not change them. Readers ask the store for the
+    rows they need instead of walking the data of every sheet.
+    """
+    
+    def load(self):
+        """Open the backing storage"""
+        raise NotImplementedError
+    
+    def sheet_names(self):
+        """Return sheet names in creation order"""
+        raise NotImplementedError
+    
+    def add_sheet(self, sheet_name):
+        """Create an empty sheet"""
+        raise NotImplementedError
+    
+    def remove_sheet(self, sheet_name):
+        """Delete a sheet and all its data"""
+        raise NotImplementedError
+    
+    def reset_entries(self, sheet_name):
+        """Delete all time entries of a sheet"""
+        raise NotImplementedError
+    
+    def add_entry(self, sheet_name, entry):
+        """Record a completed time entry and count its description"""
+        raise NotImplementedError
+    
+    def count_entries(self, sheet_name):
+        """Return the number of entries on a sheet"""
+        raise NotImplementedError
+    
+    def iter_entries(self, sheet_name, newest_first=True):
+        """Yield the entries of a sheet ordered by date and start time"""
+        raise NotImplementedError
+    
+    def entries_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Return the entries of a sheet dated start_date..end_date inclusive"""
+        raise NotImplementedError
+    
+    def iter_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Iterate over the entries dated start_date..end_date inclusive, for streaming readers"""
+        return iter(self.entries_between(sheet_name, start_date, end_date, newest_first))
+    
+    def count_between(self, sheet_name, start_date=None, end_date=None):
+        """Return the number of entries dated start_date..end_date inclusive"""
+        raise NotImplementedError
+    
+    def entry_range(self, sheet_name, offset, limit, newest_first=True):
+        """Return `limit` entries of a sheet starting at position `offset` of iter_entries order"""
+        raise NotImplementedError
+    
+    def entry_position(self, sheet_name, entry):
+        """Return the position of a stored entry in newest-first order"""
+        raise NotImplementedError
+    
+    def version(self, sheet_name):
+        """Return a counter that changes whenever the sheet's entries change"""
+        raise NotImplementedError
+    
+    def description_counts(self, sheet_name):
+        """Return (description, count) pairs of a sheet, best ranked first"""
+        raise NotImplementedError
+    
+    def description_frequency(self, sheet_name):
+        """Return a copy of the sheet's FrequencyTable"""
+        raise NotImplementedError
+    
+    def rollup_total(self, sheet_name, kind, key):
+        """Return the seconds tracked on a sheet for one day, ISO week or description
+        
+        kind is one of timekeeper.rollups.ROLLUP_KINDS.
+        """
+        raise NotImplementedError
+    
+    def rollup_totals(self, sheet_name, kind):
+        """Return {key: seconds} of one rollup kind of a sheet"""
+        raise NotImplementedError
+    
+    def save(self):
+        """Make sure everything is written out"""
+        pass
+    
+    def flush(self):
+        """Wait until changes made so far are written"""
+        pass
+    
+    def write_stats(self):
+        """Return (pending changes, seconds taken by the last write, last write error)"""
+        return 0, None, None
+    
+    @contextmanager
+    def reader(self):
+        """Give a store that may be read from another thread while the block runs"""
+        yield self
+    
+    def close(self):
+        """Finish pending work before the application exits"""
+        pass
+
+
+class JsonStore(Store):
+    """Keeps every sheet in memory and rewrites the whole config file after changes
+    
+    Each sheet's entries live in an EntryIndex sorted by date and start
+    time, which every reader uses. Writes happen on a BackgroundWriter
+    thread, so a burst of changes costs one write. self.lock keeps the
+    writer from copying a sheet halfway through a change.
+    """
+    
+    def __init__(self, config_file):
+        self.config_file = config_file
+        self.sheets = {}  # {"Sheet Name": {"index": EntryIndex, "descriptions": DescriptionTable, "frequency": FrequencyTable, "rollup": Rollup}}
+        self.lock = threading.RLock()
+        self.writer = None
+        self.versions = {}  # Per-sheet change counters
+    
+    def load(self):
+        """Load sheets from the config file"""
+        if self.load_snapshot(self.read_snapshot()):
+            # Store data saved by older versions in the current format
+            self.request_full_write()
+        return self.sheets
+    
+    def load_snapshot(self, snapshot):
+        """Take the sheets of a parsed config file as the in-memory state
+        
+        Entries saved with display strings are converted to the numeric
+        format and plain description counts to a FrequencyTable; returns
+        whether anything was. Entries saved as dicts by older versions are
+        read as well as encoded rows.
+        """
+        self.sheets = {}
+        migrated = False
+        converted = False
+        for sheet_name, sheet_data in snapshot.get("sheets", {}).items():
+            table = DescriptionTable()
+            descriptions = [table.intern(description) for description in sheet_data.get("descriptions", [])]
+            entries = []
+            for day_entries in sheet_data.get("entries", {}).values():
+                if day_entries and isinstance(day_entries[0], list):
+                    entries.extend(decode_rows(day_entries, descriptions))
+                    continue
+                for data in day_entries:
+                    migrated = migrated or "start" not in data
+                    entry = Entry.from_dict(data)
+                    entry.description = table.intern(entry.description)
+                    entries.append(entry)
+            
+            # A saved rollup is trusted only if it covers exactly these entries
+            rollup = Rollup.from_dict(sheet_data.get("rollup", {}))
+            if rollup.entries != len(entries) or migrated:
+                rollup = Rollup.from_entries(entries)
+            
+            frequency = sheet_data.get("frequency", {})
+            converted = converted or is_count_data(frequency)
+            
+            self.sheets[sheet_name] = {
+                "index": EntryIndex(entries),
+                "descriptions": table,
+                "frequency": FrequencyTable.from_saved(frequency, entries),
+                "rollup": rollup
+            }
+        return migrated or converted
+    
+    def read_snapshot(self):
+        """Read the raw config file, returning an empty config if it is missing or corrupt"""
+        if not os.path.exists(self.config_file):
+            return {}
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def snapshot(self):
+        """Copy the persisted part of every sheet (cheap enough to do under the lock)"""
+        return {
+            sheet_name: (
+                list(sheet_data["index"].entries),
+                sheet_data["frequency"].to_dict(),
+                sheet_data["rollup"].to_dict()
+            )
+            for sheet_name, sheet_data in self.sheets.items()
+        }
+    
+    def save(self):
+        """Write the full config file now"""
+        self.schedule_write()
+        self.flush()
+    
+    def write_pending(self):
+        """Write the full config file (writer thread)"""
+        with self.lock:
+            snapshot = self.snapshot()
+        write_atomic(self.config_file, json.dumps(config_data(snapshot), indent=2))
+    
+    def request_full_write(self):
+        """Rewrite the whole config file in the background"""
+        self.schedule_write()
+    
+    def schedule_write(self):
+        """Ask the writer thread to persist the current state"""
+        if self.writer is None:
+            self.writer = BackgroundWriter(self.write_pending)
+        self.writer.mark_dirty()
+    
+    def flush(self):
+        """Wait until changes made so far are written"""
+        if self.writer is not None:
+            self.writer.flush()
+    
+    def write_stats(self):
+        """Return (pending changes, seconds taken by the last write, last write error)"""
+        if self.writer is None:
+            return 0, None, None
+        return self.writer.pending, self.writer.last_latency, self.writer.last_error
+    
+    def close(self):
+        """Write pending changes and stop the writer thread"""
+        if self.writer is not None:
+            self.writer.close()
+    
+    def sheet_names(self):
+        """Return sheet names in creation order"""
+        return list(self.sheets)
+    
+    def add_sheet(self, sheet_name):
+        """Create an empty sheet"""
+        self.commit({"op": "add_sheet", "sheet": sheet_name})
+    
+    def remove_sheet(self, sheet_name):
+        """Delete a sheet and all its data"""
+        self.commit({"op": "remove_sheet", "sheet": sheet_name})
+    
+    def reset_entries(self, sheet_name):
+        """Delete all time entries of a sheet"""
+        self.commit({"op": "reset", "sheet": sheet_name})
+    
+    def add_entry(self, sheet_name, entry):
+        """Record a completed time entry and count its description"""
+        self.commit({"op": "entry", "sheet": sheet_name, "entry": entry})
+    
+    def count_entries(self, sheet_name):
+        """Return the number of entries on a sheet"""
+        return len(self.sheets[sheet_name]["index"])
+    
+    def iter_entries(self, sheet_name, newest_first=True):
+        """Yield the entries of a sheet ordered by date and start time"""
+        return self.sheets[sheet_name]["index"].iter(newest_first)
+    
+    def entries_between(self, sheet_name, start_date=None, end_date=None, newest_first=True):
+        """Return the entries of a sheet dated start_date..end_date inclusive"""
+        # Locked since exports read from a worker thread
+        with self.lock:
+            return self.sheets[sheet_name]["index"].between(start_date, end_date, newest_first)
+    
+    def count_between(self, sheet_name, start_date=None, end_date=None):
+        """Return the number of entries dated start_date..end_date inclusive"""
+        with self.lock:
+            lo, hi = self.sheets[sheet_name]["index"].date_bounds(start_date, end_date)
+        return hi - lo
+    
+    def entry_range(self, sheet_name, offset, limit, newest_first=True):
+        """Return `limit` entries of a sheet starting at position `offset` of iter_entries order"""
+        return self.sheets[sheet_name]["index"].slice(offset, limit, newest_first)
+    
+    def entry_position(self, sheet_name, entry):
+        """Return the position of a stored entry in newest-first order"""
+        index = self.sheets[sheet_name]["index"]
+        return len(index) - 1 - index.position(entry)
+    
+    def version(self, sheet_name):
+        """Return a counter that changes whenever the sheet's entries change"""
+        return self.versions.get(sheet_name, 0)
+    
+    def description_counts(self, sheet_name):
+        """Return (description, count) pairs of a sheet, best ranked first"""
+        with self.lock:
+            return self.sheets[sheet_name]["frequency"].counts()
+    
+    def description_frequency(self, sheet_name):
+        """Return a copy of the sheet's FrequencyTable"""
+        with self.lock:
+            return self.sheets[sheet_name]["frequency"].copy()
+    
+    def rollup_total(self, sheet_name, kind, key):
+        """Return the seconds tracked on a sheet for one day, ISO week or description"""
+        return self.sheets[sheet_name]["rollup"].total(kind, key)
+    
+    def rollup_totals(self, sheet_name, kind):
+        """Return {key: seconds} of one rollup kind of a sheet"""
+        with self.lock:
+            return dict(self.sheets[sheet_name]["rollup"].totals[kind])
+    
+    def commit(self, record):
+        """Apply a change in memory and persist it"""
+        with self.lock:
+            self.apply(record)
+            self.persist(record)
+    
+    def apply(self, record):
+        """Apply a change record to the in-memory sheets"""
+        op = record["op"]
+        sheet_name = record["sheet"]
+        self.versions[sheet_name] = self.versions.get(sheet_name, 0) + 1
+        
+        if op == "add_sheet":
+            self.sheets[sheet_name] = new_sheet_data()
+        elif op == "remove_sheet":
+            self.sheets.pop(sheet_name, None)
+        elif op == "reset":
+            if sheet_name in self.sheets:
+                self.sheets[sheet_name]["index"] = EntryIndex()
+                self.sheets[sheet_name]["descriptions"] = DescriptionTable()
+                self.sheets[sheet_name]["rollup"] = Rollup()
+        elif op == "entry":
+            sheet_data = self.sheets.setdefault(sheet_name, new_sheet_data())
+            entry = record["entry"]
+            if isinstance(entry, dict):
+                # Replayed from the journal
+                entry = Entry.from_dict(entry)
+            entry.description = sheet_data["descriptions"].intern(entry.description)
+            sheet_data["index"].add(entry)
+            sheet_data["rollup"].add(entry)
+            sheet_data["frequency"].use(entry.description, entry.end)
+    
+    def persist(self, record):
+        """Persist a change that has already been applied"""
+        self.schedule_write()
+
+
+class JournalStore(JsonStore):
+    """Appends each change as one JSON line and replays the journal on load
+    
+    Records are queued and appended by the writer thread. Once the journal
+    grows past compact_threshold bytes, the writer also folds it into the
+    config file and drops the folded-in records. Every record carries a
+    sequence number and the snapshot remembers the last one it contains, so a
+    crash at any point of a compaction never replays a change twice.
+    """
+    
+    def __init__(self, config_file, journal_file=None, compact_threshold=COMPACT_THRESHOLD):
+        super().__init__(config_file)
+        self.journal_file = journal_file or os.path.splitext(config_file)[0] + ".journal"
+        self.compact_threshold = compact_threshold
+        self.seq = 0
+        self.pending_lines = []
+        self.compact_requested = False
+    
+    def load(self):
+        """Load the snapshot and replay the journal on top of it"""
+        if self.read():
+            # Store data saved by older versions in the current format
+            self.request_full_write()
+        return self.sheets
+    
+    def read(self):
+        """Load the snapshot and replay the journal without writing either back
+        
+        Used on its own to import the files into another store, which must
+        leave them readable by the versions that wrote them. Returns whether
+        the snapshot held data in an older format.
+        """
+        snapshot = self.read_snapshot()
+        migrated = self.load_snapshot(snapshot)
+        self.seq = snapshot.get("journal_seq", 0)
+        
+        for record in self.read_journal():
+            if record.get("seq", 0) <= self.seq:
+                continue
+            self.apply(record)
+            self.seq = record["seq"]
+        return migrated
+    
+    def read_journal(self):
+        """Yield journal records, skipping a torn last line left by a crash"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    
+    def save(self):
+        """Fold the journal into the config file now"""
+        self.request_full_write()
+        self.flush()
+    
+    def request_full_write(self):
+        """Fold the journal into the config file in the background"""
+        with self.lock:
+            self.compact_requested = True
+        self.schedule_write()
+    
+    def persist(self, record):
+        """Queue the change for the journal"""
+        self.seq += 1
+        record["seq"] = self.seq
+        self.pending_lines.append(json.dumps(record, default=Entry.to_dict) + "\n")
+        self.schedule_write()
+    
+    def write_pending(self):
+        """Append queued records and compact the journal once it is large (writer thread)"""
+        with self.lock:
+            lines, self.pending_lines = self.pending_lines, []
+            compact, self.compact_requested = self.compact_requested, False
+        
+        try:
+            if lines:
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write("".join(lines))
+                lines = []
+            if compact or self.journal_size() >= self.compact_threshold:
+                self.compact()
+        except OSError:
+            # Put back what was not written so the next attempt retries it
+            with self.lock:
+                self.pending_lines[:0] = lines
+                self.compact_requested = self.compact_requested or compact
+            raise
+    
+    def journal_size(self):
+        """Return the journal size in bytes"""
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+    
+    def compact(self):
+        """Write a snapshot of every applied change, then trim the journal to newer records"""
+        with self.lock:
+            snapshot = self.snapshot()
+            seq = self.seq
+        data = config_data(snapshot)
+        data["journal_seq"] = seq
+        write_atomic(self.config_file, json.dumps(data, indent=2))
+        
+        # Records queued after the snapshot was taken are appended later and
+        # skipped on replay since the snapshot already contains them
+        newer = [record for record in self.read_journal() if record.get("seq", 0) > seq]
+        write_atomic(self.journal_file, "".join(json.dumps(record) + "\n" for record in newer))
@@ -0,0 +1,249 @@
+"""UI-free time tracking core: sheets, running sessions and completed entries
+
+The GUI and the command line both drive a Tracker. Running sessions are
+saved to a small sessions file next to the config file, so a session
+started by one process can be paused or stopped by another. A loaded
+Tracker holds the config file's lock until it is closed, so two processes
+never have the same sheets open: neither would see the other's changes
+and the last one to write would silently drop them.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from timekeeper.descriptions import DescriptionIndex
+from timekeeper.entries import make_entry
+from timekeeper.lockfile import LockFile
+from timekeeper.storage import open_store, write_atomic
+
+
+logger = logging.getLogger("timekeeper.tracker")
+
+DEFAULT_CONFIG_FILE = "sheets_config.json"
+DEFAULT_STORAGE_MODE = "segments"
+
+# Months after which entries are moved to compressed archives (segments mode)
+DEFAULT_ARCHIVE_AFTER_MONTHS = 12
+DEFAULT_ARCHIVE_FORMAT = "xz"
+
+
+def new_sheet_state():
+    """Return the tracking state of an idle sheet"""
+    return {
+        "session": None,
+        "start_time": None,
+        "paused": False,
+        "paused_elapsed": 0
+    }
+
+
+class Tracker:
+    """Sheets with their tracking sessions, on top of a Store
+    
+    self.sheets maps every sheet name to its session state:
+    {"session": label or None, "start_time": datetime or None,
+    "paused": bool, "paused_elapsed": seconds tracked before the pause}.
+    While a sheet runs, start_time is shifted by earlier paused time so
+    now - start_time is always the tracked time.
+    """
+    
+    def __init__(self, config_file=DEFAULT_CONFIG_FILE, storage_mode=DEFAULT_STORAGE_MODE,
+                 archive_after_months=DEFAULT_ARCHIVE_AFTER_MONTHS, archive_format=DEFAULT_ARCHIVE_FORMAT):
+        self.config_file = config_file
+        self.storage_mode = storage_mode
+        self.archive_after_months = archive_after_months  # None keeps every month uncompressed
+        self.archive_format = archive_format
+        self.sessions_file = os.path.splitext(config_file)[0] + ".sessions.json"
+        self.lock = LockFile(os.path.splitext(config_file)[0] + ".lock")
+        self.store = None
+        self.sheets = {}
+        self.description_indexes = {}  # Sheet -> DescriptionIndex, built when first searched
+    
+    def load(self):
+        """Lock the config file, open the store (creating a "Default" sheet if there is none) and restore sessions
+        
+        Raises StoreLocked if another process has the same config file open.
+        """
+        self.lock.acquire()
+        try:
+            self.store = open_store(self.storage_mode, self.config_file, self.archive_after_months,
+                                    self.archive_format)
+            self.store.load()
+        except Exception:
+            # Stop the writer thread or connection the store may have started; the load error is the one to report
+            if self.store is not None:
+                try:
+                    self.store.close()
+                except Exception:
+                    logger.exception("Closing the store after a failed load")
+            self.store = None
+            self.lock.release()
+            raise
+        if not self.store.sheet_names():
+            self.store.add_sheet("Default")
+        
+        self.sheets = {sheet_name: new_sheet_state() for sheet_name in self.store.sheet_names()}
+        for sheet_name, state in self.read_sessions().items():
+            if sheet_name in self.sheets:
+                self.sheets[sheet_name] = state
+    
+    def load_sessions(self):
+        """Restore running sessions only, without opening the store or locking (for quick status checks)"""
+        self.sheets = self.read_sessions()
+    
+    def read_sessions(self):
+        """Read {sheet: state} of the sheets that have a session from the sessions file"""
+        try:
+            with open(self.sessions_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        sessions = {}
+        for sheet_name, session in saved.items():
+            start_time = session.get("start")
+            sessions[sheet_name] = {
+                "session": session["session"],
+                "start_time": datetime.fromtimestamp(start_time) if start_time is not None else None,
+                "paused": session.get("paused", False),
+                "paused_elapsed": session.get("paused_elapsed", 0)
+            }
+        return sessions
+    
+    def save_sessions(self):
+        """Write the state of every sheet with a session to the sessions file"""
+        saved = {}
+        for sheet_name, sheet in self.sheets.items():
+            if sheet["session"] is None:
+                continue
+            saved[sheet_name] = {
+                "session": sheet["session"],
+                "start": sheet["start_time"].timestamp() if sheet["start_time"] else None,
+                "paused": sheet["paused"],
+                "paused_elapsed": sheet["paused_elapsed"]
+            }
+        write_atomic(self.sessions_file, json.dumps(saved, indent=2))
+    
+    def close(self):
+        """Write pending changes, close the store and release the lock"""
+        try:
+            if self.store is not None:
+                self.store.close()
+        finally:
+            self.lock.release()
+    
+    def sheet_names(self):
+        """Return sheet names in creation order"""
+        return list(self.sheets)
+    
+    def add_sheet(self, sheet_name):
+        """Create an empty sheet"""
+        if sheet_name in self.sheets:
+            raise ValueError(f"Sheet '{sheet_name}' already exists")
+        self.store.add_sheet(sheet_name)
+        self.sheets[sheet_name] = new_sheet_state()
+    
+    def remove_sheet(self, sheet_name):
+        """Delete a sheet and its entries; a tracked sheet cannot be removed"""
+        if self.sheets[sheet_name]["session"] is not None:
+            raise ValueError(f"Stop tracking on '{sheet_name}' before removing it")
+        self.store.remove_sheet(sheet_name)
+        del self.sheets[sheet_name]
+        self.description_indexes.pop(sheet_name, None)
+    
+    def reset_entries(self, sheet_name):
+        """Delete all time entries of a sheet"""
+        self.store.reset_entries(sheet_name)
+    
+    def description_index(self, sheet_name):
+        """Return the search index of a sheet's descriptions, kept up to date as entries are added"""
+        index = self.description_indexes.get(sheet_name)
+        if index is None:
+            index = self.description_indexes[sheet_name] = DescriptionIndex(self.store.description_frequency(sheet_name))
+        return index
+    
+    def sheet(self, sheet_name):
+        """Return the state of a sheet, raising KeyError with a readable message if it is unknown"""
+        try:
+            return self.sheets[sheet_name]
+        except KeyError:
+            raise KeyError(f"No sheet named '{sheet_name}'") from None
+    
+    def is_running(self, sheet_name):
+        """Check whether a sheet has a session that is not paused"""
+        sheet = self.sheet(sheet_name)
+        return sheet["session"] is not None and not sheet["paused"]
+    
+    def elapsed(self, sheet_name, now=None):
+        """Return the seconds tracked in a sheet's current session"""
+        sheet = self.sheet(sheet_name)
+        if sheet["session"] is None:
+            return 0
+        if sheet["paused"]:
+            return sheet["paused_elapsed"]
+        return ((now or datetime.now()) - sheet["start_time"]).total_seconds()
+    
+    def start(self, sheet_name, mode="pause"):
+        """Start a session on a sheet; mode "pause" pauses every other running sheet
+        
+        Returns the names of the sheets that were paused.
+        """
+        sheet = self.sheet(sheet_name)
+        paused = []
+        if mode == "pause":
+            for other_name in self.sheets:
+                if other_name != sheet_name and self.is_running(other_name):
+                    self.pause(other_name, save=False)
+                    paused.append(other_name)
+        
+        sheet["start_time"] = datetime.now()
+        sheet["session"] = sheet["start_time"].strftime("%Y-%m-%d %H:%M:%S")
+        sheet["paused"] = False
+        sheet["paused_elapsed"] = 0
+        self.save_sessions()
+        return paused
+    
+    def pause(self, sheet_name, save=True):
+        """Pause a running session, keeping its tracked time"""
+        sheet = self.sheet(sheet_name)
+        if sheet["session"] is None or sheet["paused"]:
+            return False
+        sheet["paused_elapsed"] = self.elapsed(sheet_name)
+        sheet["paused"] = True
+        if save:
+            self.save_sessions()
+        return True
+    
+    def resume(self, sheet_name):
+        """Resume a paused session"""
+        sheet = self.sheet(sheet_name)
+        if not sheet["paused"]:
+            return False
+        # Shift the start so now - start_time continues from the paused time
+        sheet["start_time"] = datetime.now() - timedelta(seconds=sheet["paused_elapsed"])
+        sheet["paused"] = False
+        self.save_sessions()
+        return True
+    
+    def stop(self, sheet_name, description, end_time=None):
+        """End a sheet's session and record it as an entry; returns the entry (None if idle)
+        
+        end_time defaults to now; a paused session ends where it was paused.
+        """
+        sheet = self.sheet(sheet_name)
+        if sheet["session"] is None:
+            return None
+        
+        end_time = sheet["start_time"] + timedelta(seconds=self.elapsed(sheet_name, end_time))
+        entry = make_entry(sheet["start_time"], end_time, description)
+        self.store.add_entry(sheet_name, entry)
+        if sheet_name in self.description_indexes:
+            self.description_indexes[sheet_name].use(description, entry.end)
+        self.discard(sheet_name)
+        return entry
+    
+    def discard(self, sheet_name):
+        """End a sheet's session without recording an entry"""
+        self.sheet(sheet_name).update(new_sheet_state())
+        self.save_sessions()
@@ -0,0 +1,113 @@
+"""Background thread that persists store changes off the Tk thread"""
+import threading
+import time
+
+from timekeeper.instrumentation import timed
+
+
+# Quiet period (seconds) after the last change before writing
+DEBOUNCE_SECONDS = 0.5
+
+# Longest a change may wait while changes keep arriving
+MAX_DELAY_SECONDS = 5.0
+
+
+class BackgroundWriter:
+    """Runs a write callback on a dedicated thread, merging bursts of changes into one write
+    
+    mark_dirty() only sets a flag; the thread waits until no change has
+    arrived for `debounce` seconds (but never longer than `max_delay` after
+    the first one) and then calls `write` once for the whole burst.
+    """
+    
+    def __init__(self, write, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS):
+        self.write = write
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.dirty = False
+        self.writing = False
+        self.flush_requested = False
+        self.closed = False
+        self.first_change = 0
+        self.last_change = 0
+        self.pending = 0  # Changes waiting for the next write
+        self.attempts = 0  # Finished write attempts
+        self.last_latency = None  # Seconds taken by the last write
+        self.last_error = None
+        self.thread = threading.Thread(target=self.run, name="store-writer", daemon=True)
+        self.thread.start()
+    
+    def mark_dirty(self):
+        """Note that there are changes to write"""
+        with self.condition:
+            now = time.monotonic()
+            if not self.dirty:
+                self.first_change = now
+            self.dirty = True
+            self.last_change = now
+            self.pending += 1
+            self.condition.notify_all()
+    
+    def run(self):
+        """Writer thread main loop"""
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closed:
+                    self.condition.wait()
+                if not self.dirty:
+                    return
+                
+                # Debounce: wait for a quiet period unless asked to flush
+                while not self.flush_requested and not self.closed:
+                    now = time.monotonic()
+                    deadline = min(self.last_change + self.debounce, self.first_change + self.max_delay)
+                    if now >= deadline:
+                        break
+                    self.condition.wait(deadline - now)
+                
+                self.dirty = False
+                self.flush_requested = False
+                self.pending = 0
+                self.writing = True
+            
+            start = time.perf_counter()
+            try:
+                with timed("store.write"):
+                    self.write()
+                self.last_error = None
+            except Exception as e:
+                # Keep the data dirty so the next round retries
+                self.last_error = e
+                with self.condition:
+                    if not self.dirty:
+                        self.first_change = time.monotonic()
+                    self.dirty = True
+                    self.last_change = time.monotonic()
+            self.last_latency = time.perf_counter() - start
+            
+            with self.condition:
+                self.writing = False
+                self.attempts += 1
+                self.condition.notify_all()
+                if self.closed and self.last_error is not None:
+                    return
+    
+    def flush(self):
+        """Write pending changes now and wait until that write has been attempted"""
+        with self.condition:
+            # Wait for the write in progress and for the one covering current changes
+            target = self.attempts + int(self.writing) + int(self.dirty)
+            if self.dirty:
+                self.flush_requested = True
+                self.condition.notify_all()
+            while self.attempts < target and self.thread.is_alive():
+                self.condition.wait(0.1)
+    
+    def close(self):
+        """Flush and stop the writer thread"""
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()